@@ -3,10 +3,9 @@
 
 import streamlit as st
 from portfolio_module import (
-    build_positions,
+    build_book,
     portfolio_summary,
     rebalance_plan,
-    positions_report,
 )
 from display_module import display_all
 from config import POSITIONS, CASH, TARGETS, RULES, INCLUDE_OTHER_FUNDS
@@ -25,10 +24,10 @@ with st.sidebar:
     st.info("当前使用配置文件中的数据")
     st.caption("如需修改，请编辑 main.py 中的配置")
 
-# 计算数据
-positions = build_positions(POSITIONS)
+# 计算数据（列式持仓簿，市值/盈亏/板块合计都是整列运算）
+positions = build_book(POSITIONS)
 summary = portfolio_summary(positions, CASH, INCLUDE_OTHER_FUNDS)
-positions_data = positions_report(positions)
+positions_data = positions.report_columns()
 deviation_data, action_data = rebalance_plan(
     positions=positions,
     cash=CASH,
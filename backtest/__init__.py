@@ -1,5 +1,76 @@
 """回测模块"""
 
 from .engine import BacktestEngine
+from .metrics import risk_metrics
+from .trades import TradeBook
+from .runner import (
+    get_backtest_results,
+    run_strategy_backtest,
+    compare_strategies,
+    print_comparison_table,
+)
+from .parallel import ParallelComparator
+from .sweep import expand_grid, sweep, print_sweep_table
+from .vectorized import (
+    kdata_arrays,
+    fast_backtest,
+    screen,
+    screen_then_backtest,
+    validate_against_engine,
+)
+from .universe import select_stocks, run_universe, summarize_universe, print_universe_summary
+from .store import ResultStore, load_results
+from .kcache import KDataCache
+from .loader import StartupTimer, load_scoped, scoped_load_options
+from .profiling import PhaseRecorder, format_phases
+from .walkforward import walk_forward, walk_forward_windows, print_walk_forward
+from .streaming import StreamingBacktest, StreamingWatchlist
+from .result_cache import ResultCache
+from .prefetch import KDataPrefetcher
+from .portfolio import load_panel, portfolio_backtest, print_portfolio_summary
+from .robustness import robustness_summary, resample_trades, resample_returns, trade_pnl
 
-__all__ = ['BacktestEngine']
+__all__ = [
+    'BacktestEngine',
+    'risk_metrics',
+    'TradeBook',
+    'get_backtest_results',
+    'run_strategy_backtest',
+    'compare_strategies',
+    'print_comparison_table',
+    'ParallelComparator',
+    'expand_grid',
+    'sweep',
+    'print_sweep_table',
+    'kdata_arrays',
+    'fast_backtest',
+    'screen',
+    'screen_then_backtest',
+    'validate_against_engine',
+    'select_stocks',
+    'run_universe',
+    'summarize_universe',
+    'print_universe_summary',
+    'ResultStore',
+    'load_results',
+    'KDataCache',
+    'StartupTimer',
+    'load_scoped',
+    'scoped_load_options',
+    'PhaseRecorder',
+    'format_phases',
+    'walk_forward',
+    'walk_forward_windows',
+    'print_walk_forward',
+    'StreamingBacktest',
+    'StreamingWatchlist',
+    'ResultCache',
+    'KDataPrefetcher',
+    'robustness_summary',
+    'resample_trades',
+    'resample_returns',
+    'trade_pnl',
+    'load_panel',
+    'portfolio_backtest',
+    'print_portfolio_summary',
+]
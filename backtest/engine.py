@@ -1,24 +1,33 @@
 """回测引擎"""
 
+import numpy as np
 import hikyuu as hku
 
+from .metrics import periods_per_year, risk_metrics
+from .profiling import NULL_RECORDER
+from .trades import BUSINESS_NAMES, BUY, TradeBook
+
 
 class BacktestEngine:
     """回测引擎"""
     
-    def __init__(self, init_cash=300000):
+    def __init__(self, init_cash=300000, recorder=None):
         """初始化回测引擎
         
         Args:
             init_cash: 初始资金，默认30万
+            recorder: PhaseRecorder 对象，给出时记录交易记录提取、资产序列等阶段的耗时
         """
         self.init_cash = init_cash
+        self.recorder = recorder or NULL_RECORDER
         self.tm = None
         self.sys = None
+        self._book = None
     
     def create_trade_account(self):
         """创建交易账户"""
         self.tm = hku.crtTM(init_cash=self.init_cash)
+        self._book = None
         return self.tm
     
     def create_trade_system(self, sg, mm):
@@ -49,8 +58,95 @@ class BacktestEngine:
         print("=" * 60)
         print("开始回测...")
         self.sys.run(kdata)
+        self._book = None
         print("=" * 60)
     
+    def trade_book(self):
+        """交易账户的列式视图（TradeBook），首次调用时一次性提取，之后复用
+        
+        Returns:
+            TradeBook: 交易记录和持仓记录的结构化数组及股票索引
+        """
+        if self.tm is None:
+            raise ValueError("交易账户未创建")
+        if self._book is None:
+            with self.recorder.phase('trade_book'):
+                self._book = TradeBook.from_tm(self.tm)
+        return self._book
+    
+    def equity_curve(self, kdata):
+        """逐K线的现金、持仓和总资产序列
+        
+        每笔交易记录带有成交后的现金余额，按成交所在的K线位置落到数组上后向前填充
+        （同一根K线上有多笔成交时取最后一笔），
+        持仓数量由买卖数量累加得到，总资产 = 现金 + 持仓 × 当根收盘价。
+        
+        Args:
+            kdata: K线数据
+            
+        Returns:
+            dict: datetime/close/cash/position/equity 数组，以及累计成交金额 traded_value
+        """
+        if self.tm is None:
+            raise ValueError("交易账户未创建")
+        
+        data = kdata.to_np()
+        close = np.asarray(data['close'], dtype=np.float64)
+        n = len(close)
+        
+        book = self.trade_book()
+        trades = book.trades[book.buys | book.sells]
+        code = kdata.get_stock().market_code
+        if code in book.code_index:
+            trades = trades[trades['stock'] == book.code_index[code]]
+        
+        # 成交时间按K线时间定位，只保留恰好落在某根K线上的成交
+        bar_dt = np.asarray(data['datetime']).astype('M8[us]')
+        pos = np.searchsorted(bar_dt, trades['datetime'], side='right') - 1
+        on_bar = pos >= 0
+        on_bar[on_bar] = bar_dt[pos[on_bar]] == trades['datetime'][on_bar]
+        trades, pos = trades[on_bar], pos[on_bar]
+        
+        cash_at = np.full(n, np.nan)
+        cash_at[pos] = trades['cash']
+        signed = np.where(trades['business'] == BUY, trades['number'], -trades['number'])
+        pos_delta = np.zeros(n)
+        np.add.at(pos_delta, pos, signed)
+        traded_value = float(np.sum(trades['number'] * trades['price']))
+        
+        # 向前填充成交后的现金余额，首笔交易之前为初始资金
+        idx = np.where(np.isnan(cash_at), 0, np.arange(n))
+        np.maximum.accumulate(idx, out=idx)
+        cash = cash_at[idx]
+        cash[np.isnan(cash)] = self.tm.init_cash
+        
+        position = np.cumsum(pos_delta)
+        return {
+            'datetime': data['datetime'],
+            'close': close,
+            'cash': cash,
+            'position': position,
+            'equity': cash + position * close,
+            'traded_value': traded_value,
+        }
+    
+    def risk_metrics(self, kdata, curve=None):
+        """计算最大回撤、夏普、索提诺、波动率、持仓时间占比和换手率
+        
+        Args:
+            kdata: K线数据
+            curve: equity_curve() 的结果，已计算过时可传入复用
+            
+        Returns:
+            dict: 风险指标
+        """
+        if curve is None:
+            with self.recorder.phase('equity_curve'):
+                curve = self.equity_curve(kdata)
+        ppy = periods_per_year(kdata.get_query().ktype)
+        with self.recorder.phase('risk_metrics'):
+            return risk_metrics(curve['equity'], curve['position'], curve['traded_value'], ppy)
+    
     def print_results(self, kdata):
         """输出回测结果
         
@@ -65,18 +161,9 @@ class BacktestEngine:
         init_cash = self.tm.init_cash
         current_cash = self.tm.current_cash
         
-        # 计算持仓市值（通过持仓记录和当前价格）
-        current_value = 0.0
-        position_list = self.tm.get_position_list()
-        if len(position_list) > 0:
-            # 获取最后一条K线的收盘价作为当前价格
-            current_price = kdata[-1].close if len(kdata) > 0 else 0
-            for pos in position_list:
-                try:
-                    number = pos.number if hasattr(pos, 'number') else 0
-                    current_value += number * current_price
-                except:
-                    pass
+        # 持仓市值：按最后一条K线的收盘价估值
+        current_price = kdata[-1].close if len(kdata) > 0 else 0
+        current_value = self.trade_book().position_value(current_price)
         
         total_asset = current_cash + current_value
         
@@ -89,7 +176,15 @@ class BacktestEngine:
         total_return = total_asset - init_cash
         return_rate = (total_return / init_cash * 100) if init_cash > 0 else 0
         print(f"总收益:       {total_return:>12,.2f} 元")
-        print(f"收益率:       {return_rate:>11.2f}%\n")
+        print(f"收益率:       {return_rate:>11.2f}%")
+        
+        metrics = self.risk_metrics(kdata)
+        print(f"最大回撤:     {metrics['max_drawdown'] * 100:>11.2f}%")
+        print(f"年化波动率:   {metrics['volatility'] * 100:>11.2f}%")
+        print(f"夏普比率:     {metrics['sharpe']:>12.2f}")
+        print(f"索提诺比率:   {metrics['sortino']:>12.2f}")
+        print(f"持仓时间占比: {metrics['exposure'] * 100:>11.2f}%")
+        print(f"换手率:       {metrics['turnover']:>12.2f} 倍\n")
         
         # 获取交易记录
         self._print_trade_list()
@@ -103,31 +198,22 @@ class BacktestEngine:
     
     def _print_trade_list(self):
         """打印交易记录"""
-        trade_list = []
         try:
-            trade_list = self.tm.get_trade_list()
-            # 过滤掉 INIT 类型的交易
-            actual_trades = [t for t in trade_list if hasattr(t, 'business') and t.business.name != 'INIT']
-            print(f"交易次数: {len(actual_trades)} 次（不含初始化）")
+            book = self.trade_book()
+            trades = book.trades[book.actual]
+            print(f"交易次数: {len(trades)} 次（不含初始化）")
             
-            if len(actual_trades) > 0:
+            if len(trades) > 0:
                 print("\n交易记录（前10笔）:")
                 print("-" * 60)
                 print(f"{'序号':<4} {'日期':<12} {'类型':<6} {'价格':>8} {'数量':>8} {'金额':>12}")
                 print("-" * 60)
-                for i, trade in enumerate(actual_trades[:10]):
-                    try:
-                        dt = str(trade.datetime)[:10] if hasattr(trade, 'datetime') else 'N/A'
-                        business = trade.business.name if hasattr(trade, 'business') else 'N/A'
-                        number = trade.number if hasattr(trade, 'number') else 0
-                        
-                        # 使用正确的属性名：real_price (不是 realPrice)
-                        price = trade.real_price if hasattr(trade, 'real_price') else (trade.plan_price if hasattr(trade, 'plan_price') else 0)
-                        amount = number * price
-                        print(f"{i+1:<4} {dt:<12} {business:<6} {price:>8.2f} {number:>8.0f} {amount:>12.2f}")
-                    except Exception as e:
-                        print(f"{i+1:2d}. 解析失败: {e}")
-                        print(f"    Trade对象: {trade}")
+                for i, trade in enumerate(trades[:10]):
+                    dt = str(trade['datetime'])[:10]
+                    business = BUSINESS_NAMES.get(int(trade['business']), 'N/A')
+                    price = trade['price']
+                    number = trade['number']
+                    print(f"{i+1:<4} {dt:<12} {business:<6} {price:>8.2f} {number:>8.0f} {number * price:>12.2f}")
         except Exception as e:
             print(f"获取交易记录失败: {e}")
             import traceback
@@ -140,50 +226,25 @@ class BacktestEngine:
             kdata: K线数据
         """
         try:
-            position_list = self.tm.get_position_list()
-            trade_list = self.tm.get_trade_list()
+            book = self.trade_book()
+            positions = book.positions
             
-            if len(position_list) > 0:
+            if len(positions) > 0:
                 current_price = kdata[-1].close if len(kdata) > 0 else 0
-                print(f"\n当前持仓: {len(position_list)} 只")
+                cost_price = book.position_cost_price()
+                print(f"\n当前持仓: {len(positions)} 只")
                 print("-" * 60)
                 print(f"{'代码':<12} {'数量':>8} {'成本价':>10} {'当前价':>10} {'市值':>12} {'盈亏':>12} {'盈亏率':>8}")
                 print("-" * 60)
-                for pos in position_list:
-                    try:
-                        code = pos.stock.market_code if hasattr(pos, 'stock') else 'N/A'
-                        number = pos.number if hasattr(pos, 'number') else 0
-                        
-                        # 尝试多种方式获取买入金额
-                        buy_money = 0
-                        if hasattr(pos, 'buyMoney'):
-                            buy_money = pos.buyMoney
-                        elif hasattr(pos, 'total_cost'):
-                            buy_money = pos.total_cost
-                        elif hasattr(pos, 'cost'):
-                            buy_money = pos.cost
-                        else:
-                            # 如果没有buyMoney，尝试从交易记录中计算
-                            # 找到该股票的所有买入交易
-                            buy_trades = [t for t in trade_list 
-                                         if hasattr(t, 'stock') and hasattr(t.stock, 'market_code') 
-                                         and t.stock.market_code == code 
-                                         and hasattr(t, 'business') and t.business.name == 'BUY']
-                            if buy_trades:
-                                buy_money = sum(t.number * (t.real_price if hasattr(t, 'real_price') else t.plan_price) 
-                                               for t in buy_trades if hasattr(t, 'number'))
-                        
-                        cost = (buy_money / number) if number > 0 else 0
-                        market_value = number * current_price
-                        profit = market_value - buy_money
-                        profit_rate = (profit / buy_money * 100) if buy_money > 0 else 0
-                        
-                        print(f"{code:<12} {number:>8.0f} {cost:>10.2f} {current_price:>10.2f} {market_value:>12.2f} {profit:>+12.2f} {profit_rate:>+7.2f}%")
-                    except Exception as e:
-                        print(f"解析持仓失败: {e}")
-                        # 打印持仓对象的所有属性以便调试
-                        print(f"  持仓对象属性: {dir(pos)}")
-                        print(f"  持仓对象: {pos}")
+                for pos, cost in zip(positions, cost_price):
+                    code = book.codes[pos['stock']] if pos['stock'] >= 0 else 'N/A'
+                    number = pos['number']
+                    buy_money = pos['buy_money']
+                    market_value = number * current_price
+                    profit = market_value - buy_money
+                    profit_rate = (profit / buy_money * 100) if buy_money > 0 else 0
+                    
+                    print(f"{code:<12} {number:>8.0f} {cost:>10.2f} {current_price:>10.2f} {market_value:>12.2f} {profit:>+12.2f} {profit_rate:>+7.2f}%")
             else:
                 print("\n当前无持仓")
         except Exception as e:
@@ -0,0 +1,254 @@
+"""K线磁盘缓存
+
+把每个 (股票, 查询条件) 的K线列（datetime/open/high/low/close/amount/volume）写成独立的 .npy 文件，
+读取时用内存映射打开，不复制数据。回测、参数扫描和工作进程重复研究同一批股票时，
+直接从缓存取数，不再经过 hikyuu 的数据加载。
+
+目录结构：
+    <root>/<market_code>/<ktype>-<复权类型>-<查询条件摘要>/
+        datetime.npy open.npy ... volume.npy meta.json
+
+失效机制：meta.json 记录写入时数据源该股票该K线类型的最后一根K线时间（source_stamp），
+数据源更新后时间戳变化，旧缓存即视为过期并重建。不校验时（validate=False）无法发现新K线，
+只接受区间固定的查询，Query(-N) 这类相对查询直接拒绝。
+
+meta.json 同时记录写入时该股票的品种信息（类型、最小交易量、价格精度等），由缓存重建的 KData
+挂在具有相同品种信息的股票上，回测结果与直接读取 hikyuu 一致，且不需要加载 hikyuu 数据。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+import hikyuu as hku
+
+
+COLUMNS = ('datetime', 'open', 'high', 'low', 'close', 'amount', 'volume')
+
+
+def query_key(query):
+    """把 Query 转换为可哈希的元组，用作K线缓存键"""
+    return (
+        int(query.query_type),
+        query.start,
+        query.end,
+        str(query.start_datetime),
+        str(query.end_datetime),
+        query.ktype,
+        int(query.recover_type),
+    )
+
+
+def fixed_query(query):
+    """查询区间是否固定（数据源追加新K线后，查询结果不变）
+
+    按下标查询时起止都须为非负的确定值；按日期查询时须给出结束日期。
+    """
+    if query.query_type == hku.Query.INDEX:
+        return query.start >= 0 and query.end >= 0 and query.end != hku.constant.null_int64
+    return query.end_datetime != hku.Datetime()
+
+
+# 重建 Stock 所需的品种信息，顺序同 hku.Stock 的完整构造参数（名称之后）
+STOCK_FIELDS = ('type', 'valid', 'start_datetime', 'last_datetime', 'tick', 'tick_value',
+                'precision', 'min_trade_number', 'max_trade_number')
+
+
+def stock_info(stock):
+    """品种信息字典（可写入 JSON），日期以 YYYYMMDDhhmm 整数保存"""
+    info = {name: getattr(stock, name) for name in STOCK_FIELDS}
+    for name in ('start_datetime', 'last_datetime'):
+        info[name] = int(info[name].number)
+    info['type'] = int(info['type'])
+    info['valid'] = bool(info['valid'])
+    return info
+
+
+def source_stamp(stock, ktype):
+    """数据源中该股票该K线类型最后一根K线的时间，作为缓存失效标记
+
+    只读取一条记录，不加载整段K线。
+    """
+    count = stock.get_count(ktype)
+    if count == 0:
+        return ''
+    return str(stock.get_krecord(count - 1, ktype).datetime)
+
+
+class KDataCache:
+    """内存映射的K线磁盘缓存
+
+    Example:
+        cache = KDataCache('.kcache')
+        kdata = cache.get_kdata('sz002415', hku.Query(-500))   # 首次：从 hikyuu 读取并写入缓存
+        arrays = cache.get_arrays('sz002415', hku.Query(-500)) # 之后：零拷贝打开
+        screen(EMACrossStrategy, grid, None, arrays=arrays)
+    """
+
+    def __init__(self, root, validate=True):
+        """初始化K线缓存
+
+        Args:
+            root: 缓存目录
+            validate: 读取时是否对照数据源的最后K线时间校验缓存（需已加载 hikyuu）；
+                      False 表示信任已有缓存，可在不加载 hikyuu 数据的情况下使用
+        """
+        self.root = root
+        self.validate = validate
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    def entry_dir(self, market_code, query):
+        """缓存条目所在目录"""
+        key = query_key(query)
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.root, market_code.upper(),
+                            f"{query.ktype}-{int(query.recover_type)}-{digest}")
+
+    def _read_meta(self, path):
+        try:
+            with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load_arrays(self, market_code, query, stamp=None):
+        """以内存映射方式打开缓存的K线列
+
+        Args:
+            market_code: 股票代码，如 'SZ002415'
+            query: 查询条件
+            stamp: 期望的数据源时间戳，给出且与缓存不一致时视为过期
+
+        Returns:
+            dict: 列名 -> 只读内存映射数组（格式同 kdata_arrays()，另含 amount），
+                  缓存不存在或已过期时返回 None
+        """
+        path = self.entry_dir(market_code, query)
+        meta = self._read_meta(path)
+        if meta is None:
+            return None
+        if stamp is not None and meta.get('source_stamp') != stamp:
+            self.stale += 1
+            return None
+        try:
+            arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+                      for name in COLUMNS}
+        except (OSError, ValueError):
+            return None
+        arrays['meta'] = meta
+        return arrays
+
+    def save(self, kdata, stamp=None):
+        """把K线写入缓存
+
+        先写入临时目录再整体改名，并发写同一条目时不会读到写了一半的文件。
+
+        Args:
+            kdata: K线数据
+            stamp: 数据源时间戳，默认用 source_stamp() 读取
+        """
+        stock = kdata.get_stock()
+        query = kdata.get_query()
+        if stamp is None:
+            stamp = source_stamp(stock, query.ktype)
+
+        data = kdata.to_np()
+        path = self.entry_dir(stock.market_code, query)
+        tmp = f"{path}.tmp-{uuid.uuid4().hex[:8]}"
+        os.makedirs(tmp)
+        try:
+            for name in COLUMNS:
+                if name == 'datetime':
+                    column = np.asarray(data[name]).astype('M8[us]')
+                else:
+                    column = np.ascontiguousarray(data[name], dtype=np.float64)
+                np.save(os.path.join(tmp, f'{name}.npy'), column)
+            meta = {
+                'market_code': stock.market_code,
+                'name': stock.name,
+                'stock': stock_info(stock),
+                'query': [str(v) for v in query_key(query)],
+                'bars': len(data),
+                'last_datetime': str(data['datetime'][-1]) if len(data) else '',
+                'source_stamp': stamp,
+            }
+            with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+            if os.path.exists(path):
+                shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp, path)
+        except OSError:
+            # 其它进程已抢先写入同一条目
+            shutil.rmtree(tmp, ignore_errors=True)
+            if self._read_meta(path) is None:
+                raise
+
+    def check_query(self, query):
+        """不校验的缓存只接受区间固定的查询，否则新K线到来后会一直返回旧数据"""
+        if not self.validate and not fixed_query(query):
+            raise ValueError("validate=False 的K线缓存无法发现新K线，只接受区间固定的查询"
+                             "（起止下标均为非负数，或给出结束日期），不能用 Query(-N) 等相对查询")
+
+    def get_arrays(self, market_code, query):
+        """取K线列：缓存有效时直接打开（内存映射，不复制），否则从 hikyuu 读取并写入缓存
+
+        Returns:
+            dict: 列名 -> 数组
+        """
+        self.check_query(query)
+        stamp = None
+        if self.validate:
+            stamp = source_stamp(hku.get_stock(market_code), query.ktype)
+        arrays = self.load_arrays(market_code, query, stamp)
+        if arrays is not None:
+            self.hits += 1
+            return arrays
+
+        self.misses += 1
+        kdata = hku.get_stock(market_code).get_kdata(query)
+        self.save(kdata, stamp)
+        return self.load_arrays(market_code, query)
+
+    def get_kdata(self, market_code, query):
+        """取 KData：缓存命中时由缓存列重建，不触发 hikyuu 的K线读取
+
+        只需要数值列时用 get_arrays()，不经过 KData 的复制。
+
+        Returns:
+            KData
+        """
+        arrays = self.get_arrays(market_code, query)
+        meta = arrays['meta']
+        return to_kdata(arrays, meta['market_code'], query.ktype, meta.get('name', ''), meta['stock'])
+
+    def stats(self):
+        """返回命中、未命中和过期次数"""
+        return {'hits': self.hits, 'misses': self.misses, 'stale': self.stale}
+
+
+def to_kdata(arrays, market_code, ktype='DAY', name='', info=None):
+    """由缓存列重建 KData
+
+    数据设置到一个临时 Stock 上（不修改 hku.sm 中的股票），缓存中的价格已按原查询复权，
+    因此重建时不再复权。KData 持有自己的一份数据，这里会复制一次各列。
+
+    Args:
+        info: stock_info() 记录的品种信息，给出时临时 Stock 与 hku.sm 中的股票品种信息相同；
+              None 时为默认品种信息（仅用于合成数据）
+    """
+    market, code = market_code[:2].upper(), market_code[2:]
+    if info is None:
+        stock = hku.Stock(market, code, name)
+    else:
+        args = [info[field] for field in STOCK_FIELDS]
+        args[2], args[3] = hku.Datetime(args[2]), hku.Datetime(args[3])
+        stock = hku.Stock(market, code, name, *args)
+    df = pd.DataFrame({name: np.asarray(arrays[name]) for name in COLUMNS})
+    stock.set_kdata_from_df(df, list(COLUMNS), ktype)
+    return stock.get_kdata(hku.Query(0, ktype=ktype))
@@ -0,0 +1,140 @@
+"""按需加载 hikyuu 数据
+
+hku.load_hikyuu() 不带参数时会按配置文件预加载全部股票的K线，单只股票的回测也要等全市场数据读完。
+这里只加载本次运行实际用到的股票和K线类型，并关闭预加载（K线在 get_kdata 时才读取），
+同时记录启动各阶段的耗时。
+"""
+
+import configparser
+import hashlib
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+import hikyuu as hku
+
+
+# 配置文件 [preload] 中表示K线类型开关的选项
+PRELOAD_KTYPES = ('day', 'week', 'month', 'quarter', 'halfyear', 'year', 'min', 'min5',
+                  'min15', 'min30', 'min60', 'hour2', 'timeline', 'trans')
+
+DEFAULT_CONFIG_FILE = os.path.join(os.path.expanduser('~'), '.hikyuu', 'hikyuu.ini')
+
+
+class StartupTimer:
+    """记录启动各阶段的耗时
+
+    Example:
+        timer = StartupTimer()
+        load_scoped(['sz002415'], timer=timer)
+        with timer.phase('get_kdata'):
+            kdata = hku.get_stock('sz002415').get_kdata(hku.Query(-150))
+        print(timer.format())
+    """
+
+    def __init__(self):
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        """计时一个阶段"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def total(self):
+        """全部阶段的总耗时（秒）"""
+        return sum(seconds for _, seconds in self.phases)
+
+    def as_dict(self):
+        """阶段名 -> 耗时（秒）"""
+        return dict(self.phases)
+
+    def format(self):
+        """格式化为一行文本"""
+        parts = [f"{name} {seconds * 1000:.0f}ms" for name, seconds in self.phases]
+        return f"启动耗时 {self.total() * 1000:.0f}ms（" + "，".join(parts) + "）"
+
+
+def lazy_config_file(config_file=None):
+    """生成关闭全部预加载的配置文件副本
+
+    Args:
+        config_file: 原配置文件，默认 ~/.hikyuu/hikyuu.ini
+
+    Returns:
+        str: 副本路径（放在临时目录，内容不变时复用同一文件）；原配置文件不存在时返回 None
+    """
+    config_file = config_file or DEFAULT_CONFIG_FILE
+    if not os.path.exists(config_file):
+        return None
+
+    ini = configparser.RawConfigParser()
+    ini.read(config_file, encoding='utf-8')
+    if ini.has_section('preload'):
+        for ktype in PRELOAD_KTYPES:
+            if ini.has_option('preload', ktype):
+                ini.set('preload', ktype, 'False')
+
+    with open(config_file, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:12]
+    path = os.path.join(tempfile.gettempdir(), f"hikyuu-lazy-{digest}.ini")
+    if not os.path.exists(path):
+        tmp = f"{path}.{os.getpid()}"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            ini.write(f)
+        os.replace(tmp, path)
+    return path
+
+
+def scoped_load_options(stock_list=None, ktype_list=('day',), preload=False, config_file=None,
+                        **options):
+    """构造只加载指定股票和K线类型的 hku.load_hikyuu 参数
+
+    Args:
+        stock_list: 股票代码列表，如 ['sz002415']，None 表示全部
+        ktype_list: K线类型列表，如 ['day']（不区分大小写）
+        preload: 是否保留配置文件中的预加载；False 时K线在 get_kdata 时才读取
+        config_file: hikyuu 配置文件，默认 ~/.hikyuu/hikyuu.ini
+        options: 其它 hku.load_hikyuu 参数，覆盖默认值
+
+    Returns:
+        dict: 可直接传给 hku.load_hikyuu(**options)，也可作为并行回测的 load_options
+    """
+    result = {
+        'ktype_list': [k.lower() for k in ktype_list],
+        'load_history_finance': False,
+        'start_spot': False,
+    }
+    if stock_list is not None:
+        result['stock_list'] = [code.lower() for code in stock_list]
+    lazy = None if preload else lazy_config_file(config_file)
+    if lazy is not None:
+        result['config_file'] = lazy
+    elif config_file is not None:
+        result['config_file'] = config_file
+    result.update(options)
+    return result
+
+
+def load_scoped(stock_list=None, ktype_list=('day',), preload=False, config_file=None,
+                timer=None, **options):
+    """只加载指定股票和K线类型的 hikyuu 数据
+
+    参数同 scoped_load_options()。
+
+    Args:
+        timer: StartupTimer 对象，给出时记录 config / load_hikyuu 两个阶段的耗时
+
+    Returns:
+        StartupTimer: 记录了各阶段耗时的计时器
+    """
+    timer = timer or StartupTimer()
+    with timer.phase('config'):
+        load_options = scoped_load_options(stock_list, ktype_list, preload, config_file, **options)
+    with timer.phase('load_hikyuu'):
+        hku.load_hikyuu(**load_options)
+    return timer
@@ -0,0 +1,109 @@
+"""风险指标：基于逐K线资产序列的向量化计算
+
+所有函数沿第 0 维（时间）计算，输入可以是单条序列 (T,)，也可以是多条序列 (T, P)，
+后者用于向量化筛选时一次算出所有参数组合的指标。
+"""
+
+import numpy as np
+
+
+# K线类型 -> 每年K线数（用于年化）
+PERIODS_PER_YEAR = {
+    'DAY': 252,
+    'WEEK': 52,
+    'MONTH': 12,
+    'QUARTER': 4,
+    'HALFYEAR': 2,
+    'YEAR': 1,
+    'MIN': 252 * 240,
+    'MIN5': 252 * 48,
+    'MIN15': 252 * 16,
+    'MIN30': 252 * 8,
+    'MIN60': 252 * 4,
+    'HOUR2': 252 * 2,
+}
+
+
+def periods_per_year(ktype):
+    """返回K线类型对应的年化系数，未知类型按日线处理"""
+    return PERIODS_PER_YEAR.get(str(ktype).upper(), 252)
+
+
+def bar_returns(equity):
+    """逐K线收益率，形状比输入少一行"""
+    equity = np.asarray(equity, dtype=np.float64)
+    prev = equity[:-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r = np.where(prev != 0, equity[1:] / prev - 1.0, 0.0)
+    return r
+
+
+def max_drawdown(equity):
+    """最大回撤（正数，0.2 表示从高点回落 20%）"""
+    equity = np.asarray(equity, dtype=np.float64)
+    if equity.shape[0] == 0:
+        return np.zeros(equity.shape[1:])
+    peak = np.maximum.accumulate(equity, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dd = np.where(peak > 0, 1.0 - equity / peak, 0.0)
+    return dd.max(axis=0)
+
+
+def volatility(returns, ppy=252):
+    """年化波动率"""
+    if returns.shape[0] < 2:
+        return np.zeros(returns.shape[1:])
+    return returns.std(axis=0, ddof=1) * np.sqrt(ppy)
+
+
+def sharpe_ratio(returns, ppy=252):
+    """年化夏普比率（无风险利率按 0 计）"""
+    if returns.shape[0] < 2:
+        return np.zeros(returns.shape[1:])
+    std = returns.std(axis=0, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(std > 0, returns.mean(axis=0) / std * np.sqrt(ppy), 0.0)
+
+
+def sortino_ratio(returns, ppy=252):
+    """年化索提诺比率：只用下行波动作分母"""
+    if returns.shape[0] < 2:
+        return np.zeros(returns.shape[1:])
+    downside = np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2, axis=0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(downside > 0, returns.mean(axis=0) / downside * np.sqrt(ppy), 0.0)
+
+
+def risk_metrics(equity, position=None, traded_value=None, ppy=252):
+    """一次计算全部风险指标
+
+    Args:
+        equity: 逐K线总资产 (T,) 或 (T, P)
+        position: 逐K线持仓数量，用于计算持仓时间占比
+        traded_value: 每列的累计成交金额，用于计算换手率
+        ppy: 每年K线数
+
+    Returns:
+        dict: max_drawdown/volatility/sharpe/sortino/exposure/turnover，
+              单条序列时为 float，多条序列时为 (P,) 数组
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    returns = bar_returns(equity)
+    metrics = {
+        'max_drawdown': max_drawdown(equity),
+        'volatility': volatility(returns, ppy),
+        'sharpe': sharpe_ratio(returns, ppy),
+        'sortino': sortino_ratio(returns, ppy),
+    }
+    if position is not None:
+        position = np.asarray(position)
+        metrics['exposure'] = (np.mean(position != 0, axis=0) if position.shape[0]
+                               else np.zeros(position.shape[1:]))
+    if traded_value is not None:
+        mean_equity = equity.mean(axis=0) if equity.shape[0] else np.zeros(equity.shape[1:])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            metrics['turnover'] = np.where(mean_equity > 0, np.asarray(traded_value) / mean_equity, 0.0)
+
+    if equity.ndim == 1:
+        metrics = {k: float(v) for k, v in metrics.items()}
+    return metrics
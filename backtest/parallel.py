@@ -0,0 +1,169 @@
+"""并行回测：把多个策略分发到进程池中执行"""
+
+import multiprocessing
+import os
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import hikyuu as hku
+
+from strategies.indicators import get_cache
+
+from .kcache import KDataCache, query_key
+from .loader import scoped_load_options
+from .runner import run_strategy_backtest
+
+
+# 工作进程内的全局状态：每个进程只加载一次 hikyuu 数据，K线按查询条件缓存，
+# 指标通过进程级指标缓存在同一进程处理的所有策略之间共享
+_worker_kdata = {}
+_worker_state = {'load_options': None, 'loaded': False, 'kdata_cache': None}
+_load_lock = threading.Lock()
+
+
+def _init_worker(load_options, kdata_cache=None):
+    """工作进程初始化：加载一次 hikyuu 数据
+
+    Args:
+        load_options: hku.load_hikyuu 的参数
+        kdata_cache: (缓存目录, 是否校验) 元组；不校验的K线缓存不依赖 hikyuu 数据，
+                     此时推迟到缓存未命中时才加载
+    """
+    _worker_state['load_options'] = load_options
+    if kdata_cache is not None:
+        root, validate = kdata_cache
+        _worker_state['kdata_cache'] = KDataCache(root, validate)
+        if not validate:
+            return
+    _ensure_loaded()
+
+
+def _ensure_loaded():
+    """在工作进程内按需加载 hikyuu 数据（预取线程可能同时调用，加锁只加载一次）
+
+    主进程中没有 load_options（调用方已自行加载），不做任何事。
+    """
+    with _load_lock:
+        if not _worker_state['loaded'] and _worker_state['load_options'] is not None:
+            hku.load_hikyuu(**_worker_state['load_options'])
+            _worker_state['loaded'] = True
+
+
+def _get_worker_kdata(market_code, query):
+    """在工作进程内获取K线数据（同一股票和查询条件只取一次）"""
+    key = (market_code, query_key(query))
+    kdata = _worker_kdata.get(key)
+    if kdata is None:
+        cache = _worker_state['kdata_cache']
+        if cache is not None:
+            if cache.validate or cache.load_arrays(market_code, query) is None:
+                _ensure_loaded()
+            kdata = cache.get_kdata(market_code, query)
+        else:
+            kdata = hku.get_stock(market_code).get_kdata(query)
+        _worker_kdata[key] = kdata
+    return kdata
+
+
+def _run_task(task):
+    """工作进程任务：运行单个策略回测
+
+    Returns:
+        tuple: (序号, 结果字典或 None, 错误信息或 None, 指标缓存 (命中, 计算) 次数)
+    """
+    index, strategy, market_code, query, init_cash, instrument, profile_dir, resamples = task
+    cache = get_cache()
+    hits, misses = cache.hits, cache.misses
+    try:
+        kdata = _get_worker_kdata(market_code, query)
+        result = run_strategy_backtest(strategy, kdata, init_cash, verbose=False,
+                                       instrument=instrument, profile_dir=profile_dir, resamples=resamples)
+        if result:
+            result['strategy_name'] = strategy.get_description()
+        error = None
+    except Exception as e:
+        result = None
+        error = f"{e}\n{traceback.format_exc()}"
+    return index, result, error, (cache.hits - hits, cache.misses - misses)
+
+
+class ParallelComparator:
+    """并行策略对比器
+
+    每个工作进程在启动时加载一次 hikyuu 数据，之后按 (股票, 查询条件) 缓存K线，
+    结果按策略的原始顺序返回，单个策略失败只打印错误，不影响其它策略。
+    """
+
+    def __init__(self, workers=None, load_options=None, kdata_cache=None):
+        """初始化并行对比器
+
+        Args:
+            workers: 进程数，默认使用全部 CPU 核心
+            load_options: 传给工作进程中 hku.load_hikyuu 的参数，默认只加载待测股票和K线类型、
+                          不预加载、不启动行情接收（见 scoped_load_options）
+            kdata_cache: KDataCache 对象，给出时工作进程从磁盘缓存取K线；
+                         缓存不校验（validate=False）且命中时，工作进程不加载 hikyuu 数据
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.load_options = None if load_options is None else dict(load_options)
+        self.kdata_cache = kdata_cache
+        # 各工作进程指标缓存的累计命中/计算次数
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def compare(self, strategies, kdata, init_cash=300000):
+        """并行测试多个策略
+
+        Args:
+            strategies: 策略列表（需可 pickle）
+            kdata: K线数据，工作进程按其股票代码和查询条件重新获取
+            init_cash: 初始资金
+
+        Returns:
+            list: 回测结果列表，顺序与 strategies 一致（失败的策略不在其中）
+        """
+        return [r for r in self.map(strategies, kdata, init_cash) if r]
+
+    def map(self, strategies, kdata, init_cash=300000, instrument=False, profile_dir=None, resamples=0):
+        """并行测试多个策略，结果与 strategies 一一对应
+
+        instrument / profile_dir / resamples 见 run_strategy_backtest()，在工作进程内生效。
+
+        Returns:
+            list: 与 strategies 等长的列表，失败的策略对应 None
+        """
+        market_code = kdata.get_stock().market_code
+        query = kdata.get_query()
+        tasks = [(i, s, market_code, query, init_cash, instrument, profile_dir, resamples)
+                 for i, s in enumerate(strategies)]
+        if not tasks:
+            return []
+
+        # hikyuu 内部有后台线程，使用 spawn 避免 fork 后状态不一致
+        ctx = multiprocessing.get_context('spawn')
+        workers = min(self.workers, len(tasks))
+        chunksize = max(1, len(tasks) // (workers * 4))
+
+        load_options = self.load_options
+        if load_options is None:
+            load_options = scoped_load_options([market_code], [query.ktype])
+
+        cache_args = None
+        if self.kdata_cache is not None:
+            # 在父进程中预先写好缓存，工作进程只读
+            self.kdata_cache.get_arrays(market_code, query)
+            cache_args = (self.kdata_cache.root, self.kdata_cache.validate)
+
+        results = [None] * len(tasks)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                                 initargs=(load_options, cache_args)) as pool:
+            # map 按提交顺序返回，保证结果顺序确定；相邻任务分在同一块，便于共享指标
+            for index, result, error, (hits, misses) in pool.map(_run_task, tasks, chunksize=chunksize):
+                self.cache_hits += hits
+                self.cache_misses += misses
+                if error is not None:
+                    print(f"策略 {strategies[index].get_description()} 测试失败: {error}")
+                else:
+                    results[index] = result
+        return results
@@ -0,0 +1,334 @@
+"""多股票组合回测（共享资金）
+
+BacktestEngine 每只股票一个交易账户，看不到一篮子股票共用一笔资金时策略的表现。
+这里把 N 只股票的K线对齐为 日期 × 股票 矩阵，对全部股票一次性向量化计算信号，
+再沿时间轴只走一遍：每个交易日先卖后买，买入从同一个现金池中按持仓上限分配。
+
+信号口径与 vectorized 一致：每只股票的指标只用它自己的K线计算（停牌日不插值），
+信号在当根K线收盘后产生，该股票下一根K线开盘价成交，不计交易成本。
+买入只在开仓信号的下一根K线执行一次：持仓数已满或资金不足时放弃本次开仓，不会之后追买。
+"""
+
+import numpy as np
+import hikyuu as hku
+
+from strategies import EMACrossStrategy, MACDStrategy
+from strategies.all_strategies import BollingerBreakoutStrategy
+
+from .metrics import periods_per_year, risk_metrics
+from .trades import BUY, SELL, POSITION_DTYPE, TRADE_DTYPE, TradeBook
+from .vectorized import cross, ema, holdings_from_signals, kdata_arrays, rolling_mean, rolling_std
+
+
+# ==================== 数据对齐 ====================
+
+def load_panel(codes, query, kdata_cache=None):
+    """读取一批股票的K线列数组
+
+    Args:
+        codes: 股票代码列表
+        query: K线查询条件
+        kdata_cache: KDataCache 对象，给出时从磁盘缓存读取
+
+    Returns:
+        dict: 股票代码（与传入的写法相同）-> kdata_arrays() 格式的列字典（没有K线的股票不在其中）
+    """
+    arrays_by_code = {}
+    for code in codes:
+        if kdata_cache is not None:
+            arrays = kdata_cache.get_arrays(code, query)
+        else:
+            stock = hku.get_stock(code)
+            arrays = kdata_arrays(stock.get_kdata(query))
+        if len(arrays['close']) > 0:
+            arrays_by_code[code] = arrays
+    return arrays_by_code
+
+
+def align_panel(arrays_by_code):
+    """把多只股票的K线对齐到统一的日期轴
+
+    Returns:
+        dict:
+            codes: 股票代码列表 (N,)
+            dates: 全部股票交易日的并集 (T,)
+            open / close: (T, N)，该股票当天无K线时为 NaN
+            own_close: (L, N) 按每只股票自身K线顺序左对齐的收盘价，尾部以 NaN 补齐（用于计算指标）
+            rows: (L, N) own_close 每个位置在日期轴上的行号，补齐位置为 -1
+    """
+    codes = list(arrays_by_code)
+    if not codes:
+        raise ValueError("没有可对齐的K线")
+    own_dates = [np.asarray(arrays_by_code[c]['datetime']) for c in codes]
+    dates = np.unique(np.concatenate(own_dates))
+    t, n = len(dates), len(codes)
+    length = max(len(d) for d in own_dates)
+
+    open_price = np.full((t, n), np.nan)
+    close = np.full((t, n), np.nan)
+    own_close = np.full((length, n), np.nan)
+    rows = np.full((length, n), -1, dtype=np.int64)
+    for j, code in enumerate(codes):
+        arrays = arrays_by_code[code]
+        pos = np.searchsorted(dates, own_dates[j])
+        k = len(pos)
+        open_price[pos, j] = arrays['open']
+        close[pos, j] = arrays['close']
+        own_close[:k, j] = arrays['close']
+        rows[:k, j] = pos
+    return {
+        'codes': codes,
+        'dates': dates,
+        'open': open_price,
+        'close': close,
+        'own_close': own_close,
+        'rows': rows,
+    }
+
+
+# ==================== 截面信号内核 ====================
+# 每个内核接收 (L, N) 的左对齐收盘价和单个策略，返回 (L, N) 的 (buy, sell)；
+# 尾部补齐的 NaN 只影响补齐位置
+
+def _ema_cross_panel(close, strategy):
+    n = close.shape[1]
+    fast = ema(close, np.full(n, strategy.fast_period))
+    slow = ema(fast, np.full(n, strategy.slow_period))
+    return cross(fast, slow)
+
+
+def _macd_cross_panel(close, strategy):
+    n = close.shape[1]
+    dif = ema(close, np.full(n, strategy.fast_period)) - ema(close, np.full(n, strategy.slow_period))
+    dea = ema(dif, np.full(n, strategy.signal_period))
+    return cross(dif, dea)
+
+
+def _bollinger_panel(close, strategy):
+    mid = rolling_mean(close, strategy.n)
+    upper = mid + rolling_std(close, strategy.n) * strategy.k
+    up_buy, up_sell = cross(close, upper)
+    mid_buy, mid_sell = cross(mid, close)
+    value = (up_buy.astype(np.int8) - up_sell) - (mid_buy.astype(np.int8) - mid_sell)
+    return value > 0, value < 0
+
+
+# 策略类 -> 截面信号内核
+PANEL_KERNELS = {
+    EMACrossStrategy: _ema_cross_panel,
+    MACDStrategy: _macd_cross_panel,
+    BollingerBreakoutStrategy: _bollinger_panel,
+}
+
+
+def panel_signals(strategy, panel):
+    """计算全部股票的开仓/平仓事件
+
+    Returns:
+        tuple: (entry, exit)，形状 (T, N) 的布尔矩阵，表示当天开盘应开仓/平仓
+    """
+    kernel = PANEL_KERNELS.get(type(strategy))
+    if kernel is None:
+        raise ValueError(f"策略 {type(strategy).__name__} 没有组合回测实现")
+    buy, sell = kernel(panel['own_close'], strategy)
+    # 按每只股票自身的K线顺序得到持仓状态，状态变化即开仓/平仓，落到日期轴上
+    held = holdings_from_signals(buy, sell)
+    delta = np.diff(held, axis=0, prepend=0)
+
+    rows = panel['rows']
+    valid = rows >= 0
+    cols = np.broadcast_to(np.arange(rows.shape[1]), rows.shape)
+    shape = panel['open'].shape
+    entry = np.zeros(shape, dtype=bool)
+    exit_ = np.zeros(shape, dtype=bool)
+    entry[rows[valid], cols[valid]] = delta[valid] > 0
+    exit_[rows[valid], cols[valid]] = delta[valid] < 0
+    return entry, exit_
+
+
+# ==================== 共享资金模拟 ====================
+
+def _forward_fill(values):
+    """沿时间轴向前填充 NaN，首个有效值之前保持 NaN"""
+    t = values.shape[0]
+    idx = np.where(np.isnan(values), 0, np.arange(t)[:, None])
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return np.take_along_axis(values, idx, axis=0)
+
+
+def simulate_portfolio(panel, entry, exit_, init_cash=1000000, max_positions=10, weight=None, lot=100):
+    """沿时间轴模拟共享资金的组合
+
+    每天开盘：先执行全部平仓（收回现金），再按股票顺序执行开仓。每笔开仓的目标金额为
+    前一日收盘总资产 × weight，按整手向下取整；持仓数达到 max_positions 或资金不足时，
+    剩余的开仓被放弃。
+
+    Args:
+        panel: align_panel() 的结果
+        entry, exit_: panel_signals() 的结果
+        init_cash: 初始资金
+        max_positions: 同时持有的股票数上限
+        weight: 单只股票的目标仓位（占总资产比例），默认 1 / max_positions
+        lot: 每手股数
+
+    Returns:
+        dict: equity/cash/positions (T,)、holdings (T, N)、trades（TRADE_DTYPE）
+    """
+    weight = 1.0 / max_positions if weight is None else weight
+    open_price = panel['open']
+    mark = np.nan_to_num(_forward_fill(panel['close']))
+    t, n = open_price.shape
+
+    qty = np.zeros(n)
+    cash = float(init_cash)
+    prev_equity = float(init_cash)
+    equity = np.empty(t)
+    cash_curve = np.empty(t)
+    holdings = np.empty((t, n))
+    trades = []
+
+    for i in range(t):
+        price = open_price[i]
+        sell = np.flatnonzero(exit_[i] & (qty > 0))
+        if sell.size:
+            proceeds = qty[sell] * price[sell]
+            cash += float(proceeds.sum())
+            trades.append((i, sell, SELL, qty[sell].copy(), price[sell], cash))
+            qty[sell] = 0.0
+
+        buy = np.flatnonzero(entry[i] & (qty == 0))
+        slots = max_positions - int(np.count_nonzero(qty))
+        if buy.size and slots > 0:
+            buy = buy[:slots]
+            shares = np.floor(prev_equity * weight / (price[buy] * lot)) * lot
+            cost = shares * price[buy]
+            # 按股票顺序累计，资金不足处截止
+            ok = (shares > 0) & (np.cumsum(cost) <= cash)
+            if ok.any():
+                buy, shares, cost = buy[ok], shares[ok], cost[ok]
+                qty[buy] = shares
+                cash -= float(cost.sum())
+                trades.append((i, buy, BUY, shares, price[buy], cash))
+
+        holdings[i] = qty
+        cash_curve[i] = cash
+        equity[i] = prev_equity = cash + float(qty @ mark[i])
+
+    dates = np.asarray(panel['dates']).astype('M8[us]')
+    count = sum(len(stocks) for _, stocks, *_ in trades)
+    records = np.zeros(count, dtype=TRADE_DTYPE)
+    k = 0
+    for i, stocks, business, number, price, cash_after in trades:
+        m = len(stocks)
+        records[k:k + m] = [(dates[i], j, business, q, p, 0.0, cash_after)
+                            for j, q, p in zip(stocks.tolist(), number.tolist(), price.tolist())]
+        k += m
+    return {
+        'equity': equity,
+        'cash': cash_curve,
+        'holdings': holdings,
+        'positions': np.count_nonzero(holdings, axis=1),
+        'trades': records,
+    }
+
+
+def _trade_book(codes, trades, holdings):
+    """由模拟的成交记录构造 TradeBook，持仓成本取最后一次开仓的买入金额"""
+    last = holdings[-1] if len(holdings) else np.zeros(len(codes))
+    held = np.flatnonzero(last > 0)
+    positions = np.zeros(len(held), dtype=POSITION_DTYPE)
+    buys = trades[trades['business'] == BUY]
+    for k, j in enumerate(held.tolist()):
+        entry = buys[buys['stock'] == j][-1]
+        positions[k] = (j, last[j], entry['number'] * entry['price'], 0.0, 0.0, entry['datetime'])
+    return TradeBook(list(codes), trades, positions)
+
+
+def portfolio_backtest(strategy, data, init_cash=1000000, max_positions=10, weight=None, lot=100, ktype='DAY'):
+    """一篮子股票共享资金的组合回测
+
+    Args:
+        strategy: 策略对象（需在 PANEL_KERNELS 中）
+        data: {股票代码: kdata_arrays() 列字典}（见 load_panel()），或 KData 列表
+        init_cash: 初始资金
+        max_positions, weight, lot: 仓位限制，见 simulate_portfolio()
+        ktype: K线类型，用于年化
+
+    Returns:
+        dict:
+            results: 与 run_strategy_backtest() 字段一致的组合整体结果
+            by_stock: 每只股票一行（交易次数、已实现盈亏、浮动盈亏、期末持仓）
+            dates / codes / equity / cash / holdings / trades: 明细
+    """
+    if not isinstance(data, dict):
+        data = {k.get_stock().market_code: kdata_arrays(k) for k in data if len(k) > 0}
+    panel = align_panel(data)
+    entry, exit_ = panel_signals(strategy, panel)
+    sim = simulate_portfolio(panel, entry, exit_, init_cash, max_positions, weight, lot)
+
+    codes = panel['codes']
+    equity = sim['equity']
+    book = _trade_book(codes, sim['trades'], sim['holdings'])
+    last_close = np.nan_to_num(_forward_fill(panel['close'])[-1])
+    current_value = book.position_value(last_close)
+    current_cash = float(sim['cash'][-1])
+    total_asset = current_cash + current_value
+    total_return = total_asset - init_cash
+    traded_value = float(np.sum(sim['trades']['number'] * sim['trades']['price']))
+
+    results = {
+        'strategy_name': f"{strategy.get_description()} 组合({len(codes)}只, 上限{max_positions})",
+        'init_cash': init_cash,
+        'total_asset': total_asset,
+        'total_return': total_return,
+        'return_rate': total_return / init_cash * 100 if init_cash > 0 else 0.0,
+        'trade_count': book.trade_count(),
+        'current_cash': current_cash,
+        'current_value': current_value,
+    }
+    results.update(risk_metrics(equity, sim['positions'], traded_value, periods_per_year(ktype)))
+
+    realized = book.realized_pnl_by_stock()
+    trade_counts = book.trade_count_by_stock()
+    last = sim['holdings'][-1]
+    unrealized = last * last_close - book.open_cost_basis_by_stock()
+    by_stock = [{
+        'stock': code,
+        'trade_count': int(trade_counts[j]),
+        'realized_pnl': float(realized[j]),
+        'unrealized_pnl': float(unrealized[j]),
+        'position': float(last[j]),
+    } for j, code in enumerate(codes)]
+    by_stock.sort(key=lambda r: r['realized_pnl'] + r['unrealized_pnl'], reverse=True)
+
+    return {
+        'results': results,
+        'by_stock': by_stock,
+        'dates': panel['dates'],
+        'codes': codes,
+        'equity': equity,
+        'cash': sim['cash'],
+        'holdings': sim['holdings'],
+        'trades': sim['trades'],
+    }
+
+
+def print_portfolio_summary(result, top=10):
+    """打印组合回测结果"""
+    r = result['results']
+    print("\n" + "=" * 70)
+    print(f"组合回测: {r['strategy_name']}")
+    print("=" * 70)
+    print(f"初始资金:     {r['init_cash']:>14,.2f} 元")
+    print(f"期末总资产:   {r['total_asset']:>14,.2f} 元（现金 {r['current_cash']:,.2f}，持仓 {r['current_value']:,.2f}）")
+    print(f"总收益:       {r['total_return']:>+14,.2f} 元（{r['return_rate']:+.2f}%）")
+    print(f"交易次数:     {r['trade_count']:>14}")
+    print(f"最大回撤:     {r['max_drawdown'] * 100:>13.2f}%   夏普 {r['sharpe']:.2f}   "
+          f"持仓时间占比 {r['exposure'] * 100:.1f}%")
+    print("-" * 70)
+    print(f"{'股票':<12} {'交易':>6} {'已实现盈亏':>14} {'浮动盈亏':>14} {'期末持仓':>10}")
+    rows = result['by_stock']
+    for s in rows[:top] + (rows[-top:] if len(rows) > 2 * top else rows[top:]):
+        print(f"{s['stock']:<12} {s['trade_count']:>6} {s['realized_pnl']:>+14,.2f} "
+              f"{s['unrealized_pnl']:>+14,.2f} {s['position']:>10,.0f}")
+    print("=" * 70 + "\n")
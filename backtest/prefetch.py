@@ -0,0 +1,134 @@
+"""K线预取流水线
+
+逐只股票回测时，get_kdata 的读取/解码与 sys.run 的计算原本串行进行。KDataPrefetcher 用一个小线程池
+提前加载后面 depth 只股票的K线，当前股票回测的同时下一只已在读取；同时最多只有 depth 份K线在途，
+内存有上界（背压）。
+
+重叠的效果取决于加载函数执行期间是否释放 GIL（文件读取、np.load 内存映射等会释放）。
+"""
+
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class KDataPrefetcher:
+    """按顺序预取K线的迭代器
+
+    Example:
+        def load(code):
+            kdata = hku.get_stock(code).get_kdata(query)
+            len(kdata)          # 在线程中完成读取
+            return kdata
+
+        with KDataPrefetcher(codes, load, depth=4) as prefetcher:
+            for code, kdata, error in prefetcher:
+                ...
+        print(prefetcher.stats())
+    """
+
+    def __init__(self, items, loader, depth=4, threads=2):
+        """初始化预取器
+
+        Args:
+            items: 待加载的条目（如股票代码），按此顺序产出
+            loader: 加载函数 loader(item) -> 数据，在线程池中执行
+            depth: 最多提前加载的条目数（在途 + 已就绪未取走）
+            threads: 加载线程数
+        """
+        self.items = iter(items)
+        self.loader = loader
+        self.depth = max(1, depth)
+        self.threads = max(1, threads)
+        self._pool = None
+        self._window = deque()
+
+        self.consumed = 0
+        self.stalls = 0             # 取下一条时数据尚未就绪的次数
+        self.stall_time = 0.0       # 因此等待的总时间（秒）
+        self.ready_sum = 0          # 每次取数时已就绪条目数之和（用于平均队列深度）
+        self.ready_max = 0
+
+    def _fill(self):
+        while len(self._window) < self.depth:
+            try:
+                item = next(self.items)
+            except StopIteration:
+                return
+            self._window.append((item, self._pool.submit(self.loader, item)))
+
+    def __iter__(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='kdata-prefetch')
+            self._fill()
+        return self
+
+    def __next__(self):
+        if self._pool is None:
+            iter(self)
+        if not self._window:
+            self.close()
+            raise StopIteration
+
+        ready = sum(1 for _, future in self._window if future.done())
+        self.ready_sum += ready
+        self.ready_max = max(self.ready_max, ready)
+
+        item, future = self._window.popleft()
+        if not future.done():
+            self.stalls += 1
+            start = time.perf_counter()
+            future.exception()      # 等待完成
+            self.stall_time += time.perf_counter() - start
+        # 先补位再交给调用方，调用方计算期间下一条已在加载
+        self._fill()
+        self.consumed += 1
+
+        error = future.exception()
+        return item, (None if error is not None else future.result()), error
+
+    def close(self):
+        """停止预取（未开始的加载被取消）"""
+        if self._pool is not None:
+            for _, future in self._window:
+                future.cancel()
+            self._window.clear()
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def __enter__(self):
+        return iter(self)
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def stats(self):
+        """返回取数次数、等待次数/时间和队列深度统计"""
+        return {
+            'consumed': self.consumed,
+            'stalls': self.stalls,
+            'stall_time': self.stall_time,
+            'stall_rate': self.stalls / self.consumed if self.consumed else 0.0,
+            'queue_depth_mean': self.ready_sum / self.consumed if self.consumed else 0.0,
+            'queue_depth_max': self.ready_max,
+            'depth': self.depth,
+        }
+
+
+def merge_prefetch_stats(stats_list):
+    """合并多个预取器（如各工作进程）的统计"""
+    stats_list = [s for s in stats_list if s]
+    if not stats_list:
+        return {}
+    consumed = sum(s['consumed'] for s in stats_list)
+    stalls = sum(s['stalls'] for s in stats_list)
+    depth_sum = sum(s['queue_depth_mean'] * s['consumed'] for s in stats_list)
+    return {
+        'consumed': consumed,
+        'stalls': stalls,
+        'stall_time': sum(s['stall_time'] for s in stats_list),
+        'stall_rate': stalls / consumed if consumed else 0.0,
+        'queue_depth_mean': depth_sum / consumed if consumed else 0.0,
+        'queue_depth_max': max(s['queue_depth_max'] for s in stats_list),
+        'depth': max(s['depth'] for s in stats_list),
+    }
@@ -0,0 +1,164 @@
+"""回测热点路径计时
+
+PhaseRecorder 记录每个阶段的墙钟时间、CPU 时间和（可选的）内存峰值，结果挂在回测结果字典的
+'phases' 键下。未开启时使用 NULL_RECORDER，phase() 直接返回同一个空上下文，不产生额外开销。
+
+profile_run() 在此之上提供 cProfile / tracemalloc 采样，把每个策略的剖析结果写到目录中。
+"""
+
+import cProfile
+import os
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+
+_NULL_CONTEXT = nullcontext()
+
+
+class NullRecorder:
+    """不记录任何内容的计时器（默认）"""
+
+    enabled = False
+
+    def phase(self, name):
+        return _NULL_CONTEXT
+
+    def as_dict(self):
+        return {}
+
+
+NULL_RECORDER = NullRecorder()
+
+
+class PhaseRecorder:
+    """分阶段计时器
+
+    同名阶段多次出现时累加；阶段可以嵌套，外层阶段的耗时包含内层。
+
+    Example:
+        recorder = PhaseRecorder(memory=True)
+        with recorder.phase('sys.run'):
+            sys.run(kdata)
+        recorder.as_dict()  # {'sys.run': {'wall': ..., 'cpu': ..., 'peak_kb': ..., 'calls': 1}}
+    """
+
+    enabled = True
+
+    def __init__(self, memory=False):
+        """初始化计时器
+
+        Args:
+            memory: 是否用 tracemalloc 记录每个阶段的内存峰值（有明显开销，只在排查时开启）
+        """
+        self.memory = memory
+        self.records = {}
+        self._stack = []
+
+    @contextmanager
+    def phase(self, name):
+        """计时一个阶段"""
+        tracing = self.memory and tracemalloc.is_tracing()
+        if tracing:
+            # 嵌套阶段会重置峰值，先把目前的峰值记到外层阶段上
+            current, peak = tracemalloc.get_traced_memory()
+            for frame in self._stack:
+                frame['peak'] = max(frame['peak'], peak)
+            tracemalloc.reset_peak()
+            frame = {'start': current, 'peak': current}
+            self._stack.append(frame)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            rec = self.records.setdefault(name, {'wall': 0.0, 'cpu': 0.0, 'calls': 0})
+            rec['wall'] += wall
+            rec['cpu'] += cpu
+            rec['calls'] += 1
+            if tracing:
+                self._stack.pop()
+                _, peak = tracemalloc.get_traced_memory()
+                peak_kb = (max(frame['peak'], peak) - frame['start']) / 1024
+                rec['peak_kb'] = max(rec.get('peak_kb', 0.0), peak_kb)
+
+    def as_dict(self):
+        """阶段名 -> {'wall', 'cpu', 'calls'[, 'peak_kb']}（时间单位为秒）"""
+        return {name: dict(rec) for name, rec in self.records.items()}
+
+
+def make_recorder(instrument):
+    """根据 instrument 参数返回计时器
+
+    Args:
+        instrument: False 不计时；True 记录时间；'memory' 同时记录内存峰值
+    """
+    if not instrument:
+        return NULL_RECORDER
+    return PhaseRecorder(memory=(instrument == 'memory'))
+
+
+@contextmanager
+def memory_tracing(enabled):
+    """在需要时启动 tracemalloc，退出时恢复原状态"""
+    started = enabled and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        yield
+    finally:
+        if started:
+            tracemalloc.stop()
+
+
+def _profile_name(label):
+    return re.sub(r'[^\w.-]+', '_', label).strip('_')[:80] or 'strategy'
+
+
+@contextmanager
+def profile_run(profile_dir, label, top=25):
+    """对一段代码做 cProfile 剖析和 tracemalloc 内存快照
+
+    写出 <label>-<pid>.prof（可用 pstats / snakeviz 查看）和 <label>-<pid>.mem.txt（分配最多的代码行）。
+
+    Args:
+        profile_dir: 输出目录，None 表示不剖析
+        label: 文件名前缀，通常为策略描述
+        top: 内存快照中输出的行数
+    """
+    if profile_dir is None:
+        yield
+        return
+
+    os.makedirs(profile_dir, exist_ok=True)
+    base = os.path.join(profile_dir, f"{_profile_name(label)}-{os.getpid()}")
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(base + '.prof')
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if started:
+            tracemalloc.stop()
+        with open(base + '.mem.txt', 'w', encoding='utf-8') as f:
+            f.write(f"{label}\n峰值内存: {peak / 1024:.1f} KB\n\n")
+            for stat in snapshot.statistics('lineno')[:top]:
+                f.write(f"{stat}\n")
+
+
+def format_phases(phases):
+    """把 'phases' 字典格式化为多行文本"""
+    lines = [f"{'阶段':<24} {'墙钟(ms)':>10} {'CPU(ms)':>10} {'次数':>6} {'内存峰值(KB)':>14}"]
+    for name, rec in phases.items():
+        peak = f"{rec['peak_kb']:>14,.1f}" if 'peak_kb' in rec else f"{'-':>14}"
+        lines.append(f"{name:<24} {rec['wall'] * 1000:>10.3f} {rec['cpu'] * 1000:>10.3f} {rec['calls']:>6} {peak}")
+    return "\n".join(lines)
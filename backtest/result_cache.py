@@ -0,0 +1,166 @@
+"""回测结果缓存
+
+以 (策略类, 策略参数, 初始资金, 股票, K线类型, 复权方式, K线区间, 最后一根K线的数值) 的哈希为键，
+把回测结果存入本地 SQLite 文件。策略参数和K线都没变时直接返回存储的结果和指标，不再回测；
+K线更新或修正后最后一根K线的数值或区间变化，键随之改变，旧结果自然不再命中。
+
+总大小超过预算时按最近访问时间淘汰最久未用的结果。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from strategies.indicators import kdata_key
+
+from .store import strategy_params
+
+
+# 默认缓存预算：64MB
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _json_default(value):
+    # NumPy 标量等
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class ResultCache:
+    """基于 SQLite 的回测结果缓存
+
+    Example:
+        cache = ResultCache('.cache/results.sqlite')
+        results = compare_strategies(strategies, kdata, result_cache=cache)
+        print(cache.stats())
+    """
+
+    def __init__(self, path='.backtest_cache.sqlite', max_bytes=DEFAULT_MAX_BYTES):
+        """初始化结果缓存
+
+        Args:
+            path: SQLite 文件路径
+            max_bytes: 缓存总大小上限（按存储的 JSON 字节数计）
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def key(strategy, kdata, init_cash):
+        """结果的内容哈希"""
+        cls = type(strategy)
+        if len(kdata) > 0:
+            last = kdata[-1]
+            last_bar = [last.open, last.high, last.low, last.close, last.volume, last.amount]
+        else:
+            last_bar = []
+        content = {
+            'class': f"{cls.__module__}.{cls.__qualname__}",
+            'description': strategy.get_description(),
+            'params': strategy_params(strategy),
+            'init_cash': init_cash,
+            'kdata': list(kdata_key(kdata)),
+            'last_bar': last_bar,
+        }
+        text = json.dumps(content, sort_keys=True, ensure_ascii=False, default=_json_default)
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """取出结果，未命中返回 None"""
+        row = self.conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+        self.conn.commit()
+        return json.loads(row[0])
+
+    def put(self, key, result):
+        """存入结果，超出预算时淘汰最久未访问的结果"""
+        value = json.dumps(result, ensure_ascii=False, default=_json_default)
+        now = time.time()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO results (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+            (key, value, len(value.encode('utf-8')), now, now))
+        self._evict()
+        self.conn.commit()
+
+    def _evict(self):
+        total = self.nbytes()
+        if total <= self.max_bytes:
+            return
+        evict = []
+        for key, size in self.conn.execute("SELECT key, size FROM results ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            evict.append((key,))
+            total -= size
+        self.conn.executemany("DELETE FROM results WHERE key = ?", evict)
+        self.evictions += len(evict)
+
+    def lookup(self, strategy, kdata, init_cash):
+        """按策略和K线取结果（返回副本，调用方可以修改）"""
+        return self.get(self.key(strategy, kdata, init_cash))
+
+    def store(self, strategy, kdata, init_cash, result):
+        """按策略和K线存入结果"""
+        self.put(self.key(strategy, kdata, init_cash), result)
+
+    def nbytes(self):
+        """当前缓存的总字节数"""
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def stats(self):
+        """返回命中/未命中/淘汰次数、条目数和占用字节数"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': len(self),
+            'nbytes': self.nbytes(),
+            'max_bytes': self.max_bytes,
+        }
+
+    def clear(self):
+        """清空缓存"""
+        self.conn.execute("DELETE FROM results")
+        self.conn.commit()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __getstate__(self):
+        # 连接不可 pickle，传到其它进程后重新打开
+        state = self.__dict__.copy()
+        state['_conn'] = None
+        return state
@@ -0,0 +1,214 @@
+"""蒙特卡洛稳健性分析
+
+单次回测只是一条路径。这里把回测的逐笔盈亏（或逐K线收益率）重抽样成成千上万条资产路径，
+一次性用 NumPy 批量计算每条路径的收益率、最大回撤和是否"破产"（资产跌破初始资金的一定比例），
+得到收益和回撤的置信区间以及破产概率。
+
+三种抽样方式：
+- bootstrap：逐笔盈亏有放回抽样，笔数不变（收益和回撤都会变化）
+- permutation：逐笔盈亏随机重排（总收益不变，只看交易顺序对回撤的影响）
+- block：逐K线收益率按块有放回抽样，保留块内的自相关
+"""
+
+import numpy as np
+
+from .metrics import bar_returns, max_drawdown
+from .trades import BUY
+
+
+# 每批最多处理的路径数，限制 (路径数 × 长度) 中间数组的内存
+_BATCH = 2000
+
+
+def trade_pnl(book, prices=0.0):
+    """逐笔平仓盈亏（平均成本法）
+
+    每笔卖出的盈亏 = 卖出金额 - 交易成本 - 平均持仓成本 × 卖出数量；
+    期末仍有持仓时，按 prices 估值的浮动盈亏作为最后一笔。全部盈亏之和等于总收益。
+
+    Args:
+        book: TradeBook
+        prices: 标量（单只股票）或与 book.codes 对齐的期末价格数组
+
+    Returns:
+        np.ndarray: 按卖出顺序排列的盈亏金额
+    """
+    n_codes = len(book.codes)
+    prices = np.broadcast_to(np.asarray(prices, dtype=np.float64), (n_codes,))
+    qty = np.zeros(n_codes)
+    basis = np.zeros(n_codes)   # 持仓成本（含买入成本）
+
+    pnl = []
+    t = book.trades[book.buys | book.sells]
+    for stock, business, number, price, cost in zip(
+            t['stock'].tolist(), t['business'].tolist(), t['number'].tolist(),
+            t['price'].tolist(), t['cost'].tolist()):
+        if stock < 0:
+            continue
+        if business == BUY:
+            qty[stock] += number
+            basis[stock] += number * price + cost
+        elif qty[stock] > 0:
+            avg = basis[stock] / qty[stock]
+            number = min(number, qty[stock])
+            pnl.append(number * price - cost - avg * number)
+            qty[stock] -= number
+            basis[stock] -= avg * number
+
+    open_pnl = qty * prices - basis
+    held = qty > 0
+    if np.any(held):
+        pnl.append(float(open_pnl[held].sum()))
+    return np.asarray(pnl, dtype=np.float64)
+
+
+def _path_stats(equity, init_cash, ruin_level):
+    """一批路径的收益率、最大回撤和是否破产
+
+    Args:
+        equity: (路径数, 长度) 资产路径，不含起点
+    """
+    start = np.full((equity.shape[0], 1), float(init_cash))
+    full = np.hstack([start, equity])
+    return (
+        (full[:, -1] - init_cash) / init_cash * 100,
+        max_drawdown(full.T),
+        full.min(axis=1) <= init_cash * (1.0 - ruin_level),
+    )
+
+
+def _collect(batches):
+    return_rate, drawdown, ruined = (np.concatenate(parts) for parts in zip(*batches))
+    return {'return_rate': return_rate, 'max_drawdown': drawdown, 'ruined': ruined}
+
+
+def resample_trades(pnl, init_cash, n=10000, method='bootstrap', ruin_level=0.5, seed=0):
+    """逐笔盈亏重抽样
+
+    Args:
+        pnl: trade_pnl() 的结果
+        init_cash: 初始资金
+        n: 抽样路径数
+        method: 'bootstrap'（有放回）或 'permutation'（随机重排）
+        ruin_level: 资产跌破初始资金的 (1 - ruin_level) 倍即视为破产，0.5 表示亏损一半
+        seed: 随机种子（默认固定，结果可复现）
+
+    Returns:
+        dict: return_rate（%）、max_drawdown、ruined 三个 (n,) 数组
+    """
+    pnl = np.asarray(pnl, dtype=np.float64)
+    k = len(pnl)
+    if k == 0:
+        return _collect([_path_stats(np.full((n, 1), float(init_cash)), init_cash, ruin_level)])
+    rng = np.random.default_rng(seed)
+    batches = []
+    for size in _batch_sizes(n):
+        if method == 'bootstrap':
+            sample = pnl[rng.integers(0, k, size=(size, k))]
+        elif method == 'permutation':
+            sample = rng.permuted(np.broadcast_to(pnl, (size, k)), axis=1)
+        else:
+            raise ValueError(f"未知抽样方式: {method}")
+        batches.append(_path_stats(init_cash + np.cumsum(sample, axis=1), init_cash, ruin_level))
+    return _collect(batches)
+
+
+def resample_returns(equity, init_cash, n=10000, block=20, ruin_level=0.5, seed=0):
+    """逐K线收益率的分块有放回抽样（moving block bootstrap）
+
+    Args:
+        equity: 逐K线资产序列
+        block: 块长度（K线数），保留块内的波动聚集和趋势
+        其它参数见 resample_trades()
+
+    Returns:
+        dict: 同 resample_trades()
+    """
+    returns = bar_returns(equity)
+    t = len(returns)
+    if t == 0:
+        return _collect([_path_stats(np.full((n, 1), float(init_cash)), init_cash, ruin_level)])
+    block = max(1, min(block, t))
+    n_blocks = -(-t // block)
+    rng = np.random.default_rng(seed)
+    offsets = np.arange(block)
+    batches = []
+    for size in _batch_sizes(n):
+        starts = rng.integers(0, t - block + 1, size=(size, n_blocks))
+        index = (starts[:, :, None] + offsets).reshape(size, -1)[:, :t]
+        growth = np.cumprod(1.0 + returns[index], axis=1)
+        batches.append(_path_stats(init_cash * growth, init_cash, ruin_level))
+    return _collect(batches)
+
+
+def _batch_sizes(n):
+    return [min(_BATCH, n - i) for i in range(0, n, _BATCH)]
+
+
+def confidence_summary(samples, ci=0.95):
+    """把抽样结果汇总为置信区间
+
+    Returns:
+        dict: 收益率均值与区间、回撤中位数与上界、破产概率
+    """
+    alpha = (1.0 - ci) / 2 * 100
+    rates = samples['return_rate']
+    drawdown = samples['max_drawdown']
+    lo, hi = np.percentile(rates, [alpha, 100 - alpha])
+    return {
+        'resamples': len(rates),
+        'ci': ci,
+        'return_mean': float(rates.mean()),
+        'return_lo': float(lo),
+        'return_hi': float(hi),
+        'drawdown_median': float(np.median(drawdown)),
+        'drawdown_hi': float(np.percentile(drawdown, ci * 100)),
+        'ruin_prob': float(samples['ruined'].mean()),
+    }
+
+
+def robustness_summary(engine, kdata, n=10000, method='bootstrap', ci=0.95, ruin_level=0.5, block=20, seed=0):
+    """对一次 BacktestEngine 回测做稳健性分析
+
+    Args:
+        engine: 已运行回测的 BacktestEngine
+        kdata: 回测使用的K线
+        n: 抽样路径数
+        method: 'bootstrap' / 'permutation'（逐笔盈亏）或 'block'（逐K线收益率）
+        ci: 置信水平
+        ruin_level: 破产阈值，见 resample_trades()
+        block: method='block' 时的块长度
+        seed: 随机种子
+
+    Returns:
+        dict: confidence_summary() 的结果，另含 method、抽样路径数 resamples 和参与抽样的交易笔数 trades
+    """
+    init_cash = engine.tm.init_cash
+    if method == 'block':
+        samples = resample_returns(engine.equity_curve(kdata)['equity'], init_cash, n, block, ruin_level, seed)
+        trades = engine.trade_book().trade_count()
+    else:
+        last_close = kdata[-1].close if len(kdata) > 0 else 0.0
+        pnl = trade_pnl(engine.trade_book(), last_close)
+        samples = resample_trades(pnl, init_cash, n, method, ruin_level, seed)
+        trades = len(pnl)
+    summary = confidence_summary(samples, ci)
+    summary.update(method=method, resamples=n, trades=trades)
+    return summary
+
+
+def format_robustness(results):
+    """把带 'robustness' 的对比结果格式化为表格文本"""
+    rows = [r for r in results if r.get('robustness')]
+    if not rows:
+        return ""
+    ci = rows[0]['robustness']['ci']
+    lines = [f"{'策略名称':<40} {'笔数':>5} {f'收益率 {ci:.0%} 区间':>24} {'回撤中位数':>10} "
+             f"{f'回撤 P{ci * 100:.0f}':>10} {'破产概率':>8}"]
+    for r in rows:
+        m = r['robustness']
+        lines.append(f"{r['strategy_name']:<40} {m['trades']:>5} "
+                     f"{m['return_lo']:>+10.2f}% ~ {m['return_hi']:>+10.2f}% "
+                     f"{m['drawdown_median'] * 100:>9.2f}% {m['drawdown_hi'] * 100:>9.2f}% "
+                     f"{m['ruin_prob'] * 100:>7.2f}%")
+    return "\n".join(lines)
@@ -0,0 +1,270 @@
+"""回测运行与策略对比"""
+
+import time
+
+from .engine import BacktestEngine
+from .profiling import format_phases, make_recorder, memory_tracing, profile_run
+from .robustness import format_robustness, robustness_summary
+
+
+def get_backtest_results(engine, kdata, resamples=0):
+    """提取回测结果数据
+
+    Args:
+        engine: 已运行回测的 BacktestEngine
+        kdata: K线数据
+        resamples: 大于 0 时对逐笔盈亏做该次数的自助抽样，稳健性结果放在 'robustness' 键下
+    """
+    if engine.tm is None:
+        return None
+    
+    init_cash = engine.tm.init_cash
+    current_cash = engine.tm.current_cash
+    
+    # 持仓市值与交易次数都取自一次性提取的列式交易记录
+    book = engine.trade_book()
+    current_price = kdata[-1].close if len(kdata) > 0 else 0
+    current_value = book.position_value(current_price)
+    
+    total_asset = current_cash + current_value
+    total_return = total_asset - init_cash
+    return_rate = (total_return / init_cash * 100) if init_cash > 0 else 0
+    
+    trade_count = book.trade_count()
+    
+    results = {
+        'init_cash': init_cash,
+        'total_asset': total_asset,
+        'total_return': total_return,
+        'return_rate': return_rate,
+        'trade_count': trade_count,
+        'current_cash': current_cash,
+        'current_value': current_value
+    }
+    
+    # 基于逐K线资产序列的风险指标
+    try:
+        results.update(engine.risk_metrics(kdata))
+    except Exception as e:
+        print(f"计算风险指标失败: {e}")
+    
+    if resamples:
+        try:
+            with engine.recorder.phase('robustness'):
+                results['robustness'] = robustness_summary(engine, kdata, n=resamples)
+        except Exception as e:
+            print(f"稳健性分析失败: {e}")
+    
+    return results
+
+
+def run_strategy_backtest(strategy, kdata, init_cash=300000, verbose=False, instrument=False,
+                          profile_dir=None, result_cache=None, resamples=0):
+    """运行单个策略的回测
+
+    Args:
+        strategy: 策略对象
+        kdata: K线数据
+        init_cash: 初始资金
+        verbose: 是否输出详细过程
+        instrument: False 不计时；True 记录各阶段墙钟/CPU 时间；'memory' 同时记录内存峰值，
+                    结果放在返回字典的 'phases' 键下
+        profile_dir: 给出时对本次回测做 cProfile/tracemalloc 剖析，结果写入该目录
+        result_cache: ResultCache 对象，给出时先查缓存，命中直接返回存储的结果；
+                      verbose / instrument / profile_dir 开启时不使用缓存
+        resamples: 稳健性分析的抽样次数，0 表示不做，见 robustness.robustness_summary()
+    """
+    cache_key = None
+    if result_cache is not None and not (verbose or instrument or profile_dir):
+        cache_key = result_cache.key(strategy, kdata, init_cash)
+        cached = result_cache.get(cache_key)
+        if _usable(cached, resamples):
+            return cached
+
+    if verbose:
+        print(f"\n{'='*60}")
+        print(f"测试策略: {strategy.get_description()}")
+        print(f"{'='*60}")
+    
+    recorder = make_recorder(instrument)
+    start = time.perf_counter()
+
+    with profile_run(profile_dir, strategy.get_description()), \
+            memory_tracing(recorder.enabled and recorder.memory):
+        # 创建交易信号和资金管理
+        with recorder.phase('create_signal'):
+            sg = strategy.create_signal(kdata)
+        with recorder.phase('create_money_manager'):
+            mm = strategy.create_money_manager()
+        
+        # 创建回测引擎
+        with recorder.phase('create_trade_system'):
+            engine = BacktestEngine(init_cash=init_cash, recorder=recorder)
+            engine.create_trade_account()
+            engine.create_trade_system(sg, mm)
+        
+        # 运行回测
+        with recorder.phase('sys.run'):
+            if verbose:
+                engine.run(kdata)
+            else:
+                engine.sys.run(kdata)
+        
+        # 获取结果
+        with recorder.phase('get_backtest_results'):
+            results = get_backtest_results(engine, kdata, resamples)
+    
+    if results:
+        results['elapsed'] = time.perf_counter() - start
+        if recorder.enabled:
+            results['phases'] = recorder.as_dict()
+        if cache_key is not None:
+            result_cache.put(cache_key, results)
+    
+    if verbose:
+        engine.print_results(kdata)
+        if recorder.enabled:
+            print(format_phases(recorder.as_dict()))
+    
+    return results
+
+
+def _usable(cached, resamples):
+    """缓存的结果是否可用：需要稳健性分析时，缓存结果中也必须有且抽样次数相同"""
+    if cached is None:
+        return False
+    return not resamples or cached.get('robustness', {}).get('resamples') == resamples
+
+
+def cached_results(result_cache, strategies, kdata, init_cash, resamples=0):
+    """从结果缓存中取出已有的结果
+
+    Returns:
+        list: 与 strategies 等长，未命中（或未给出缓存）的位置为 None
+    """
+    if result_cache is None:
+        return [None] * len(strategies)
+    cached = [result_cache.lookup(s, kdata, init_cash) for s in strategies]
+    return [r if _usable(r, resamples) else None for r in cached]
+
+
+def parallel_results(strategies, kdata, init_cash, workers, kdata_cache=None, instrument=False, profile_dir=None,
+                     result_cache=None, resamples=0):
+    """在进程池中回测，结果缓存中已有的策略直接取结果，新结果写回缓存
+
+    Returns:
+        list: 与 strategies 等长，失败的位置为 None
+    """
+    from .parallel import ParallelComparator
+    mapped = cached_results(result_cache, strategies, kdata, init_cash, resamples)
+    todo = [i for i, r in enumerate(mapped) if r is None]
+    computed = ParallelComparator(workers=workers, kdata_cache=kdata_cache).map(
+        [strategies[i] for i in todo], kdata, init_cash, instrument=instrument, profile_dir=profile_dir,
+        resamples=resamples)
+    for i, result in zip(todo, computed):
+        mapped[i] = result
+        if result and result_cache is not None:
+            result_cache.store(strategies[i], kdata, init_cash, result)
+    return mapped
+
+
+def compare_strategies(strategies, kdata, init_cash=300000, verbose=False, workers=None, store=None,
+                       kdata_cache=None, instrument=False, profile_dir=None, result_cache=None,
+                       resamples=0):
+    """批量测试并对比多个策略
+
+    Args:
+        strategies: 策略列表
+        kdata: K线数据
+        init_cash: 初始资金
+        verbose: 是否输出详细过程（并行模式下忽略）
+        workers: 并行进程数，None 或 1 表示在当前进程内顺序执行
+        store: ResultStore 对象，给出时每条结果同时追加写入列式存储
+        kdata_cache: KDataCache 对象，并行模式下工作进程从磁盘缓存取K线
+        instrument: 分阶段计时，见 run_strategy_backtest()
+        profile_dir: 给出时每个策略的 cProfile/tracemalloc 剖析结果写入该目录
+        result_cache: ResultCache 对象，已缓存的策略直接取结果，只回测未命中的策略
+        resamples: 每个策略逐笔盈亏的自助抽样次数（收益/回撤置信区间和破产概率），0 表示不做
+
+    Returns:
+        list: 回测结果列表，顺序与 strategies 一致（失败的策略不在其中）
+    """
+    if workers is not None and workers > 1:
+        mapped = parallel_results(strategies, kdata, init_cash, workers, kdata_cache, instrument, profile_dir,
+                                  result_cache, resamples)
+        pairs = [(s, r) for s, r in zip(strategies, mapped) if r]
+        for strategy, result in pairs:
+            result['strategy_name'] = strategy.get_description()
+    else:
+        pairs = []
+        for strategy in strategies:
+            try:
+                result = run_strategy_backtest(strategy, kdata, init_cash, verbose, instrument, profile_dir,
+                                               result_cache, resamples)
+                if result:
+                    result['strategy_name'] = strategy.get_description()
+                    pairs.append((strategy, result))
+            except Exception as e:
+                print(f"策略 {strategy.get_description()} 测试失败: {e}")
+                import traceback
+                traceback.print_exc()
+
+    if store is not None:
+        for strategy, result in pairs:
+            store.append(result, strategy, kdata)
+
+    return [result for _, result in pairs]
+
+
+def print_comparison_table(results):
+    """打印策略对比表格"""
+    if not results:
+        print("没有可对比的结果")
+        return
+    
+    print("\n" + "="*120)
+    print("策略对比结果")
+    print("="*120)
+    print(f"{'策略名称':<40} {'初始资金':>12} {'总资产':>12} {'总收益':>12} {'收益率':>10} {'交易次数':>8} {'最大回撤':>8} {'夏普':>6}")
+    print("-"*120)
+    
+    for r in results:
+        print(f"{r['strategy_name']:<40} "
+              f"{r['init_cash']:>12,.2f} "
+              f"{r['total_asset']:>12,.2f} "
+              f"{r['total_return']:>+12,.2f} "
+              f"{r['return_rate']:>+9.2f}% "
+              f"{r['trade_count']:>8} "
+              f"{r.get('max_drawdown', 0.0) * 100:>7.2f}% "
+              f"{r.get('sharpe', 0.0):>6.2f}")
+    
+    print("-"*120)
+    
+    # 找出最佳策略
+    if len(results) > 1:
+        best_by_return = max(results, key=lambda x: x['total_return'])
+        best_by_rate = max(results, key=lambda x: x['return_rate'])
+        
+        print(f"\n最佳总收益策略: {best_by_return['strategy_name']}")
+        print(f"  总收益: {best_by_return['total_return']:,.2f} 元, "
+              f"收益率: {best_by_return['return_rate']:.2f}%")
+        
+        if best_by_return != best_by_rate:
+            print(f"\n最佳收益率策略: {best_by_rate['strategy_name']}")
+            print(f"  总收益: {best_by_rate['total_return']:,.2f} 元, "
+                  f"收益率: {best_by_rate['return_rate']:.2f}%")
+        
+        if all('sharpe' in r for r in results):
+            best_by_sharpe = max(results, key=lambda x: x['sharpe'])
+            print(f"\n最佳风险调整收益策略: {best_by_sharpe['strategy_name']}")
+            print(f"  夏普比率: {best_by_sharpe['sharpe']:.2f}, "
+                  f"最大回撤: {best_by_sharpe['max_drawdown'] * 100:.2f}%, "
+                  f"收益率: {best_by_sharpe['return_rate']:.2f}%")
+    
+    table = format_robustness(results)
+    if table:
+        print("-"*120)
+        print("稳健性分析（逐笔盈亏自助抽样）")
+        print(table)
+    
+    print("="*120 + "\n")
@@ -0,0 +1,158 @@
+"""列式回测结果存储
+
+把回测结果逐行追加到 Parquet 文件（按 row group 批量写入），之后可直接用 pyarrow/pandas
+对成千上万次回测做筛选和排名，而不必重跑或解析打印出来的表格。
+
+每个 ResultStore 在目录下写一个独立的 part 文件，多次运行的结果自然累积，
+用 load_results(目录) 一次读出全部。
+"""
+
+import json
+import os
+import uuid
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from strategies.indicators import kdata_key
+
+
+# 固定列；参数统一存为 JSON 字符串，另可通过 param_columns 声明需要展开为数值列的参数
+RESULT_FIELDS = [
+    ('recorded_at', pa.timestamp('ms')),
+    ('strategy_class', pa.string()),
+    ('strategy_name', pa.string()),
+    ('params', pa.string()),
+    ('stock', pa.string()),
+    ('ktype', pa.string()),
+    ('start', pa.string()),
+    ('end', pa.string()),
+    ('bars', pa.int64()),
+    ('init_cash', pa.float64()),
+    ('total_asset', pa.float64()),
+    ('total_return', pa.float64()),
+    ('return_rate', pa.float64()),
+    ('trade_count', pa.int64()),
+    ('current_cash', pa.float64()),
+    ('current_value', pa.float64()),
+    ('max_drawdown', pa.float64()),
+    ('volatility', pa.float64()),
+    ('sharpe', pa.float64()),
+    ('sortino', pa.float64()),
+    ('exposure', pa.float64()),
+    ('turnover', pa.float64()),
+    ('elapsed', pa.float64()),
+    ('phases', pa.string()),    # 分阶段计时（instrument 开启时），JSON 字符串
+    ('robustness', pa.string()),  # 稳健性分析（resamples 大于 0 时），JSON 字符串
+]
+
+
+def strategy_params(strategy):
+    """提取策略的构造参数（策略实例上的标量属性）"""
+    return {k: v for k, v in vars(strategy).items()
+            if not k.startswith('_') and isinstance(v, (bool, int, float, str))}
+
+
+class ResultStore:
+    """回测结果的 Parquet 追加写入器
+
+    Example:
+        with ResultStore('results/ema_sweep', param_columns=['fast_period', 'slow_period']) as store:
+            sweep(EMACrossStrategy, grid, kdata, store=store)
+        df = load_results('results/ema_sweep').to_pandas()
+    """
+
+    def __init__(self, root, param_columns=None, row_group_size=10000):
+        """初始化结果存储
+
+        Args:
+            root: 存储目录
+            param_columns: 需要展开为独立数值列的参数名（列名为 param_<参数名>）
+            row_group_size: 缓冲多少行后写出一个 row group
+        """
+        self.root = root
+        self.param_columns = list(param_columns or [])
+        self.row_group_size = row_group_size
+        fields = list(RESULT_FIELDS) + [(f'param_{name}', pa.float64()) for name in self.param_columns]
+        self.schema = pa.schema(fields)
+        self.path = os.path.join(
+            root, f"part-{datetime.now():%Y%m%d%H%M%S}-{os.getpid()}-{uuid.uuid4().hex[:8]}.parquet")
+        self._rows = []
+        self._writer = None
+        self.rows_written = 0
+
+    def append(self, result, strategy, kdata=None, **fields):
+        """追加一条回测结果
+
+        Args:
+            result: run_strategy_backtest() 返回的结果字典
+            strategy: 策略对象
+            kdata: K线数据，用于记录股票代码、K线类型和起止时间
+            fields: 直接指定的列值（如无 kdata 时的 stock、ktype），优先于从 kdata 推导的值
+        """
+        params = strategy_params(strategy)
+        row = {
+            'recorded_at': datetime.now(),
+            'strategy_class': type(strategy).__name__,
+            'strategy_name': result.get('strategy_name') or strategy.get_description(),
+            'params': json.dumps(params, ensure_ascii=False, sort_keys=True),
+        }
+        if kdata is not None:
+            stock, ktype, _, start, end, bars = kdata_key(kdata)
+            row.update(stock=stock, ktype=ktype, start=start, end=end, bars=bars)
+        for name, _ in RESULT_FIELDS:
+            if name in result and name not in row:
+                row[name] = result[name]
+        for name in ('phases', 'robustness'):
+            if isinstance(row.get(name), dict):
+                row[name] = json.dumps(row[name], sort_keys=True)
+        for name in self.param_columns:
+            value = params.get(name)
+            row[f'param_{name}'] = float(value) if isinstance(value, (int, float)) else None
+        row.update(fields)
+
+        self._rows.append(row)
+        if len(self._rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """把缓冲区写出为一个 row group"""
+        if not self._rows:
+            return
+        if self._writer is None:
+            os.makedirs(self.root, exist_ok=True)
+            self._writer = pq.ParquetWriter(self.path, self.schema)
+        table = pa.Table.from_pylist(self._rows, schema=self.schema)
+        self._writer.write_table(table)
+        self.rows_written += len(self._rows)
+        self._rows = []
+
+    def close(self):
+        """写出剩余数据并关闭文件"""
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def load_results(root, columns=None, filters=None):
+    """读取结果目录（或单个文件）中的所有回测结果
+
+    Args:
+        root: 存储目录或 Parquet 文件路径
+        columns: 只读取这些列
+        filters: pyarrow 过滤条件，如 [('return_rate', '>', 10)]
+
+    Returns:
+        pyarrow.Table
+
+    同一目录下的文件应使用相同的 param_columns，否则列不一致无法合并读取。
+    """
+    return pq.read_table(root, columns=columns, filters=filters)
@@ -0,0 +1,502 @@
+"""增量（流式）回测
+
+每天收盘新增一根K线时，不再从第一根K线重跑 sys.run，而是保留指标递推状态、信号状态和账户状态，
+每根新K线只做 O(1) 的更新。状态可以保存到磁盘，夜间只需加载、追加当天的K线、再保存。
+
+模拟口径与 vectorized.simulate_fixed_count 相同（固定数量、下一根开盘成交、不计成本），
+用同一段K线逐根回放得到的收益、交易次数与 fast_backtest 一致。
+
+Example:
+    wl = StreamingWatchlist(EMACrossStrategy(5, 10))
+    for code in codes:
+        wl.warm_up(code, hku.get_stock(code).get_kdata(hku.Query(-500)))
+    wl.save('state/ema.pkl')
+    # 之后每天：
+    wl = StreamingWatchlist.load('state/ema.pkl')
+    for code, bar in today_bars.items():
+        wl.append(code, *bar)
+    wl.save('state/ema.pkl')
+"""
+
+import math
+import os
+import pickle
+from collections import deque
+
+import numpy as np
+
+from strategies import EMACrossStrategy, MACDStrategy, expr
+from strategies.all_strategies import BollingerBreakoutStrategy, EMACrossWithADXFilterStrategy
+
+from .vectorized import kdata_arrays
+
+
+# ==================== 指标递推状态 ====================
+
+class EMAState:
+    """指数移动平均，与 hku.EMA 一致：首值等于输入首值"""
+
+    def __init__(self, n):
+        self.alpha = 2.0 / (n + 1.0)
+        self.value = math.nan
+        self.count = 0
+
+    def update(self, x):
+        if self.count == 0:
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        self.count += 1
+        return self.value
+
+
+class MAState:
+    """简单移动平均，与 hku.MA 一致：不足 n 根时按已有数据求平均"""
+
+    def __init__(self, n):
+        self.n = n
+        self.window = deque()
+        self.total = 0.0
+
+    def update(self, x):
+        self.window.append(x)
+        self.total += x
+        if len(self.window) > self.n:
+            self.total -= self.window.popleft()
+        return self.total / len(self.window)
+
+
+class STDState:
+    """滚动样本标准差，与 hku.STD 一致：前 n-1 根为 NaN
+
+    每根K线按窗口内的 n 个值两遍计算（先均值、再离差平方和），不维护累加和，
+    长期运行不会因相消误差而漂移；n 为布林带周期这类小窗口，开销可以忽略。
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.window = deque(maxlen=n)
+
+    def update(self, x):
+        self.window.append(x)
+        if self.n < 2 or len(self.window) < self.n:
+            return math.nan
+        mean = math.fsum(self.window) / self.n
+        var = math.fsum((v - mean) ** 2 for v in self.window) / (self.n - 1)
+        return math.sqrt(var)
+
+
+class MACDState:
+    """MACD：返回 (DIF, DEA)"""
+
+    def __init__(self, fast, slow, signal):
+        self.fast = EMAState(fast)
+        self.slow = EMAState(slow)
+        self.signal = EMAState(signal)
+
+    def update(self, x):
+        dif = self.fast.update(x) - self.slow.update(x)
+        return dif, self.signal.update(dif)
+
+
+class CrossState:
+    """双线交叉，与 SG_Cross 一致：返回 (buy, sell)"""
+
+    def __init__(self):
+        self.prev = (math.nan, math.nan)
+
+    def update(self, fast, slow):
+        prev_fast, prev_slow = self.prev
+        self.prev = (fast, slow)
+        # NaN 参与比较结果为 False，指标未就绪时不会产生信号
+        return prev_fast < prev_slow and fast > slow, prev_fast > prev_slow and fast < slow
+
+
+def _is_zero(x):
+    """与 TA-Lib 的 TA_IS_ZERO 一致"""
+    return -1e-8 < x < 1e-8
+
+
+class ADXState:
+    """平均趋向指数，与 hku.TA_ADX（TA-Lib ADX）逐位一致：前 2n-1 根为 NaN
+
+    第 1 至 n-1 根的 +DM、-DM、TR 直接累加作为初值，之后按 Wilder 平滑 s = s - s/n + x 递推；
+    第 n 至 2n-1 根的 DX 求和除以 n 得到首个 ADX，此后 ADX = (ADX*(n-1) + DX) / n。
+    TR 或 +DI 与 -DI 之和为 0 的K线与 TA-Lib 相同不计 DX。
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.bars = 0
+        self.prev = None            # 上一根K线的 (high, low, close)
+        self.plus_dm = 0.0
+        self.minus_dm = 0.0
+        self.tr = 0.0
+        self.dx_sum = 0.0
+        self.value = math.nan
+
+    def _dx(self):
+        if _is_zero(self.tr):
+            return None
+        minus_di = 100.0 * (self.minus_dm / self.tr)
+        plus_di = 100.0 * (self.plus_dm / self.tr)
+        total = minus_di + plus_di
+        if _is_zero(total):
+            return None
+        return 100.0 * (abs(minus_di - plus_di) / total)
+
+    def update(self, high, low, close):
+        prev, self.prev = self.prev, (high, low, close)
+        i = self.bars
+        self.bars += 1
+        if prev is None:
+            return self.value
+        prev_high, prev_low, prev_close = prev
+        n = self.n
+        diff_plus, diff_minus = high - prev_high, prev_low - low
+        tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+        if i < n:
+            if diff_minus > 0 and diff_plus < diff_minus:
+                self.minus_dm += diff_minus
+            elif diff_plus > 0 and diff_plus > diff_minus:
+                self.plus_dm += diff_plus
+            self.tr += tr
+            return self.value
+
+        self.minus_dm -= self.minus_dm / n
+        self.plus_dm -= self.plus_dm / n
+        if diff_minus > 0 and diff_plus < diff_minus:
+            self.minus_dm += diff_minus
+        elif diff_plus > 0 and diff_plus > diff_minus:
+            self.plus_dm += diff_plus
+        self.tr = self.tr - self.tr / n + tr
+
+        dx = self._dx()
+        if i < 2 * n:
+            if dx is not None:
+                self.dx_sum += dx
+            if i == 2 * n - 1:
+                self.value = self.dx_sum / n
+        elif dx is not None:
+            self.value = (self.value * (n - 1) + dx) / n
+        return self.value
+
+
+class BandState:
+    """区间信号，与 SG_Band 一致：高于上轨买入，低于下轨卖出"""
+
+    def __init__(self, lower, upper):
+        self.lower = lower
+        self.upper = upper
+
+    def update(self, x):
+        # NaN 参与比较结果为 False，指标未就绪时不会产生信号
+        return x > self.upper, x < self.lower
+
+
+class AlternateState:
+    """信号指示器的 alternate 参数（hikyuu 默认开启）：未持有时只接受买入，持有时只接受卖出"""
+
+    def __init__(self, alternate=True):
+        self.alternate = alternate
+        self.hold = False
+
+    def update(self, buy, sell):
+        if not self.alternate:
+            return buy, sell
+        if buy:
+            buy, self.hold = not self.hold, True
+            return buy, False
+        if sell:
+            sell, self.hold = self.hold, False
+            return False, sell
+        return False, False
+
+
+# ==================== 策略信号状态 ====================
+# 每个类接收策略实例，update(open, high, low, close) 返回当根K线收盘后的 (buy, sell)
+
+class EMACrossStream:
+    """EMA 交叉（SG_Flex）"""
+
+    def __init__(self, strategy):
+        self.fast = EMAState(strategy.fast_period)
+        self.slow = EMAState(strategy.slow_period)
+        self.cross = CrossState()
+
+    def update(self, open_price, high, low, close):
+        fast = self.fast.update(close)
+        return self.cross.update(fast, self.slow.update(fast))
+
+
+class MACDStream:
+    """MACD：DIF 上穿 DEA 买入，下穿卖出"""
+
+    def __init__(self, strategy):
+        self.macd = MACDState(strategy.fast_period, strategy.slow_period, strategy.signal_period)
+        self.cross = CrossState()
+
+    def update(self, open_price, high, low, close):
+        return self.cross.update(*self.macd.update(close))
+
+
+class BollingerStream:
+    """布林带突破：SG_Sub(SG_Cross(close, upper), SG_Cross(mid, close))"""
+
+    def __init__(self, strategy):
+        self.k = strategy.k
+        self.mid = MAState(strategy.n)
+        self.std = STDState(strategy.n)
+        self.up_cross = CrossState()
+        self.mid_cross = CrossState()
+
+    def update(self, open_price, high, low, close):
+        mid = self.mid.update(close)
+        upper = mid + self.std.update(close) * self.k
+        up_buy, up_sell = self.up_cross.update(close, upper)
+        mid_buy, mid_sell = self.mid_cross.update(mid, close)
+        value = (up_buy - up_sell) - (mid_buy - mid_sell)
+        return value > 0, value < 0
+
+
+class ADXFilterStream:
+    """EMA 交叉 + ADX 过滤：SG_And(SG_Flex(...), SG_Band(ADX, lower, upper))
+
+    两个子信号各自按默认的 alternate 过滤后，同一根K线都买入才买入、都卖出才卖出。
+    区间上下轨和 SG_And 的 alternate 取自策略的 signal_expr()，与 sys.run 使用的信号保持一致。
+    """
+
+    def __init__(self, strategy):
+        nodes = {node.op: node for node in expr.walk(strategy.signal_expr())}
+        self.ema = EMACrossStream(strategy)
+        self.ema_alternate = AlternateState()
+        self.adx = ADXState(strategy.adx_period)
+        self.band = BandState(*nodes['SG_BAND'].params)
+        self.band_alternate = AlternateState()
+        self.combined = AlternateState(*nodes['SG_AND'].params)
+
+    def update(self, open_price, high, low, close):
+        cross_buy, cross_sell = self.ema_alternate.update(*self.ema.update(open_price, high, low, close))
+        band_buy, band_sell = self.band_alternate.update(*self.band.update(self.adx.update(high, low, close)))
+        return self.combined.update(cross_buy and band_buy, cross_sell and band_sell)
+
+
+# 策略类 -> 信号状态类
+STREAM_KERNELS = {
+    EMACrossStrategy: EMACrossStream,
+    MACDStrategy: MACDStream,
+    BollingerBreakoutStrategy: BollingerStream,
+    EMACrossWithADXFilterStrategy: ADXFilterStream,
+}
+
+
+# ==================== 单只股票的增量回测 ====================
+
+class StreamingBacktest:
+    """单只股票、单个策略的增量回测状态
+
+    每根K线：先按上一根K线收盘时的信号在开盘价成交，再用收盘价更新指标和信号，最后按收盘价估值。
+    收益、回撤、波动率等指标也以累加量维护，随时可取且不需要保存资产序列。
+    """
+
+    def __init__(self, strategy, init_cash=300000, ppy=252):
+        kernel = STREAM_KERNELS.get(type(strategy))
+        if kernel is None:
+            raise ValueError(f"策略 {type(strategy).__name__} 没有增量实现")
+        self.strategy = strategy
+        self.signal = kernel(strategy)
+        self.init_cash = init_cash
+        self.ppy = ppy
+        self.fixed_count = float(strategy.fixed_count)
+
+        self.last_datetime = None
+        self.bars = 0
+        self.state = 0              # 信号状态：1 应持仓，0 应空仓（下一根开盘执行）
+        self.held = 0
+        self.cash = float(init_cash)
+        self.last_close = math.nan
+        self.trade_count = 0
+        self.traded_value = 0.0
+        self.trades = deque(maxlen=100)   # 最近的成交 (datetime, 'BUY'/'SELL', price, number)
+
+        # 风险指标的累加量
+        self.equity = float(init_cash)
+        self.peak = float(init_cash)
+        self.max_drawdown = 0.0
+        self.equity_sum = 0.0
+        self.ret_n = 0
+        self.ret_sum = 0.0
+        self.ret_sum2 = 0.0
+        self.down_sum2 = 0.0
+        self.held_bars = 0
+
+    def update(self, dt, open_price, high, low, close):
+        """追加一根K线
+
+        Args:
+            dt: K线时间（可比较大小，如 numpy.datetime64 / datetime）；不晚于上一根的K线被忽略，
+                因此重复追加同一天的数据是安全的
+
+        Returns:
+            list: 本根K线开盘时的成交，每笔为 (datetime, 'BUY'/'SELL', price, number)
+        """
+        if self.last_datetime is not None and dt <= self.last_datetime:
+            return []
+        self.last_datetime = dt
+        self.bars += 1
+
+        executed = []
+        if self.state != self.held:
+            number = self.fixed_count
+            if self.state > self.held:
+                self.cash -= open_price * number
+                trade = (dt, 'BUY', open_price, number)
+            else:
+                self.cash += open_price * number
+                trade = (dt, 'SELL', open_price, number)
+            self.held = self.state
+            self.trade_count += 1
+            self.traded_value += open_price * number
+            self.trades.append(trade)
+            executed.append(trade)
+
+        buy, sell = self.signal.update(open_price, high, low, close)
+        if buy:
+            self.state = 1
+        elif sell:
+            self.state = 0
+
+        self.last_close = close
+        self._update_metrics(self.cash + self.held * self.fixed_count * close)
+        return executed
+
+    def _update_metrics(self, equity):
+        prev, self.equity = self.equity, equity
+        if self.bars > 1:
+            r = equity / prev - 1.0 if prev != 0 else 0.0
+            self.ret_n += 1
+            self.ret_sum += r
+            self.ret_sum2 += r * r
+            self.down_sum2 += min(r, 0.0) ** 2
+        self.equity_sum += equity
+        self.held_bars += self.held != 0
+        self.peak = max(self.peak, equity)
+        if self.peak > 0:
+            self.max_drawdown = max(self.max_drawdown, 1.0 - equity / self.peak)
+
+    def replay(self, arrays):
+        """按顺序回放一段K线（用于冷启动或补数据）
+
+        Args:
+            arrays: kdata_arrays() 格式的列字典
+        """
+        dts = arrays['datetime']
+        o, h, l, c = (np.asarray(arrays[k], dtype=np.float64).tolist() for k in ('open', 'high', 'low', 'close'))
+        for i in range(len(c)):
+            self.update(dts[i], o[i], h[i], l[i], c[i])
+        return self
+
+    def results(self):
+        """当前结果，字段与 run_strategy_backtest() 一致"""
+        current_value = self.held * self.fixed_count * (0.0 if math.isnan(self.last_close) else self.last_close)
+        total_asset = self.cash + current_value
+        total_return = total_asset - self.init_cash
+
+        n = self.ret_n
+        mean = self.ret_sum / n if n else 0.0
+        std = math.sqrt(max((self.ret_sum2 - n * mean * mean) / (n - 1), 0.0)) if n >= 2 else 0.0
+        downside = math.sqrt(self.down_sum2 / n) if n else 0.0
+        scale = math.sqrt(self.ppy)
+        mean_equity = self.equity_sum / self.bars if self.bars else 0.0
+        return {
+            'strategy_name': self.strategy.get_description(),
+            'init_cash': self.init_cash,
+            'total_asset': total_asset,
+            'total_return': total_return,
+            'return_rate': total_return / self.init_cash * 100 if self.init_cash > 0 else 0.0,
+            'trade_count': self.trade_count,
+            'current_cash': self.cash,
+            'current_value': current_value,
+            'max_drawdown': self.max_drawdown,
+            'volatility': std * scale if n >= 2 else 0.0,
+            'sharpe': mean / std * scale if n >= 2 and std > 0 else 0.0,
+            'sortino': mean / downside * scale if n >= 2 and downside > 0 else 0.0,
+            'exposure': self.held_bars / self.bars if self.bars else 0.0,
+            'turnover': self.traded_value / mean_equity if mean_equity > 0 else 0.0,
+        }
+
+
+def _atomic_dump(obj, path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+class StreamingWatchlist:
+    """自选股列表上同一策略的增量回测
+
+    每只股票一个 StreamingBacktest，整体可保存/加载（写入临时文件后改名，中途失败不会损坏旧状态）。
+    """
+
+    def __init__(self, strategy, init_cash=300000, ppy=252):
+        self.strategy = strategy
+        self.init_cash = init_cash
+        self.ppy = ppy
+        self.books = {}
+
+    def _book(self, code):
+        book = self.books.get(code)
+        if book is None:
+            book = self.books[code] = StreamingBacktest(self.strategy, self.init_cash, self.ppy)
+        return book
+
+    def warm_up(self, code, kdata=None, arrays=None):
+        """用历史K线建立某只股票的初始状态（只需做一次）"""
+        if arrays is None:
+            arrays = kdata_arrays(kdata)
+        return self._book(code).replay(arrays)
+
+    def append(self, code, dt, open_price, high, low, close):
+        """追加某只股票的一根K线，返回本根成交的列表"""
+        return self._book(code).update(dt, open_price, high, low, close)
+
+    def append_bars(self, bars):
+        """批量追加
+
+        Args:
+            bars: {股票代码: (dt, open, high, low, close)}
+
+        Returns:
+            dict: 有成交的股票 -> 成交列表
+        """
+        events = {}
+        for code, bar in bars.items():
+            trades = self.append(code, *bar)
+            if trades:
+                events[code] = trades
+        return events
+
+    def results(self):
+        """每只股票的当前结果，按收益率从高到低"""
+        rows = []
+        for code, book in self.books.items():
+            row = {'stock': code, 'bars': book.bars, 'position': book.held * book.fixed_count}
+            row.update(book.results())
+            rows.append(row)
+        rows.sort(key=lambda r: r['return_rate'], reverse=True)
+        return rows
+
+    def save(self, path):
+        """保存全部状态"""
+        _atomic_dump(self, path)
+
+    @staticmethod
+    def load(path):
+        """加载 save() 保存的状态"""
+        with open(path, 'rb') as f:
+            return pickle.load(f)
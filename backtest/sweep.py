@@ -0,0 +1,114 @@
+"""参数扫描：对策略参数网格做全组合回测并排名"""
+
+import contextlib
+import itertools
+
+from strategies.indicators import use_cache
+
+from .runner import parallel_results, run_strategy_backtest
+
+
+def expand_grid(param_grid):
+    """展开参数网格为参数组合列表（笛卡尔积）
+
+    Args:
+        param_grid: {参数名: 取值列表}，如 {'fast_period': [5, 10], 'slow_period': [20, 30]}
+
+    Returns:
+        list: 参数字典列表，按参数名的声明顺序展开（第一个参数变化最慢）
+    """
+    names = list(param_grid.keys())
+    values = [list(param_grid[name]) for name in names]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+def sweep(strategy_cls, param_grid, kdata, init_cash=300000, fixed_params=None,
+          rank_by='return_rate', workers=None, cache=None, store=None, result_cache=None,
+          kdata_cache=None, resamples=0):
+    """参数扫描
+
+    对 param_grid 的每个组合构造策略并回测。同一份K线上的相同指标只计算一次，
+    例如 EMA 网格中快线周期相同的组合共享同一条 EMA(close, fast)
+    （慢线是 SG_Flex 对快线再做的 EMA，随快线变化，不会与快线共享）。
+
+    Args:
+        strategy_cls: 策略类，如 EMACrossStrategy
+        param_grid: {参数名: 取值列表}
+        kdata: K线数据
+        init_cash: 初始资金
+        fixed_params: 所有组合共用的其它构造参数，如 {'fixed_count': 1000}
+        rank_by: 排名字段，默认按收益率从高到低
+        workers: 并行进程数，None 或 1 表示在当前进程内顺序执行
+        cache: 指标缓存对象，默认使用进程级指标缓存（并行时每个工作进程各自缓存）
+        store: ResultStore 对象，给出时每条结果同时追加写入列式存储
+        result_cache: ResultCache 对象，已缓存的组合直接取结果，只回测未命中的组合
+        kdata_cache: KDataCache 对象，并行模式下工作进程从磁盘缓存取K线
+        resamples: 每个组合逐笔盈亏的自助抽样次数，0 表示不做，见 compare_strategies()
+
+    Returns:
+        list: 排名后的结果行，每行包含 rank、参数和回测指标
+    """
+    combos = expand_grid(param_grid)
+    fixed_params = fixed_params or {}
+    strategies = [strategy_cls(**fixed_params, **params) for params in combos]
+
+    if workers is not None and workers > 1:
+        # 与 compare_strategies 的并行路径相同，但保留失败组合的位置以便与参数对应
+        results = parallel_results(strategies, kdata, init_cash, workers, kdata_cache,
+                                   result_cache=result_cache, resamples=resamples)
+    else:
+        results = []
+        with use_cache(cache) if cache is not None else contextlib.nullcontext():
+            for strategy in strategies:
+                try:
+                    result = run_strategy_backtest(strategy, kdata, init_cash, result_cache=result_cache,
+                                                   resamples=resamples)
+                except Exception as e:
+                    print(f"策略 {strategy.get_description()} 测试失败: {e}")
+                    result = None
+                results.append(result)
+
+    rows = []
+    for params, strategy, result in zip(combos, strategies, results):
+        if not result:
+            continue
+        row = dict(params)
+        row['strategy_name'] = strategy.get_description()
+        row.update((k, v) for k, v in result.items() if k != 'strategy_name')
+        rows.append(row)
+        if store is not None:
+            store.append(result, strategy, kdata)
+
+    rows.sort(key=lambda r: r[rank_by], reverse=True)
+    for i, row in enumerate(rows):
+        row['rank'] = i + 1
+    return rows
+
+
+def print_sweep_table(rows, param_names, top=20):
+    """打印参数扫描排名表
+
+    Args:
+        rows: sweep() 的返回值
+        param_names: 要显示的参数名列表
+        top: 显示前多少名
+    """
+    if not rows:
+        print("没有可对比的结果")
+        return
+
+    param_header = ' '.join(f"{name:>12}" for name in param_names)
+    print("\n" + "=" * 100)
+    print(f"参数扫描结果（共 {len(rows)} 组，显示前 {min(top, len(rows))} 名）")
+    print("=" * 100)
+    print(f"{'排名':>4} {param_header} {'总收益':>12} {'收益率':>10} {'交易次数':>8} {'最大回撤':>8} {'夏普':>6}")
+    print("-" * 100)
+    for r in rows[:top]:
+        params = ' '.join(f"{r[name]!s:>12}" for name in param_names)
+        print(f"{r['rank']:>4} {params} "
+              f"{r['total_return']:>+12,.2f} "
+              f"{r['return_rate']:>+9.2f}% "
+              f"{r['trade_count']:>8} "
+              f"{r.get('max_drawdown', 0.0) * 100:>7.2f}% "
+              f"{r.get('sharpe', 0.0):>6.2f}")
+    print("=" * 100 + "\n")
@@ -0,0 +1,156 @@
+"""交易与持仓记录的列式提取
+
+一次遍历交易账户的交易记录和持仓记录，转换为 NumPy 结构化数组，并建立股票索引。
+之后的成本、已实现盈亏、交易次数都是数组运算或下标查找，不再对每个对象反复 hasattr / 扫描。
+"""
+
+import numpy as np
+import hikyuu as hku
+
+
+TRADE_DTYPE = np.dtype([
+    ('datetime', 'M8[us]'),
+    ('stock', 'i4'),        # 股票在 TradeBook.codes 中的下标
+    ('business', 'i1'),     # hku.BUSINESS 枚举值
+    ('number', 'f8'),
+    ('price', 'f8'),        # 实际成交价
+    ('cost', 'f8'),         # 交易成本
+    ('cash', 'f8'),         # 成交后的现金余额
+])
+
+POSITION_DTYPE = np.dtype([
+    ('stock', 'i4'),
+    ('number', 'f8'),
+    ('buy_money', 'f8'),    # 本次持仓累计买入金额
+    ('sell_money', 'f8'),   # 本次持仓累计卖出金额
+    ('total_cost', 'f8'),   # 本次持仓累计交易成本
+    ('take_datetime', 'M8[us]'),
+])
+
+BUY = int(hku.BUSINESS.BUY)
+SELL = int(hku.BUSINESS.SELL)
+INIT = int(hku.BUSINESS.INIT)
+BUSINESS_NAMES = {int(v): name for name, v in hku.BUSINESS.__members__.items()}
+
+
+class TradeBook:
+    """交易账户的列式视图
+
+    Attributes:
+        codes: 股票代码列表，trades/positions 中的 stock 字段是它的下标
+        trades: TRADE_DTYPE 结构化数组，按成交顺序
+        positions: POSITION_DTYPE 结构化数组，当前持仓
+    """
+
+    def __init__(self, codes, trades, positions):
+        self.codes = codes
+        self.code_index = {code: i for i, code in enumerate(codes)}
+        self.trades = trades
+        self.positions = positions
+
+    @classmethod
+    def from_tm(cls, tm):
+        """从交易账户一次性提取交易记录和持仓记录"""
+        codes = []
+        code_index = {}
+
+        def stock_id(stock):
+            if stock.is_null():
+                return -1
+            code = stock.market_code
+            i = code_index.get(code)
+            if i is None:
+                i = code_index[code] = len(codes)
+                codes.append(code)
+            return i
+
+        trade_list = tm.get_trade_list()
+        trades = np.empty(len(trade_list), dtype=TRADE_DTYPE)
+        for i, t in enumerate(trade_list):
+            price = t.real_price
+            trades[i] = (t.datetime.timestamp(), stock_id(t.stock), int(t.business), t.number,
+                         price if price else t.plan_price, t.cost.total, t.cash)
+
+        position_list = tm.get_position_list()
+        positions = np.empty(len(position_list), dtype=POSITION_DTYPE)
+        for i, p in enumerate(position_list):
+            positions[i] = (stock_id(p.stock), p.number, p.buy_money, p.sell_money,
+                            p.total_cost, p.take_datetime.timestamp())
+
+        return cls(codes, trades, positions)
+
+    # ==================== 掩码 ====================
+
+    @property
+    def actual(self):
+        """实际交易（不含 INIT）"""
+        return self.trades['business'] != INIT
+
+    @property
+    def buys(self):
+        return self.trades['business'] == BUY
+
+    @property
+    def sells(self):
+        return self.trades['business'] == SELL
+
+    # ==================== 按股票汇总（下标 = 股票编号） ====================
+
+    def _by_stock(self, mask, weights=None):
+        t = self.trades[mask]
+        stock = t['stock']
+        valid = stock >= 0
+        w = None if weights is None else weights[mask][valid]
+        return np.bincount(stock[valid], weights=w, minlength=len(self.codes))
+
+    def trade_count(self):
+        """实际交易笔数（不含 INIT）"""
+        return int(self.actual.sum())
+
+    def trade_count_by_stock(self):
+        return self._by_stock(self.actual).astype(np.int64)
+
+    def buy_money_by_stock(self):
+        return self._by_stock(self.buys, self.trades['number'] * self.trades['price'])
+
+    def sell_money_by_stock(self):
+        return self._by_stock(self.sells, self.trades['number'] * self.trades['price'])
+
+    def cost_by_stock(self):
+        return self._by_stock(self.actual, self.trades['cost'])
+
+    def open_cost_basis_by_stock(self):
+        """当前持仓的成本（本次持仓买入金额 - 卖出金额）"""
+        basis = np.zeros(len(self.codes))
+        p = self.positions[self.positions['stock'] >= 0]
+        np.add.at(basis, p['stock'], p['buy_money'] - p['sell_money'])
+        return basis
+
+    def realized_pnl_by_stock(self):
+        """已实现盈亏：已平仓部分的卖出金额 - 买入金额 - 交易成本
+
+        全部卖出收入减去全部买入支出后，加回仍在持仓部分的成本，即为已了结部分的盈亏。
+        """
+        return (self.sell_money_by_stock() - self.buy_money_by_stock()
+                + self.open_cost_basis_by_stock() - self.cost_by_stock())
+
+    def position_cost_price(self):
+        """当前每个持仓的成本价（本次持仓买入金额 / 持仓数量），与 positions 一一对应"""
+        number = self.positions['number']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(number > 0, self.positions['buy_money'] / number, 0.0)
+
+    def position_value(self, prices):
+        """按给定价格计算持仓市值
+
+        Args:
+            prices: 标量（单只股票）或与 codes 对齐的价格数组
+        """
+        prices = np.broadcast_to(np.asarray(prices, dtype=np.float64), (len(self.codes),))
+        p = self.positions[self.positions['stock'] >= 0]
+        return float(np.sum(p['number'] * prices[p['stock']]))
+
+    def trades_of(self, code):
+        """某只股票的全部交易记录"""
+        i = self.code_index.get(code, -2)
+        return self.trades[self.trades['stock'] == i]
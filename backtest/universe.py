@@ -0,0 +1,247 @@
+"""全市场回测：对股票池中的每只股票运行同一策略并汇总"""
+
+import multiprocessing
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import hikyuu as hku
+
+from .kcache import KDataCache
+from .loader import scoped_load_options
+from .parallel import _ensure_loaded, _init_worker
+from .prefetch import KDataPrefetcher, merge_prefetch_stats
+from .runner import run_strategy_backtest
+
+
+# 板块名称 -> hikyuu 股票类型
+BOARD_TYPES = {
+    'main': 'STOCKTYPE_A',       # 沪深主板
+    'gem': 'STOCKTYPE_GEM',      # 创业板
+    'star': 'STOCKTYPE_START',   # 科创板
+    'bj': 'STOCKTYPE_A_BJ',      # 北交所
+}
+
+
+def select_stocks(markets=None, boards=None, codes=None):
+    """从 hku.sm 中筛选股票
+
+    Args:
+        markets: 市场列表，如 ['SH', 'SZ']，None 表示不限
+        boards: 板块列表，取值见 BOARD_TYPES，None 表示全部 A 股板块
+        codes: 指定股票代码列表，如 ['sz002415']，给出时忽略 markets/boards
+
+    Returns:
+        list: 股票代码（market_code）列表，按代码排序
+    """
+    if codes:
+        return [hku.get_stock(code).market_code for code in codes]
+
+    boards = list(BOARD_TYPES) if boards is None else boards
+    unknown = [b for b in boards if b not in BOARD_TYPES]
+    if unknown:
+        raise ValueError(f"未知板块: {unknown}，可选: {list(BOARD_TYPES)}")
+    types = {getattr(hku.constant, BOARD_TYPES[b]) for b in boards}
+    markets = {m.upper() for m in markets} if markets else None
+
+    selected = []
+    for stock in hku.sm:
+        if not stock.valid or stock.type not in types:
+            continue
+        if markets is not None and stock.market.upper() not in markets:
+            continue
+        selected.append(stock.market_code)
+    selected.sort()
+    return selected
+
+
+def _load_kdata(code, query, cache):
+    """读取一只股票的K线，并在当前线程内完成读取（len 触发实际加载）
+
+    K线缓存命中且不校验时不需要 hikyuu 数据，工作进程只在需要时才加载。
+    """
+    if cache is not None:
+        if cache.validate or cache.load_arrays(code, query) is None:
+            _ensure_loaded()
+        kdata = cache.get_kdata(code, query)
+        stock = kdata.get_stock()
+    else:
+        stock = hku.get_stock(code)
+        kdata = stock.get_kdata(query)
+    len(kdata)
+    return stock, kdata
+
+
+def _backtest_chunk(task):
+    """回测一批股票
+
+    每只股票的K线在处理时才获取，处理完即释放，只保留精简的结果字典。
+    prefetch > 0 时由 KDataPrefetcher 在后台线程中提前读取后面 prefetch 只股票的K线，
+    读取与回测计算重叠；内存中最多同时有 prefetch + 1 只股票的K线。
+
+    Returns:
+        tuple: (结果行列表, 预取统计字典（未预取时为空）)
+    """
+    codes, strategy, query, init_cash, cache_args, prefetch = task
+    cache = KDataCache(*cache_args) if cache_args is not None else None
+
+    def load(code):
+        return _load_kdata(code, query, cache)
+
+    if prefetch > 0:
+        prefetcher = KDataPrefetcher(codes, load, depth=prefetch, threads=min(prefetch, 2))
+        loaded = iter(prefetcher)
+    else:
+        prefetcher = None
+        loaded = _load_inline(codes, load)
+
+    rows = []
+    try:
+        for code, value, error in loaded:
+            row = {'stock': code}
+            try:
+                if error is not None:
+                    raise error
+                stock, kdata = value
+                value = None
+                row['name'] = stock.name
+                row['bars'] = len(kdata)
+                if len(kdata) == 0:
+                    row['error'] = "无K线数据"
+                else:
+                    result = run_strategy_backtest(strategy, kdata, init_cash)
+                    row.update(result)
+                del kdata
+                if stock.is_buffer(query.ktype):
+                    stock.release_kdata_buffer(query.ktype)
+            except Exception as e:
+                row['error'] = f"{e}\n{traceback.format_exc()}"
+            rows.append(row)
+    finally:
+        if prefetcher is not None:
+            prefetcher.close()
+    return rows, (prefetcher.stats() if prefetcher is not None else {})
+
+
+def _load_inline(codes, load):
+    """不预取时的顺序读取，产出格式与 KDataPrefetcher 相同"""
+    for code in codes:
+        try:
+            yield code, load(code), None
+        except Exception as e:
+            yield code, None, e
+
+
+def summarize_universe(rows):
+    """汇总每只股票的回测结果
+
+    Returns:
+        dict: 股票数、胜率（收益为正的股票占比）、收益率分布和交易次数统计
+    """
+    ok = [r for r in rows if 'error' not in r]
+    summary = {
+        'stocks': len(rows),
+        'succeeded': len(ok),
+        'failed': len(rows) - len(ok),
+    }
+    if not ok:
+        return summary
+
+    rates = np.array([r['return_rate'] for r in ok], dtype=np.float64)
+    trades = np.array([r['trade_count'] for r in ok], dtype=np.int64)
+    p5, p25, p50, p75, p95 = np.percentile(rates, [5, 25, 50, 75, 95])
+    summary.update({
+        'hit_rate': float(np.mean(rates > 0)),
+        'return_mean': float(rates.mean()),
+        'return_std': float(rates.std()),
+        'return_min': float(rates.min()),
+        'return_p5': float(p5),
+        'return_p25': float(p25),
+        'return_median': float(p50),
+        'return_p75': float(p75),
+        'return_p95': float(p95),
+        'return_max': float(rates.max()),
+        'total_return': float(sum(r['total_return'] for r in ok)),
+        'trades_total': int(trades.sum()),
+        'trades_mean': float(trades.mean()),
+        'no_trade_ratio': float(np.mean(trades == 0)),
+    })
+    return summary
+
+
+def run_universe(strategy, query, markets=None, boards=None, codes=None, init_cash=300000,
+                 workers=None, chunk_size=50, load_options=None, store=None, kdata_cache=None, prefetch=0):
+    """对股票池运行同一策略
+
+    Args:
+        strategy: 策略对象（需可 pickle）
+        query: K线查询条件，如 hku.Query(-250)
+        markets, boards, codes: 股票池筛选条件，见 select_stocks()
+        init_cash: 每只股票的初始资金
+        workers: 并行进程数，None 或 1 表示在当前进程内执行（需已调用 hku.load_hikyuu）
+        chunk_size: 每个任务处理的股票数
+        load_options: 传给工作进程中 hku.load_hikyuu 的参数，默认只加载股票池中的股票和查询的K线类型
+        store: ResultStore 对象，给出时每只股票的结果同时追加写入列式存储
+        kdata_cache: KDataCache 对象，给出时K线从磁盘缓存读取，未命中或过期时从 hikyuu 读取并写入
+        prefetch: 每个任务内提前读取的股票数，0 表示不预取；读取与回测计算重叠，
+            汇总中的 'prefetch' 给出等待次数/时间和队列深度
+
+    Returns:
+        tuple: (每只股票的结果行列表（按代码排序）, 汇总字典)
+    """
+    if kdata_cache is not None:
+        kdata_cache.check_query(query)
+    stock_codes = select_stocks(markets, boards, codes)
+    chunks = [stock_codes[i:i + chunk_size] for i in range(0, len(stock_codes), chunk_size)]
+    cache_args = (kdata_cache.root, kdata_cache.validate) if kdata_cache is not None else None
+    tasks = [(chunk, strategy, query, init_cash, cache_args, prefetch) for chunk in chunks]
+
+    rows, prefetch_stats = [], []
+    if workers is not None and workers > 1 and len(tasks) > 1:
+        if load_options is None:
+            load_options = scoped_load_options(stock_codes, [query.ktype])
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=ctx,
+                                 initializer=_init_worker, initargs=(load_options, cache_args)) as pool:
+            for chunk_rows, stats in pool.map(_backtest_chunk, tasks):
+                rows.extend(chunk_rows)
+                prefetch_stats.append(stats)
+    else:
+        for task in tasks:
+            chunk_rows, stats = _backtest_chunk(task)
+            rows.extend(chunk_rows)
+            prefetch_stats.append(stats)
+
+    for row in rows:
+        if 'error' in row:
+            print(f"股票 {row['stock']} 回测失败: {row['error'].splitlines()[0]}")
+        elif store is not None:
+            store.append(row, strategy, stock=row['stock'], ktype=query.ktype, bars=row['bars'])
+    summary = summarize_universe(rows)
+    if prefetch > 0:
+        summary['prefetch'] = merge_prefetch_stats(prefetch_stats)
+    return rows, summary
+
+
+def print_universe_summary(summary, strategy_name=''):
+    """打印全市场回测汇总"""
+    print("\n" + "=" * 60)
+    print(f"全市场回测汇总 {strategy_name}")
+    print("=" * 60)
+    print(f"股票数:       {summary['stocks']:>10} 只（成功 {summary['succeeded']}，失败 {summary['failed']}）")
+    if summary.get('prefetch'):
+        p = summary['prefetch']
+        print(f"K线预取:      深度 {p['depth']}，等待 {p['stalls']} 次（{p['stall_rate'] * 100:.1f}%，"
+              f"{p['stall_time']:.2f} 秒），就绪队列平均 {p['queue_depth_mean']:.1f} / 最大 {p['queue_depth_max']}")
+    if summary['succeeded'] == 0:
+        print("=" * 60 + "\n")
+        return
+    print(f"胜率:         {summary['hit_rate'] * 100:>10.2f}%（收益为正的股票占比）")
+    print(f"平均收益率:   {summary['return_mean']:>+10.2f}%  (标准差 {summary['return_std']:.2f}%)")
+    print(f"收益率分布:   最小 {summary['return_min']:+.2f}%  P5 {summary['return_p5']:+.2f}%  "
+          f"P25 {summary['return_p25']:+.2f}%  中位数 {summary['return_median']:+.2f}%  "
+          f"P75 {summary['return_p75']:+.2f}%  P95 {summary['return_p95']:+.2f}%  最大 {summary['return_max']:+.2f}%")
+    print(f"总收益:       {summary['total_return']:>+14,.2f} 元")
+    print(f"交易次数:     合计 {summary['trades_total']}，平均 {summary['trades_mean']:.1f} 次/只，"
+          f"无交易股票占比 {summary['no_trade_ratio'] * 100:.1f}%")
+    print("=" * 60 + "\n")
@@ -0,0 +1,331 @@
+"""向量化快速筛选
+
+不建交易账户，直接在K线的 NumPy 数组上计算交叉类策略的买卖点和固定数量盈亏，
+用于成千上万个参数/股票组合的初筛，筛选出的少数组合再交给 BacktestEngine 完整回测。
+
+模拟口径（与 SYS_Simple + MM_FixedCount + crtTM 默认参数对齐）：
+- 信号在当根K线收盘后产生，下一根K线开盘价成交（buy_delay / sell_delay）
+- 同一时间最多持有一笔固定数量的仓位，空仓时买入信号开仓，持仓时卖出信号清仓
+- 不计交易成本，期末持仓按最后一根K线收盘价估值
+- 不检查资金是否足够，fixed_count × 价格超过初始资金的组合需以完整回测为准
+
+validate_against_engine() 用同一份K线对比两条路径的结果。
+"""
+
+import numpy as np
+
+from strategies import EMACrossStrategy, MACDStrategy
+from strategies.all_strategies import BollingerBreakoutStrategy
+
+from .metrics import risk_metrics
+from .runner import run_strategy_backtest
+from .sweep import expand_grid
+
+
+def kdata_arrays(kdata):
+    """把K线数据转换为 NumPy 列数组
+
+    Returns:
+        dict: datetime/open/high/low/close/volume 列，价格为 float64
+    """
+    data = kdata.to_np()
+    arrays = {'datetime': data['datetime']}
+    for name in ('open', 'high', 'low', 'close', 'volume'):
+        arrays[name] = np.ascontiguousarray(data[name], dtype=np.float64)
+    return arrays
+
+
+# ==================== 指标内核 ====================
+
+def ema(x, periods):
+    """指数移动平均，与 hku.EMA 一致：首值等于输入首值
+
+    Args:
+        x: 输入，形状 (T,) 或 (T, P)
+        periods: 每列的周期，形状 (P,)
+
+    Returns:
+        ndarray: 形状 (T, P)
+    """
+    periods = np.asarray(periods, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    if x.ndim == 1:
+        x = np.broadcast_to(x[:, None], (x.shape[0], periods.shape[0]))
+    alpha = 2.0 / (periods + 1.0)
+    out = np.empty(x.shape, dtype=np.float64)
+    if x.shape[0] == 0:
+        return out
+    out[0] = x[0]
+    # 递推无法消除，但每一步都对所有参数列同时计算
+    for i in range(1, x.shape[0]):
+        out[i] = out[i - 1] + alpha * (x[i] - out[i - 1])
+    return out
+
+
+def rolling_mean(x, n):
+    """简单移动平均，与 hku.MA 一致：不足 n 根时按已有数据求平均（沿第 0 维）"""
+    x = np.asarray(x, dtype=np.float64)
+    csum = np.cumsum(x, axis=0)
+    out = np.empty_like(x)
+    head = min(n, len(x))
+    count = np.arange(1, head + 1).reshape((head,) + (1,) * (x.ndim - 1))
+    out[:head] = csum[:head] / count
+    if len(x) > n:
+        out[n:] = (csum[n:] - csum[:-n]) / n
+    return out
+
+
+def rolling_std(x, n):
+    """滚动样本标准差，与 hku.STD 一致：前 n-1 根为 NaN（沿第 0 维）"""
+    x = np.asarray(x, dtype=np.float64)
+    out = np.full_like(x, np.nan)
+    if n < 2 or len(x) < n:
+        return out
+    zero = np.zeros((1,) + x.shape[1:])
+    c1 = np.concatenate((zero, np.cumsum(x, axis=0)))
+    c2 = np.concatenate((zero, np.cumsum(x * x, axis=0)))
+    s1 = c1[n:] - c1[:-n]
+    s2 = c2[n:] - c2[:-n]
+    var = (s2 - s1 * s1 / n) / (n - 1)
+    out[n - 1:] = np.sqrt(np.maximum(var, 0.0))
+    return out
+
+
+def cross(fast, slow):
+    """双线交叉，与 SG_Cross 一致
+
+    Returns:
+        tuple: (buy, sell) 布尔数组，buy 表示快线由下向上穿越慢线
+    """
+    buy = np.zeros(fast.shape, dtype=bool)
+    sell = np.zeros(fast.shape, dtype=bool)
+    # NaN 参与比较结果为 False，指标未就绪的位置不会产生信号
+    buy[1:] = (fast[:-1] < slow[:-1]) & (fast[1:] > slow[1:])
+    sell[1:] = (fast[:-1] > slow[:-1]) & (fast[1:] < slow[1:])
+    return buy, sell
+
+
+# ==================== 策略内核 ====================
+# 每个内核接收收盘价和一组同类策略实例，返回形状 (T, P) 的 (buy, sell)，
+# 相同周期的指标只计算一次
+
+def _unique_columns(values, func):
+    """对 values 中的不同取值各计算一次 func(value)，按原顺序返回列矩阵"""
+    uniq, inverse = np.unique(np.asarray(values), return_inverse=True)
+    cols = np.column_stack([func(v) for v in uniq])
+    return cols[:, inverse]
+
+
+def ema_cross_signals(close, strategies):
+    """EMA 交叉（SG_Flex）：快线 EMA(close, fast) 与其自身的 EMA(fast_line, slow) 交叉"""
+    fast_periods = [s.fast_period for s in strategies]
+    slow_periods = [s.slow_period for s in strategies]
+    fast = _unique_columns(fast_periods, lambda n: ema(close, [n])[:, 0])
+    slow = ema(fast, slow_periods)
+    return cross(fast, slow)
+
+
+def macd_cross_signals(close, strategies):
+    """MACD 交叉：DIF 上穿 DEA 买入，下穿卖出"""
+    ema_fast = _unique_columns([s.fast_period for s in strategies], lambda n: ema(close, [n])[:, 0])
+    ema_slow = _unique_columns([s.slow_period for s in strategies], lambda n: ema(close, [n])[:, 0])
+    dif = ema_fast - ema_slow
+    dea = ema(dif, [s.signal_period for s in strategies])
+    return cross(dif, dea)
+
+
+def bollinger_signals(close, strategies):
+    """布林带突破：SG_Sub(SG_Cross(close, upper), SG_Cross(mid, close))
+
+    与原策略一致按信号相减合成，差值 > 0 买入，< 0 卖出。
+    """
+    periods = [s.n for s in strategies]
+    mid = _unique_columns(periods, lambda n: rolling_mean(close, n))
+    std = _unique_columns(periods, lambda n: rolling_std(close, n))
+    upper = mid + std * np.asarray([s.k for s in strategies], dtype=np.float64)
+    price = np.broadcast_to(close[:, None], mid.shape)
+
+    up_buy, up_sell = cross(price, upper)
+    mid_buy, mid_sell = cross(mid, price)
+    value = (up_buy.astype(np.int8) - up_sell) - (mid_buy.astype(np.int8) - mid_sell)
+    return value > 0, value < 0
+
+
+# 策略类 -> 信号内核
+SIGNAL_KERNELS = {
+    EMACrossStrategy: ema_cross_signals,
+    MACDStrategy: macd_cross_signals,
+    BollingerBreakoutStrategy: bollinger_signals,
+}
+
+
+# ==================== 固定数量模拟 ====================
+
+def holdings_from_signals(buy, sell):
+    """把买卖信号转换为每根K线收盘时的持仓状态（0/1）
+
+    信号在下一根K线开盘成交，空仓时只响应买入，持仓时只响应卖出。
+    """
+    n = buy.shape[0]
+    state = np.where(buy, 1, np.where(sell, 0, -1)).astype(np.int8)
+    # 向前填充最近一次有效信号的状态
+    rows = np.arange(n).reshape((n,) + (1,) * (buy.ndim - 1))
+    last = np.maximum.accumulate(np.where(state >= 0, rows, 0), axis=0)
+    filled = np.take_along_axis(state, last, axis=0)
+    filled[filled < 0] = 0
+
+    held = np.zeros_like(filled)
+    held[1:] = filled[:-1]
+    return held
+
+
+def simulate_fixed_count(open_price, close, buy, sell, fixed_count, init_cash=300000):
+    """按固定数量模拟交易
+
+    Args:
+        open_price: 开盘价 (T,)
+        close: 收盘价 (T,)
+        buy, sell: 信号 (T, P)
+        fixed_count: 每次买入数量，标量或 (P,)
+        init_cash: 初始资金
+
+    Returns:
+        dict: 每个参数列的 total_return/return_rate/trade_count/position/traded_value，
+              逐K线 equity (T, P) 和 held (T, P)
+    """
+    held = holdings_from_signals(buy, sell)
+    count = np.asarray(fixed_count, dtype=np.float64)
+    delta = np.diff(held, axis=0, prepend=0).astype(np.float64)
+
+    # 现金流：买入付出开盘价，卖出收回开盘价
+    cash_flow = np.cumsum(-delta * open_price[:, None], axis=0) * count
+    equity = init_cash + cash_flow + held * close[:, None] * count
+
+    total_return = equity[-1] - init_cash if len(equity) else np.zeros(buy.shape[1:])
+    return {
+        'total_return': total_return,
+        'return_rate': total_return / init_cash * 100 if init_cash > 0 else np.zeros_like(total_return),
+        'trade_count': np.abs(delta).sum(axis=0).astype(np.int64),
+        'position': held[-1] * count if len(held) else np.zeros(buy.shape[1:]),
+        'traded_value': (np.abs(delta) * open_price[:, None]).sum(axis=0) * count,
+        'equity': equity,
+        'held': held,
+    }
+
+
+def fast_backtest(strategies, kdata=None, init_cash=300000, arrays=None):
+    """对一组同类策略做向量化回测
+
+    Args:
+        strategies: 同一策略类的实例列表
+        kdata: K线数据（与 arrays 二选一）
+        init_cash: 初始资金
+        arrays: kdata_arrays() 的结果，多次调用时可复用
+
+    Returns:
+        dict: simulate_fixed_count() 的结果
+    """
+    if not strategies:
+        raise ValueError("策略列表为空")
+    cls = type(strategies[0])
+    if any(type(s) is not cls for s in strategies):
+        raise ValueError("fast_backtest 只接受同一策略类的实例")
+    kernel = SIGNAL_KERNELS.get(cls)
+    if kernel is None:
+        raise ValueError(f"策略 {cls.__name__} 没有向量化实现")
+
+    if arrays is None:
+        arrays = kdata_arrays(kdata)
+    buy, sell = kernel(arrays['close'], strategies)
+    counts = np.asarray([s.fixed_count for s in strategies], dtype=np.float64)
+    return simulate_fixed_count(arrays['open'], arrays['close'], buy, sell, counts, init_cash)
+
+
+def screen(strategy_cls, param_grid, kdata, init_cash=300000, fixed_params=None,
+           rank_by='return_rate', arrays=None, ppy=252):
+    """参数网格快速筛选
+
+    参数与 sweep() 相同，返回同样格式的排名表（含风险指标），但只用向量化模拟计算。
+    """
+    combos = expand_grid(param_grid)
+    fixed_params = fixed_params or {}
+    strategies = [strategy_cls(**fixed_params, **params) for params in combos]
+    if not strategies:
+        return []
+    res = fast_backtest(strategies, kdata, init_cash, arrays)
+    metrics = risk_metrics(res['equity'], res['held'], res['traded_value'], ppy)
+
+    rows = []
+    for i, (params, strategy) in enumerate(zip(combos, strategies)):
+        row = dict(params)
+        row['strategy_name'] = strategy.get_description()
+        row['init_cash'] = init_cash
+        row['total_return'] = float(res['total_return'][i])
+        row['return_rate'] = float(res['return_rate'][i])
+        row['trade_count'] = int(res['trade_count'][i])
+        row['total_asset'] = init_cash + row['total_return']
+        row.update((name, float(values[i])) for name, values in metrics.items())
+        rows.append(row)
+
+    rows.sort(key=lambda r: r[rank_by], reverse=True)
+    for i, row in enumerate(rows):
+        row['rank'] = i + 1
+    return rows
+
+
+def screen_then_backtest(strategy_cls, param_grid, kdata, top=10, init_cash=300000,
+                         fixed_params=None, rank_by='return_rate'):
+    """先快速筛选，再对排名前 top 的组合做完整回测
+
+    Returns:
+        list: 完整回测后重新排名的结果行
+    """
+    survivors = screen(strategy_cls, param_grid, kdata, init_cash, fixed_params, rank_by)[:top]
+    fixed_params = fixed_params or {}
+    names = list(param_grid.keys())
+
+    rows = []
+    for r in survivors:
+        params = {name: r[name] for name in names}
+        strategy = strategy_cls(**fixed_params, **params)
+        try:
+            result = run_strategy_backtest(strategy, kdata, init_cash)
+        except Exception as e:
+            print(f"策略 {strategy.get_description()} 测试失败: {e}")
+            continue
+        if result:
+            row = dict(params)
+            row['strategy_name'] = strategy.get_description()
+            row['screen_return_rate'] = r['return_rate']
+            row.update(result)
+            rows.append(row)
+
+    rows.sort(key=lambda r: r[rank_by], reverse=True)
+    for i, row in enumerate(rows):
+        row['rank'] = i + 1
+    return rows
+
+
+def validate_against_engine(strategies, kdata, init_cash=300000, tolerance=1e-6):
+    """用同一份K线对比向量化模拟与 BacktestEngine 的结果
+
+    Returns:
+        list: 每个策略一行，包含两条路径的 total_return、trade_count 及是否一致
+    """
+    arrays = kdata_arrays(kdata)
+    rows = []
+    for strategy in strategies:
+        fast = fast_backtest([strategy], init_cash=init_cash, arrays=arrays)
+        full = run_strategy_backtest(strategy, kdata, init_cash)
+        fast_return = float(fast['total_return'][0])
+        fast_trades = int(fast['trade_count'][0])
+        rows.append({
+            'strategy_name': strategy.get_description(),
+            'fast_total_return': fast_return,
+            'engine_total_return': full['total_return'],
+            'fast_trade_count': fast_trades,
+            'engine_trade_count': full['trade_count'],
+            'match': (abs(fast_return - full['total_return']) <= tolerance * max(1.0, abs(full['total_return']))
+                      and fast_trades == full['trade_count']),
+        })
+    return rows
@@ -0,0 +1,273 @@
+"""滚动前推（walk-forward）优化
+
+在每个训练窗口上做参数扫描选出最优参数，用紧随其后的测试窗口做样本外评估，
+再把各测试窗口的资产曲线首尾相接，得到完整的样本外资产曲线。
+
+两种计算路径：
+- vectorized：策略有向量化内核（见 vectorized.SIGNAL_KERNELS）时，全部参数组合的信号在整段K线上只计算一次，
+  各窗口只对信号切片做模拟，重叠窗口不重复计算指标；测试窗口的指标带有之前全部历史的预热
+- engine：其它策略在每个窗口的K线切片上用 BacktestEngine 完整回测，同一窗口内的参数组合共享指标缓存；
+  测试窗口从空仓、无预热开始
+两种路径的窗口都可以多进程并行。
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from strategies.indicators import use_cache
+
+from .engine import BacktestEngine
+from .loader import scoped_load_options
+from .metrics import periods_per_year, risk_metrics
+from .parallel import _init_worker
+from .sweep import expand_grid
+from .vectorized import SIGNAL_KERNELS, kdata_arrays, simulate_fixed_count
+
+
+def walk_forward_windows(n, train, test, step=None, anchored=False):
+    """划分滚动窗口
+
+    Args:
+        n: K线数
+        train: 训练窗口长度
+        test: 测试窗口长度
+        step: 窗口前移步长，默认等于 test（测试窗口首尾相接、互不重叠）
+        anchored: True 时训练窗口起点固定在第 0 根（扩张窗口）
+
+    Returns:
+        list: (train_start, train_end, test_end) 下标元组，训练为 [train_start, train_end)，
+              测试为 [train_end, test_end)
+    """
+    step = step or test
+    windows = []
+    k = 0
+    while True:
+        train_start = 0 if anchored else k * step
+        train_end = train + k * step
+        if train_end >= n:
+            break
+        windows.append((train_start, train_end, min(train_end + test, n)))
+        k += 1
+    return windows
+
+
+def _run_engine(strategy, kdata, init_cash):
+    """用 BacktestEngine 回测并返回引擎（保留交易账户以便计算资产曲线）"""
+    engine = BacktestEngine(init_cash=init_cash)
+    engine.create_trade_account()
+    engine.create_trade_system(strategy.create_signal(kdata), strategy.create_money_manager())
+    engine.sys.run(kdata)
+    return engine
+
+
+def _score(values):
+    # 指标越大越好；NaN 视为最差
+    return np.where(np.isnan(values), -np.inf, values)
+
+
+def _vector_window(task):
+    """向量化路径的单个窗口：在训练切片上选参数，在测试切片上评估"""
+    train_slice, test_slice, counts, init_cash, rank_by, ppy = task
+    o, c, b, s = train_slice
+    res = simulate_fixed_count(o, c, b, s, counts, init_cash)
+    values = res.get(rank_by)
+    if values is None:
+        values = risk_metrics(res['equity'], res['held'], res['traded_value'], ppy)[rank_by]
+    best = int(np.argmax(_score(np.asarray(values, dtype=np.float64))))
+
+    o, c, b, s = test_slice
+    test = simulate_fixed_count(o, c, b[:, [best]], s[:, [best]], counts[[best]], init_cash)
+    return best, float(values[best]), {
+        'total_return': float(test['total_return'][0]),
+        'return_rate': float(test['return_rate'][0]),
+        'trade_count': int(test['trade_count'][0]),
+        'equity': test['equity'][:, 0],
+    }
+
+
+def _engine_window(task):
+    """完整回测路径的单个窗口"""
+    strategy_cls, combos, fixed_params, train_kdata, test_kdata, init_cash, rank_by = task
+    ppy = periods_per_year(train_kdata.get_query().ktype)
+    best, best_value = None, -np.inf
+    # 同一训练窗口的所有参数组合共享一个指标缓存，窗口结束即释放
+    with use_cache():
+        for i, params in enumerate(combos):
+            try:
+                engine = _run_engine(strategy_cls(**fixed_params, **params), train_kdata, init_cash)
+            except Exception as e:
+                print(f"参数 {params} 训练失败: {e}")
+                continue
+            curve = engine.equity_curve(train_kdata)
+            if rank_by in ('total_return', 'return_rate'):
+                total_return = curve['equity'][-1] - init_cash if len(curve['equity']) else 0.0
+                value = total_return if rank_by == 'total_return' else total_return / init_cash * 100
+            else:
+                value = risk_metrics(curve['equity'], curve['position'], curve['traded_value'], ppy)[rank_by]
+            score = float(_score(np.float64(value)))
+            if best is None or score > best_value:
+                best, best_value = i, score
+
+    if best is None:
+        raise ValueError("训练窗口内所有参数组合均失败")
+    engine = _run_engine(strategy_cls(**fixed_params, **combos[best]), test_kdata, init_cash)
+    curve = engine.equity_curve(test_kdata)
+    equity = curve['equity']
+    total_return = float(equity[-1] - init_cash) if len(equity) else 0.0
+    trade_count = engine.trade_book().trade_count()
+    return best, best_value, {
+        'total_return': total_return,
+        'return_rate': total_return / init_cash * 100 if init_cash > 0 else 0.0,
+        'trade_count': trade_count,
+        'equity': equity,
+    }
+
+
+def _stitch(windows, equities, init_cash):
+    """把各测试窗口的资产曲线按收益率首尾相接
+
+    step 小于 test 时测试窗口互相重叠，每个窗口只取上一个窗口未覆盖的部分。
+
+    Returns:
+        tuple: (K线下标数组, 拼接后的资产数组)
+    """
+    index, stitched = [], []
+    level = float(init_cash)
+    covered = None
+    for (_, test_start, test_end), equity in zip(windows, equities):
+        offset = 0 if covered is None else max(0, covered - test_start)
+        if offset >= len(equity):
+            continue
+        base = equity[offset - 1] if offset > 0 else init_cash
+        segment = equity[offset:] / base * level if base else np.full(len(equity) - offset, level)
+        index.append(np.arange(test_start + offset, test_end))
+        stitched.append(segment)
+        level = float(segment[-1])
+        covered = test_end
+    if not stitched:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float64)
+    return np.concatenate(index), np.concatenate(stitched)
+
+
+def walk_forward(strategy_cls, param_grid, kdata, train, test, step=None, init_cash=300000,
+                 fixed_params=None, rank_by='return_rate', anchored=False, mode='auto', workers=None):
+    """滚动前推优化
+
+    Args:
+        strategy_cls: 策略类
+        param_grid: {参数名: 取值列表}
+        kdata: 全部K线
+        train, test, step, anchored: 窗口划分，见 walk_forward_windows()
+        init_cash: 每个窗口的初始资金
+        fixed_params: 所有组合共用的其它构造参数
+        rank_by: 训练窗口内选参数的指标（越大越好），如 return_rate / total_return / sharpe / sortino
+        mode: 'vectorized' / 'engine' / 'auto'（有向量化内核时用 vectorized）
+        workers: 并行进程数，None 或 1 表示在当前进程内顺序执行
+
+    Returns:
+        dict:
+            windows: 每个窗口一行（起止日期、选中的参数、训练指标、测试收益）
+            datetime / equity: 拼接后的样本外资产曲线
+            metrics: 样本外整体的收益和风险指标
+    """
+    combos = expand_grid(param_grid)
+    if not combos:
+        raise ValueError("参数网格为空")
+    fixed_params = fixed_params or {}
+    if mode == 'auto':
+        mode = 'vectorized' if strategy_cls in SIGNAL_KERNELS else 'engine'
+
+    arrays = kdata_arrays(kdata)
+    n = len(arrays['close'])
+    windows = walk_forward_windows(n, train, test, step, anchored)
+    if not windows:
+        raise ValueError(f"K线数 {n} 不足以划分训练窗口 {train} + 测试窗口")
+    ppy = periods_per_year(kdata.get_query().ktype)
+
+    if mode == 'vectorized':
+        strategies = [strategy_cls(**fixed_params, **params) for params in combos]
+        # 全部参数组合的信号在整段K线上只算一次，各窗口共享
+        buy, sell = SIGNAL_KERNELS[strategy_cls](arrays['close'], strategies)
+        counts = np.asarray([s.fixed_count for s in strategies], dtype=np.float64)
+        o, c = arrays['open'], arrays['close']
+        tasks = [((o[a:b], c[a:b], buy[a:b], sell[a:b]), (o[b:e], c[b:e], buy[b:e], sell[b:e]),
+                  counts, init_cash, rank_by, ppy) for a, b, e in windows]
+        func, initializer, initargs = _vector_window, None, ()
+    elif mode == 'engine':
+        tasks = [(strategy_cls, combos, fixed_params, kdata.get_sub_kdata(a, b), kdata.get_sub_kdata(b, e),
+                  init_cash, rank_by) for a, b, e in windows]
+        func, initializer = _engine_window, _init_worker
+        initargs = (scoped_load_options([kdata.get_stock().market_code], [kdata.get_query().ktype]),)
+    else:
+        raise ValueError(f"未知计算路径: {mode}")
+
+    if workers is not None and workers > 1 and len(tasks) > 1:
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=ctx,
+                                 initializer=initializer, initargs=initargs) as pool:
+            outputs = list(pool.map(func, tasks))
+    else:
+        outputs = [func(task) for task in tasks]
+
+    dates = arrays['datetime']
+    rows, equities = [], []
+    for w, ((a, b, e), (best, train_value, test)) in enumerate(zip(windows, outputs)):
+        row = {
+            'window': w + 1,
+            'train_start': str(dates[a])[:10],
+            'train_end': str(dates[b - 1])[:10],
+            'test_start': str(dates[b])[:10],
+            'test_end': str(dates[e - 1])[:10],
+        }
+        row.update(combos[best])
+        row[f'train_{rank_by}'] = train_value
+        row.update({f'test_{k}': v for k, v in test.items() if k != 'equity'})
+        rows.append(row)
+        equities.append(test['equity'])
+
+    index, equity = _stitch(windows, equities, init_cash)
+    metrics = {}
+    if len(equity):
+        total_return = float(equity[-1] - init_cash)
+        metrics = {
+            'total_return': total_return,
+            'return_rate': total_return / init_cash * 100 if init_cash > 0 else 0.0,
+            'trade_count': sum(r['test_trade_count'] for r in rows),
+        }
+        metrics.update(risk_metrics(equity, ppy=ppy))
+    return {
+        'mode': mode,
+        'windows': rows,
+        'datetime': dates[index],
+        'equity': equity,
+        'metrics': metrics,
+    }
+
+
+def print_walk_forward(result, param_names):
+    """打印滚动前推结果"""
+    rows = result['windows']
+    if not rows:
+        print("没有可显示的窗口")
+        return
+    train_key = next(k for k in rows[0] if k.startswith('train_') and k not in ('train_start', 'train_end'))
+    param_header = " ".join(f"{name:>12}" for name in param_names)
+    width = 70 + 13 * len(param_names)
+
+    print("\n" + "=" * width)
+    print(f"滚动前推优化结果（{result['mode']}）")
+    print("=" * width)
+    print(f"{'窗口':>4} {'训练区间':<23} {'测试区间':<23} {param_header} {'训练指标':>10} {'测试收益率':>10} {'交易':>5}")
+    print("-" * width)
+    for r in rows:
+        params = " ".join(f"{str(r[name]):>12}" for name in param_names)
+        print(f"{r['window']:>4} {r['train_start']}~{r['train_end']} {r['test_start']}~{r['test_end']} "
+              f"{params} {r[train_key]:>10.2f} {r['test_return_rate']:>+9.2f}% {r['test_trade_count']:>5}")
+    print("-" * width)
+    m = result['metrics']
+    if m:
+        print(f"样本外合计: 收益率 {m['return_rate']:+.2f}%，最大回撤 {m['max_drawdown'] * 100:.2f}%，"
+              f"夏普 {m['sharpe']:.2f}，交易 {m['trade_count']} 次")
+    print("=" * width + "\n")
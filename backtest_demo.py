@@ -1,175 +1,200 @@
 import hikyuu as hku
-from strategies import EMACrossStrategy
+from strategies import EMACrossStrategy, get_cache, format_cache_stats
 from strategies.macd_strategy import MACDStrategy
-from backtest import BacktestEngine
+from backtest import (
+    compare_strategies,
+    print_comparison_table,
+    load_scoped,
+)
 from strategies.all_strategies import *
 
 
-def get_backtest_results(engine, kdata):
-    """提取回测结果数据"""
-    if engine.tm is None:
-        return None
-    
-    init_cash = engine.tm.init_cash
-    current_cash = engine.tm.current_cash
-    
-    # 计算持仓市值
-    current_value = 0.0
-    position_list = engine.tm.get_position_list()
-    if len(position_list) > 0:
-        current_price = kdata[-1].close if len(kdata) > 0 else 0
-        for pos in position_list:
-            try:
-                number = pos.number if hasattr(pos, 'number') else 0
-                current_value += number * current_price
-            except:
-                pass
-    
-    total_asset = current_cash + current_value
-    total_return = total_asset - init_cash
-    return_rate = (total_return / init_cash * 100) if init_cash > 0 else 0
-    
-    # 获取交易次数
-    trade_list = []
-    try:
-        trade_list = engine.tm.get_trade_list()
-        actual_trades = [t for t in trade_list if hasattr(t, 'business') and t.business.name != 'INIT']
-        trade_count = len(actual_trades)
-    except:
-        trade_count = 0
-    
-    return {
-        'init_cash': init_cash,
-        'total_asset': total_asset,
-        'total_return': total_return,
-        'return_rate': return_rate,
-        'trade_count': trade_count,
-        'current_cash': current_cash,
-        'current_value': current_value
-    }
-
-
-def run_strategy_backtest(strategy, kdata, init_cash=300000, verbose=False):
-    """运行单个策略的回测"""
-    if verbose:
-        print(f"\n{'='*60}")
-        print(f"测试策略: {strategy.get_description()}")
-        print(f"{'='*60}")
-    
-    # 创建交易信号和资金管理
-    sg = strategy.create_signal(kdata)
-    mm = strategy.create_money_manager()
-    
-    # 创建回测引擎
-    engine = BacktestEngine(init_cash=init_cash)
-    engine.create_trade_account()
-    engine.create_trade_system(sg, mm)
-    
-    # 运行回测
-    if verbose:
-        engine.run(kdata)
-    else:
-        engine.sys.run(kdata)
-    
-    # 获取结果
-    results = get_backtest_results(engine, kdata)
-    
-    if verbose:
-        engine.print_results(kdata)
-    
-    return results
-
-
-def compare_strategies(strategies, kdata, init_cash=300000, verbose=False):
-    """批量测试并对比多个策略"""
-    results = []
-    
-    for strategy in strategies:
-        try:
-            result = run_strategy_backtest(strategy, kdata, init_cash, verbose)
-            if result:
-                result['strategy_name'] = strategy.get_description()
-                results.append(result)
-        except Exception as e:
-            print(f"策略 {strategy.get_description()} 测试失败: {e}")
-            import traceback
-            traceback.print_exc()
-    
-    return results
-
-
-def print_comparison_table(results):
-    """打印策略对比表格"""
-    if not results:
-        print("没有可对比的结果")
-        return
-    
-    print("\n" + "="*100)
-    print("策略对比结果")
-    print("="*100)
-    print(f"{'策略名称':<40} {'初始资金':>12} {'总资产':>12} {'总收益':>12} {'收益率':>10} {'交易次数':>8}")
-    print("-"*100)
-    
-    for r in results:
-        print(f"{r['strategy_name']:<40} "
-              f"{r['init_cash']:>12,.2f} "
-              f"{r['total_asset']:>12,.2f} "
-              f"{r['total_return']:>+12,.2f} "
-              f"{r['return_rate']:>+9.2f}% "
-              f"{r['trade_count']:>8}")
-    
-    print("-"*100)
-    
-    # 找出最佳策略
-    if len(results) > 1:
-        best_by_return = max(results, key=lambda x: x['total_return'])
-        best_by_rate = max(results, key=lambda x: x['return_rate'])
-        
-        print(f"\n最佳总收益策略: {best_by_return['strategy_name']}")
-        print(f"  总收益: {best_by_return['total_return']:,.2f} 元, "
-              f"收益率: {best_by_return['return_rate']:.2f}%")
-        
-        if best_by_return != best_by_rate:
-            print(f"\n最佳收益率策略: {best_by_rate['strategy_name']}")
-            print(f"  总收益: {best_by_rate['total_return']:,.2f} 元, "
-                  f"收益率: {best_by_rate['return_rate']:.2f}%")
-    
-    print("="*100 + "\n")
+def demo_sweep(kdata):
+    """参数扫描：对参数网格做全组合回测并按收益率排名"""
+    from backtest import sweep, print_sweep_table
+
+    grid = {'fast_period': [5, 8, 10, 12], 'slow_period': [10, 20, 30]}
+    rows = sweep(EMACrossStrategy, grid, kdata, init_cash=300000, fixed_params={'fixed_count': 1000})
+    print_sweep_table(rows, list(grid.keys()))
+
+
+def demo_screen(kdata):
+    """大网格先向量化快速筛选，只对前 10 名做完整回测；再核对向量化模拟与完整回测是否一致"""
+    from backtest import print_sweep_table, screen_then_backtest, validate_against_engine
+
+    grid = {'fast_period': list(range(3, 53)), 'slow_period': list(range(5, 55))}
+    rows = screen_then_backtest(EMACrossStrategy, grid, kdata, top=10)
+    print_sweep_table(rows, list(grid.keys()))
+    for row in validate_against_engine([EMACrossStrategy(5, 10)], kdata):
+        print(row)
+
+
+def demo_universe(prefetch=0):
+    """全市场回测：对沪深主板和创业板的每只股票运行同一策略并汇总胜率、收益率分布
+
+    prefetch 大于 0 时后台线程提前读取后面几只股票的K线，与回测计算重叠（汇总中打印预取等待统计）
+    """
+    from backtest import print_universe_summary, run_universe
+
+    strategy = EMACrossStrategy(fast_period=5, slow_period=10, fixed_count=1000)
+    rows, summary = run_universe(strategy, hku.Query(-250), markets=['SH', 'SZ'], boards=['main', 'gem'],
+                                 workers=8, prefetch=prefetch)
+    print_universe_summary(summary, strategy.get_description())
+
+
+def demo_result_store(kdata, path='results/ema_sweep'):
+    """把扫描结果追加写入 Parquet，之后用 pandas 直接筛选排名"""
+    from backtest import ResultStore, load_results, sweep
+
+    grid = {'fast_period': [5, 8, 10, 12], 'slow_period': [10, 20, 30]}
+    with ResultStore(path, param_columns=list(grid.keys())) as store:
+        sweep(EMACrossStrategy, grid, kdata, store=store)
+    df = load_results(path, filters=[('trade_count', '>', 0)]).to_pandas()
+    print(df.sort_values('return_rate', ascending=False).head(20))
+
+
+def demo_kdata_cache(strategies, kdata, code='sz002415'):
+    """K线磁盘缓存：首次从 hikyuu 读取并写入 .npy，之后内存映射打开，并行工作进程共用"""
+    from backtest import KDataCache, print_sweep_table, screen
+
+    kcache = KDataCache('.kcache')
+    results = compare_strategies(strategies, kdata, workers=8, kdata_cache=kcache)
+    print_comparison_table(results)
+    grid = {'fast_period': list(range(3, 53)), 'slow_period': list(range(5, 55))}
+    arrays = kcache.get_arrays(code, hku.Query(-500))
+    rows = screen(EMACrossStrategy, grid, None, arrays=arrays)
+    print_sweep_table(rows[:20], list(grid.keys()))
+
+
+def demo_instrument(strategies, kdata):
+    """分阶段计时：查看耗时花在 create_signal / sys.run / 结果提取的哪一步，'memory' 同时记录内存峰值"""
+    from backtest import format_phases, run_strategy_backtest
+
+    result = run_strategy_backtest(strategies[0], kdata, instrument='memory')
+    print(format_phases(result['phases']))
+    # 每个策略输出 cProfile 和 tracemalloc 剖析文件
+    compare_strategies(strategies, kdata, profile_dir='profiles')
+
+
+def demo_verbose(strategy, kdata):
+    """查看某个策略的详细回测过程和结果"""
+    from backtest import run_strategy_backtest
+
+    print(f"\n查看详细结果（{strategy.get_description()}）:")
+    run_strategy_backtest(strategy, kdata, init_cash=300000, verbose=True)
+
+
+def demo_walk_forward(stock):
+    """滚动前推优化：每 500 根K线训练选参，之后 120 根样本外评估，拼接样本外资产曲线"""
+    from backtest import print_walk_forward, walk_forward
+
+    kdata = stock.get_kdata(hku.Query(-2000))
+    grid = {'fast_period': [3, 5, 8, 13], 'slow_period': [5, 10, 20, 40]}
+    wf = walk_forward(EMACrossStrategy, grid, kdata, train=500, test=120, fixed_params={'fixed_count': 1000},
+                      workers=4)
+    print_walk_forward(wf, list(grid.keys()))
+
+
+def demo_streaming(stock, kdata, path='state/ema_watchlist.pkl'):
+    """增量回测：首次用历史K线建立状态并存档，之后每天只追加当天一根K线"""
+    from backtest import StreamingWatchlist, kdata_arrays
+
+    history = {name: values[:-1] for name, values in kdata_arrays(kdata).items()}
+    wl = StreamingWatchlist(EMACrossStrategy(5, 10, fixed_count=1000))
+    wl.warm_up(stock.market_code, arrays=history)
+    wl.save(path)
+    # 之后每天：加载、追加当天的K线、再保存
+    wl = StreamingWatchlist.load(path)
+    k = kdata[-1]
+    wl.append(stock.market_code, k.datetime, k.open, k.high, k.low, k.close)
+    wl.save(path)
+    print(wl.results())
+
+
+def demo_result_cache(strategies, kdata, path='.cache/results.sqlite'):
+    """结果缓存：策略参数和K线都没变时直接取上次结果，新增策略时只回测新增的那个"""
+    from backtest import ResultCache
+
+    return compare_strategies(strategies, kdata, result_cache=ResultCache(path))
+
+
+def demo_portfolio(codes=('sz002415', 'sz000001', 'sh600519', 'sh600036', 'sz000858', 'sh601318')):
+    """组合回测：一篮子股票共用 100 万资金，最多同时持有 5 只，每只目标仓位 20%"""
+    from backtest import load_panel, portfolio_backtest, print_portfolio_summary
+
+    panel = load_panel(list(codes), hku.Query(-500))
+    pf = portfolio_backtest(EMACrossStrategy(5, 10), panel, init_cash=1000000, max_positions=5)
+    print_portfolio_summary(pf)
 
 
 # ==================== 主程序 ====================
 
-# 加载数据
-print("加载数据...")
-hku.load_hikyuu()
-print("✓ 数据加载完成\n")
+if __name__ == "__main__":
+    # 只加载要回测的股票和日线，不预加载（全市场回测等需要全部股票时改用 hku.load_hikyuu()）
+    # stock_code = 'sz000001'  # 平安银行
+    stock_code = 'sz002415'  # 海康威视
+    print("加载数据...")
+    timer = load_scoped([stock_code], ['day'])
+
+    # 获取股票
+    stock = hku.get_stock(stock_code)
+    print(f"股票: {stock.market_code} - {stock.name}")
+
+    # 获取K线数据
+    with timer.phase('get_kdata'):
+        kdata = stock.get_kdata(hku.Query(-150))  # 获取最近150条K线
+    print(f"✓ 数据加载完成，{timer.format()}\n")
+    print(f"K线数据: {len(kdata)} 条\n")
+
+    # 定义所有要测试的策略
+    strategies = [
+        # EMACrossStrategy(fast_period=5, slow_period=10, fixed_count=1000),
+        # MACDStrategy(fast_period=12, slow_period=26, signal_period=9, fixed_count=1000),
+        # BollingerBreakoutStrategy(n=20, k=2, fixed_count=1000*2),
+        EMACrossWithADXFilterStrategy(fast_period=5, slow_period=10, adx_period=14, adx_threshold=25, fixed_count=1000),
+    ]
+
+    print(f"准备测试 {len(strategies)} 种策略...")
+    print("="*60)
+
+    # 批量测试所有策略（verbose=False 表示不输出详细过程，workers>1 时使用多进程并行）
+    # resamples：对每个策略的逐笔盈亏做 10000 次自助抽样，对比表后附收益/回撤置信区间和破产概率
+    results = compare_strategies(strategies, kdata, init_cash=300000, verbose=False, workers=None,
+                                 resamples=10000)
+
+    # 结果缓存：策略参数和K线都没变时直接取上次结果，新增策略时只回测新增的那个
+    # results = demo_result_cache(strategies, kdata)
+
+    # 打印对比表格
+    print_comparison_table(results)
+    print(format_cache_stats(get_cache().stats()))
+
+    # 参数扫描：对参数网格做全组合回测并按收益率排名，相同指标只计算一次
+    # demo_sweep(kdata)
+
+    # 大网格先用向量化模拟快速筛选，只对前 10 名做完整回测，并核对两条路径的结果是否一致
+    # demo_screen(kdata)
+
+    # 滚动前推优化：每 500 根K线训练选参，之后 120 根样本外评估（需要更长的K线）
+    # demo_walk_forward(stock)
 
-# 获取股票
-# stock = hku.get_stock('sz000001')  # 平安银行
-stock = hku.get_stock('sz002415')  # 海康威视
-print(f"股票: {stock.market_code} - {stock.name}")
+    # 全市场回测：对沪深主板和创业板的每只股票运行同一策略并汇总胜率、收益率分布（需要全部股票的数据）
+    # demo_universe()
 
-# 获取K线数据
-kdata = stock.get_kdata(hku.Query(-150))  # 获取最近150条K线
-print(f"K线数据: {len(kdata)} 条\n")
+    # 组合回测：一篮子股票共用 100 万资金，最多同时持有 5 只，每只目标仓位 20%（需先加载这些股票）
+    # demo_portfolio()
 
-# 定义所有要测试的策略
-strategies = [
-    # EMACrossStrategy(fast_period=5, slow_period=10, fixed_count=1000),
-    # MACDStrategy(fast_period=12, slow_period=26, signal_period=9, fixed_count=1000),
-    # BollingerBreakoutStrategy(n=20, k=2, fixed_count=1000*2),
-    EMACrossWithADXFilterStrategy(fast_period=5, slow_period=10, adx_period=14, adx_threshold=25, fixed_count=1000),
-]
+    # 增量回测：首次用历史K线建立状态并存档，之后每天只追加当天一根K线（O(1)）
+    # demo_streaming(stock, kdata)
 
-print(f"准备测试 {len(strategies)} 种策略...")
-print("="*60)
+    # 把扫描结果追加写入 Parquet，之后用 pandas 直接筛选排名
+    # demo_result_store(kdata)
 
-# 批量测试所有策略（verbose=False 表示不输出详细过程）
-results = compare_strategies(strategies, kdata, init_cash=300000, verbose=False)
+    # K线磁盘缓存：首次从 hikyuu 读取并写入 .npy，之后内存映射打开，并行工作进程共用
+    # demo_kdata_cache(strategies, kdata)
 
-# 打印对比表格
-print_comparison_table(results)
+    # 分阶段计时：查看耗时花在 create_signal / sys.run / 结果提取的哪一步，并输出剖析文件
+    # demo_instrument(strategies, kdata)
 
-# 如果需要查看某个策略的详细结果，可以单独运行：
-# print("\n查看详细结果（EMA交叉策略）:")
-# run_strategy_backtest(strategies[0], kdata, init_cash=300000, verbose=True)
+    # 如果需要查看某个策略的详细结果，可以单独运行：
+    # demo_verbose(strategies[0], kdata)
@@ -0,0 +1,8 @@
+# benchmarks/__init__.py
+# -*- coding: utf-8 -*-
+
+"""
+离线基准测试：合成行情数据 + 回测/组合计算路径的吞吐、延迟分位数和内存峰值
+
+运行：python -m benchmarks --out bench.json [--baseline 上次结果.json]
+"""
@@ -0,0 +1,103 @@
+# __main__.py
+# -*- coding: utf-8 -*-
+
+"""
+命令行入口：python -m benchmarks --out bench.json [--baseline old.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import platform
+import sys
+import traceback
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+from .suites import backtest_suite, portfolio_suite
+
+
+DEFAULT_SIZES = [10, 1_000, 100_000, 1_000_000]
+
+
+def _key(row: Dict) -> str:
+    return f"{row['suite']}/{row['name']}/{row['size']}"
+
+
+def compare_to_baseline(results: List[Dict], baseline: Dict) -> List[Dict]:
+    """与上次结果对比 p50 延迟，ratio > 1 表示变慢"""
+    old = {_key(r): r for r in baseline.get("results", [])}
+    rows = []
+    for r in results:
+        b = old.get(_key(r))
+        if b and b.get("p50_ms"):
+            rows.append({"key": _key(r), "old_p50_ms": b["p50_ms"], "new_p50_ms": r["p50_ms"],
+                         "ratio": r["p50_ms"] / b["p50_ms"]})
+    return rows
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="离线基准测试")
+    parser.add_argument("--out", default="bench.json", help="结果 JSON 文件")
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES),
+                        help="持仓规模，逗号分隔")
+    parser.add_argument("--bars", type=int, default=1000, help="回测用例的K线数")
+    parser.add_argument("--strategies", type=int, default=16, help="compare_strategies 用例的策略数")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--suite", choices=["all", "portfolio", "backtest"], default="all")
+    parser.add_argument("--baseline", help="上次的结果 JSON，给出时输出 p50 延迟对比")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    results: List[Dict] = []
+    skipped: List[Dict] = []
+
+    if args.suite in ("all", "portfolio"):
+        results.extend(portfolio_suite(sizes, args.seed))
+    if args.suite in ("all", "backtest"):
+        if importlib.util.find_spec("hikyuu") is None:
+            skipped.append({"suite": "backtest", "reason": "hikyuu 不可用: 未安装"})
+        else:
+            try:
+                results.extend(backtest_suite(args.bars, args.strategies, args.seed))
+            except Exception as e:
+                skipped.append({"suite": "backtest", "reason": f"{e}\n{traceback.format_exc()}"})
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "seed": args.seed,
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["comparison"] = compare_to_baseline(results, json.load(f))
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"{'用例':<52} {'规模':>9} {'p50(ms)':>10} {'p99(ms)':>10} {'吞吐(/s)':>14} {'峰值内存(KB)':>14}")
+    for r in results:
+        print(f"{r['suite'] + '/' + r['name']:<52} {r['size']:>9} {r['p50_ms']:>10.3f} {r['p99_ms']:>10.3f} "
+              f"{r['throughput']:>14,.0f} {r.get('peak_kb', 0):>14,.1f}")
+    for s in skipped:
+        print(f"跳过 {s['suite']}: {s['reason'].splitlines()[0]}")
+    for c in report.get("comparison", []):
+        flag = "变慢" if c["ratio"] > 1.1 else ("变快" if c["ratio"] < 0.9 else "")
+        print(f"{c['key']:<60} {c['old_p50_ms']:>10.3f} -> {c['new_p50_ms']:>10.3f} ms  x{c['ratio']:.2f} {flag}")
+    print(f"\n结果已写入 {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
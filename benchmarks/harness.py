@@ -0,0 +1,82 @@
+# harness.py
+# -*- coding: utf-8 -*-
+
+"""
+计时工具：多次运行取延迟分位数与吞吐，单独一次 tracemalloc 运行取内存峰值
+"""
+
+from __future__ import annotations
+
+import gc
+import time
+import tracemalloc
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+
+def measure(
+    func: Callable[[], object],
+    items: int = 1,
+    repeat: Optional[int] = None,
+    warmup: int = 1,
+    min_time: float = 0.5,
+    max_repeat: int = 50,
+    trace_memory: bool = True,
+) -> Dict[str, float]:
+    """测量 func() 的延迟、吞吐和内存峰值
+
+    Args:
+        func: 无参数的被测函数
+        items: 每次调用处理的条目数（持仓数、K线数 × 策略数等），用于计算吞吐
+        repeat: 计时次数；None 表示自动：累计耗时超过 min_time 或达到 max_repeat 为止
+        warmup: 正式计时前的预热次数
+        min_time: 自动模式下的最短累计计时（秒）
+        max_repeat: 自动模式下的最多计时次数
+        trace_memory: 是否额外运行一次以 tracemalloc 记录内存峰值（不计入延迟）
+
+    Returns:
+        dict: runs / mean_ms / p50_ms / p90_ms / p99_ms / min_ms / throughput（条目/秒）/ peak_kb
+    """
+    for _ in range(warmup):
+        func()
+
+    times = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        while True:
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+            if repeat is not None:
+                if len(times) >= repeat:
+                    break
+            elif sum(times) >= min_time or len(times) >= max_repeat:
+                break
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    t = np.asarray(times)
+    p50, p90, p99 = np.percentile(t, [50, 90, 99])
+    result = {
+        "runs": len(times),
+        "mean_ms": float(t.mean() * 1000),
+        "p50_ms": float(p50 * 1000),
+        "p90_ms": float(p90 * 1000),
+        "p99_ms": float(p99 * 1000),
+        "min_ms": float(t.min() * 1000),
+        "throughput": float(items / p50) if p50 > 0 else float("inf"),
+    }
+
+    if trace_memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result["peak_kb"] = peak / 1024
+    return result
@@ -0,0 +1,102 @@
+# suites.py
+# -*- coding: utf-8 -*-
+
+"""
+基准用例
+
+- portfolio：build_positions / portfolio_summary / rebalance_plan / positions_report，
+  以及 PositionBook 列式路径，
+  持仓规模 10 ~ 1,000,000，只依赖 NumPy，总能运行
+- backtest：合成K线喂给策略类、BacktestEngine、compare_strategies 和向量化筛选，
+  需要可用的 hikyuu（不需要数据目录），不可用时整组跳过
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Sequence
+
+from .harness import measure
+from .synthetic import gbm_ohlcv, stock_columns, synthetic_book
+
+
+def portfolio_suite(sizes: Sequence[int], seed: int = 42) -> List[Dict]:
+    """组合计算路径"""
+    from portfolio_module import build_book, build_positions, portfolio_summary, positions_report, rebalance_plan
+
+    rules = {"max_trade_cash_fraction": 0.33}
+    results = []
+    for n in sizes:
+        raw, cash, targets = synthetic_book(n, seed=seed)
+        positions = build_positions(raw)
+        book = build_book(raw)
+        cases = {
+            "build_positions": lambda: build_positions(raw),
+            "portfolio_summary": lambda: portfolio_summary(positions, cash, True),
+            "rebalance_plan": lambda: rebalance_plan(positions, cash, targets, True, rules),
+            "positions_report": lambda: positions_report(positions),
+            "build_book": lambda: build_book(raw),
+            "book.portfolio_summary": lambda: portfolio_summary(book, cash, True),
+            "book.rebalance_plan": lambda: rebalance_plan(book, cash, targets, True, rules),
+            "book.report_columns": lambda: book.report_columns(),
+        }
+        for name, func in cases.items():
+            row = {"suite": "portfolio", "name": name, "size": n}
+            row.update(measure(func, items=n))
+            results.append(row)
+    return results
+
+
+def backtest_suite(n_bars: int = 1000, n_strategies: int = 16, seed: int = 42) -> List[Dict]:
+    """回测路径（合成K线设置在临时股票上，不读取 hikyuu 数据目录）"""
+    from backtest import compare_strategies, run_strategy_backtest, screen
+    from backtest.kcache import to_kdata
+    from backtest.vectorized import kdata_arrays
+    from strategies import EMACrossStrategy, MACDStrategy, use_cache
+    from strategies.all_strategies import BollingerBreakoutStrategy, EMACrossWithADXFilterStrategy
+
+    import hikyuu as hku
+
+    cols = stock_columns(gbm_ohlcv(1, n_bars, seed=seed), 0)
+    # 按沪深主板股票的品种信息（每手 100 股、价格精度 0.01）重建，与真实股票的回测口径一致
+    first, last = (int(str(cols["datetime"][i])[:10].replace("-", "")) * 10000 for i in (0, -1))
+    info = {"type": int(hku.constant.STOCKTYPE_A), "valid": True, "start_datetime": first, "last_datetime": last,
+            "tick": 0.01, "tick_value": 0.01, "precision": 2, "min_trade_number": 100, "max_trade_number": 1000000}
+    kdata = to_kdata(cols, "SZ600000", info=info)
+    arrays = kdata_arrays(kdata)
+
+    def cold(func):
+        # 每次在空的指标缓存下运行，测量未命中缓存的完整路径
+        def run():
+            with use_cache():
+                return func()
+        return run
+
+    results = []
+    strategy_cases = {
+        "EMACrossStrategy": EMACrossStrategy(5, 10, fixed_count=100),
+        "MACDStrategy": MACDStrategy(12, 26, 9, fixed_count=100),
+        "BollingerBreakoutStrategy": BollingerBreakoutStrategy(20, 2, fixed_count=100),
+        "EMACrossWithADXFilterStrategy": EMACrossWithADXFilterStrategy(5, 10, 14, 25, fixed_count=100),
+    }
+    for name, strategy in strategy_cases.items():
+        row = {"suite": "backtest", "name": f"create_signal/{name}", "size": n_bars}
+        row.update(measure(cold(lambda: strategy.create_signal(kdata)), items=n_bars))
+        results.append(row)
+        row = {"suite": "backtest", "name": f"run_strategy_backtest/{name}", "size": n_bars}
+        row.update(measure(cold(lambda: run_strategy_backtest(strategy, kdata, 300000)), items=n_bars))
+        results.append(row)
+
+    grid = [EMACrossStrategy(f, f + s, fixed_count=100)
+            for f in range(3, 3 + n_strategies // 4) for s in (5, 10, 20, 40)]
+    row = {"suite": "backtest", "name": f"compare_strategies/{len(grid)}", "size": n_bars}
+    row.update(measure(cold(lambda: compare_strategies(grid, kdata, 300000)), items=n_bars * len(grid)))
+    results.append(row)
+
+    param_grid = {"fast_period": list(range(3, 53)), "slow_period": list(range(5, 55))}
+    combos = len(param_grid["fast_period"]) * len(param_grid["slow_period"])
+    row = {"suite": "backtest", "name": f"screen/{combos}", "size": n_bars}
+    row.update(measure(lambda: screen(EMACrossStrategy, param_grid, None, arrays=arrays,
+                                      fixed_params={"fixed_count": 100}),
+                       items=n_bars * combos))
+    results.append(row)
+    return results
@@ -0,0 +1,101 @@
+# synthetic.py
+# -*- coding: utf-8 -*-
+
+"""
+合成数据：几何布朗运动 OHLCV 行情、任意规模的持仓簿
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+def gbm_ohlcv(
+    n_stocks: int,
+    n_bars: int,
+    seed: int = 42,
+    mu: float = 0.08,
+    sigma: float = 0.30,
+    s0: float = 20.0,
+    start: str = "2015-01-05",
+) -> Dict[str, np.ndarray]:
+    """按几何布朗运动生成日线 OHLCV
+
+    Args:
+        n_stocks: 股票数 N
+        n_bars: K线数 T
+        seed: 随机种子，相同种子生成相同数据
+        mu, sigma: 年化漂移和波动率
+        s0: 初始价格
+        start: 第一根K线日期（之后按工作日递增）
+
+    Returns:
+        dict: datetime (T,)，open/high/low/close/amount/volume (T, N)
+    """
+    rng = np.random.default_rng(seed)
+    dt = 1.0 / 252
+    log_ret = rng.normal((mu - 0.5 * sigma ** 2) * dt, sigma * np.sqrt(dt), (n_bars, n_stocks))
+    close = s0 * np.exp(np.cumsum(log_ret, axis=0))
+
+    prev_close = np.vstack([np.full((1, n_stocks), s0), close[:-1]])
+    gap = rng.normal(0.0, sigma * np.sqrt(dt) * 0.3, (n_bars, n_stocks))
+    open_price = prev_close * np.exp(gap)
+    wick = np.abs(rng.normal(0.0, sigma * np.sqrt(dt) * 0.5, (2, n_bars, n_stocks)))
+    high = np.maximum(open_price, close) * (1.0 + wick[0])
+    low = np.minimum(open_price, close) * (1.0 - wick[1])
+    volume = np.round(rng.lognormal(13.0, 0.5, (n_bars, n_stocks)), -2)
+
+    return {
+        "datetime": np.busday_offset(start, np.arange(n_bars), roll="forward").astype("M8[us]"),
+        "open": np.round(open_price, 2),
+        "high": np.round(high, 2),
+        "low": np.round(low, 2),
+        "close": np.round(close, 2),
+        "amount": volume * close,
+        "volume": volume,
+    }
+
+
+def stock_columns(data: Dict[str, np.ndarray], i: int) -> Dict[str, np.ndarray]:
+    """取出第 i 只股票的列（格式同 KDataCache 的缓存列，可直接传给 to_kdata）"""
+    cols = {"datetime": data["datetime"]}
+    for name in ("open", "high", "low", "close", "amount", "volume"):
+        cols[name] = np.ascontiguousarray(data[name][:, i])
+    return cols
+
+
+def synthetic_book(
+    n_positions: int,
+    n_groups: int = 8,
+    seed: int = 42,
+) -> Tuple[List[Dict], Dict, List[Dict]]:
+    """生成与 config.py 同格式的持仓、现金和目标仓位
+
+    Returns:
+        tuple: (POSITIONS, CASH, TARGETS)
+    """
+    rng = np.random.default_rng(seed)
+    groups = [f"G{g:02d}" for g in range(n_groups)]
+    group_idx = rng.integers(0, n_groups, n_positions)
+    shares = rng.integers(1, 100, n_positions) * 100
+    cost = np.round(rng.lognormal(2.5, 0.8, n_positions), 3)
+    price = np.round(cost * np.exp(rng.normal(0.0, 0.2, n_positions)), 3)
+
+    positions = [
+        {"ticker": f"T{i:07d}", "group": groups[g], "shares": int(s), "cost": float(c), "price": float(p)}
+        for i, (g, s, c, p) in enumerate(zip(group_idx, shares, cost, price))
+    ]
+    weights = rng.dirichlet(np.ones(n_groups))
+    targets = [
+        {"group": g, "target_weight": float(w), "band": 0.10}
+        for g, w in zip(groups, weights)
+    ]
+    market_value = float(np.sum(shares * price))
+    cash = {
+        "stock_cash": round(market_value * 0.05, 2),
+        "other_funds_total": round(market_value * 0.10, 2),
+        "other_funds_investable": round(market_value * 0.05, 2),
+    }
+    return positions, cash, targets
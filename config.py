@@ -30,6 +30,27 @@ CASH: Dict = {
     "other_funds_investable": 10000,    # 你愿意纳入"可投资池"的其他资金（可为 0）
 }
 
+# ============================================================
+# 成交记录配置（用于已实现盈亏）
+# ============================================================
+# 买卖记录：date, ticker, side(BUY/SELL), shares, price, fee(可选)
+# 按时间顺序填写；记录很多时改用 TRADES_FILE（CSV 或 Parquet，列名相同）
+TRADES: List[Dict] = [
+    # {"date": "2024-03-01", "ticker": "立讯精密", "side": "BUY", "shares": 400, "price": 55.118, "fee": 5},
+]
+TRADES_FILE: str = ""
+# 配对方式：fifo（先进先出）或 average（平均成本）
+TRADES_METHOD: str = "fifo"
+
+# ============================================================
+# 历史估值回放配置
+# ============================================================
+# ticker -> hikyuu 股票代码，用于读取逐日收盘价（main.py 的历史估值回放，portfolio_module.load_close_matrix）
+# 当前持仓和成交记录涉及的 ticker 都需要给出；为空时跳过回放
+TICKER_CODES: Dict[str, str] = {
+    # "立讯精密": "sz002475",
+}
+
 # ============================================================
 # 目标仓位配置
 # ============================================================
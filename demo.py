@@ -1,4 +1,5 @@
 import hikyuu as hku
+from backtest.loader import load_scoped
 
 print("=" * 60)
 print("步骤 1: hikyuu 已自动初始化")
@@ -42,10 +43,10 @@ try:
     # load_hikyuu 函数用于加载数据
     if hasattr(hku, 'load_hikyuu'):
         print("找到 load_hikyuu 函数，尝试加载数据...")
-        # 注意：load_hikyuu 可能需要参数，这里先尝试不传参数
-        # 如果失败，可能需要指定数据路径
-        hku.load_hikyuu()
-        print("✓ 数据加载完成")
+        # 只加载后面用到的股票和日线，不预加载K线，启动更快；
+        # 需要全部股票数据时改为 hku.load_hikyuu()
+        timer = load_scoped(['sz000001'], ['day'])
+        print(f"✓ 数据加载完成，{timer.format()}")
     else:
         print("未找到 load_hikyuu 函数")
 except Exception as e:
@@ -3,7 +3,7 @@
 
 from __future__ import annotations
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 import streamlit as st
 import pandas as pd
 
@@ -71,8 +71,8 @@ def display_portfolio_summary(summary: Dict[str, float], include_other: bool) ->
         st.metric("可投资总额", money(summary["investable_total"]))
 
 
-def display_positions(positions_data: List[Dict]) -> None:
-    """显示持仓明细"""
+def display_positions(positions_data: Union[List[Dict], Dict]) -> None:
+    """显示持仓明细（逐行字典列表，或 PositionBook.report_columns() 的列字典）"""
     st.header("📈 持仓明细（未实现盈亏贡献排行）")
     
     df = pd.DataFrame(positions_data)
@@ -190,7 +190,7 @@ def display_actions(action_data: List[Dict]) -> None:
 
 def display_all(
     summary: Dict[str, float],
-    positions_data: List[Dict],
+    positions_data: Union[List[Dict], Dict],
     deviation_data: List[Dict],
     action_data: List[Dict],
     include_other: bool,
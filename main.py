@@ -9,12 +9,19 @@ from __future__ import annotations
 # ============================================================
 # 导入配置和模块
 # ============================================================
-from config import POSITIONS, CASH, TARGETS, RULES, INCLUDE_OTHER_FUNDS
+from config import (
+    POSITIONS, CASH, TARGETS, RULES, INCLUDE_OTHER_FUNDS, TRADES, TRADES_FILE, TRADES_METHOD, TICKER_CODES,
+)
 from portfolio_module import (
-    build_positions,
+    build_book,
+    build_ledger,
+    load_close_matrix,
     portfolio_summary,
+    read_trades,
     rebalance_plan,
+    rebalance_orders,
     positions_report,
+    replay,
 )
 from display_module import print_table, money, pct
 
@@ -24,7 +31,7 @@ from display_module import print_table, money, pct
 # ============================================================
 
 def main() -> None:
-    positions = build_positions(POSITIONS)
+    positions = build_book(POSITIONS)
     summary = portfolio_summary(positions, CASH, INCLUDE_OTHER_FUNDS)
 
     # -------- 痛点1：更真实的收益（至少把未实现/成本口径说清楚）--------
@@ -113,8 +120,95 @@ def main() -> None:
         title="执行建议（痛点3：给你\"最大可买入金额\"来刹冲动）"
     )
 
-    # -------- 下一阶段预留：实现盈亏（痛点1 完整版）--------
-    print("\n（预留）实现盈亏：下一阶段只要你加一张 TRADES（买卖记录），就能把已卖出也纳入总收益口径。")
+    # 按股票的下单方案（整手、现金纪律、只动触发带宽的板块）
+    plan = rebalance_orders(
+        positions=positions,
+        cash=CASH,
+        targets=TARGETS,
+        include_other=INCLUDE_OTHER_FUNDS,
+        rules=RULES,
+    )
+    order_rows = [
+        [o["ticker"], o["group"], o["side"], f"{o['shares']:g}", money(o["price"]), money(o["amount"])]
+        for o in plan["orders"]
+    ]
+    order_rows += [["-", u["group"], "BUY", "-", "-", money(u["amount"]) + "（板块内无持仓，需自选标的）"]
+                   for u in plan["unassigned"]]
+    print_table(
+        ["Ticker", "Group", "方向", "股数", "价格", "金额"],
+        order_rows,
+        title=(f"下单方案（买入预算 {money(plan['budget'])}，"
+               f"跟踪误差 {pct(plan['tracking_error_before'])} → {pct(plan['tracking_error_after'])}）")
+    )
+
+    print_replay(positions)
+
+    # -------- 已实现盈亏（痛点1 完整版）--------
+    ledger = build_ledger(TRADES, TRADES_FILE, TRADES_METHOD)
+    if not ledger.fills:
+        print("\n已实现盈亏：config.TRADES / TRADES_FILE 中还没有买卖记录，总收益口径暂只含未实现盈亏。")
+        return
+
+    summary = portfolio_summary(positions, CASH, INCLUDE_OTHER_FUNDS, ledger=ledger)
+    realized_rows = [
+        [
+            r["ticker"],
+            money(r["realized_pnl"]),
+            f"{r['sold_shares']:g}",
+            money(r["sold_cost"]),
+            money(r["sold_proceeds"]),
+            f"{r['avg_holding_days']:.0f}",
+            f"{r['open_shares']:g}",
+            money(r["open_avg_cost"]),
+        ]
+        for r in ledger.report()
+    ]
+    print_table(
+        ["Ticker", "已实现盈亏", "卖出股数", "卖出成本", "卖出金额", "平均持有天数", "剩余股数", "剩余成本价"],
+        realized_rows,
+        title=f"已实现盈亏（{ledger.method.upper()}，{ledger.fills} 笔成交）"
+    )
+    print_table(
+        ["指标", "数值"],
+        [
+            ["未实现盈亏（持仓）", money(summary["unrealized_pnl"])],
+            ["已实现盈亏（已卖出）", money(summary["realized_pnl"])],
+            ["总盈亏", money(summary["total_pnl"])],
+        ],
+        title="总收益口径（未实现 + 已实现）"
+    )
+
+
+def print_replay(positions) -> None:
+    """历史估值回放：config.TICKER_CODES 中的股票从 hikyuu 读取逐日收盘价，打印带宽触发的翻转记录"""
+    if not TICKER_CODES:
+        print("\n历史估值回放：config.TICKER_CODES 为空（ticker -> hikyuu 股票代码），跳过。")
+        return
+
+    import pandas as pd
+    from backtest.loader import load_scoped
+
+    frames = [pd.DataFrame(TRADES)] if TRADES else []
+    if TRADES_FILE:
+        frames.extend(read_trades(TRADES_FILE))
+    trades = pd.concat(frames, ignore_index=True) if frames else None
+
+    load_scoped(list(TICKER_CODES.values()), ["day"])
+    try:
+        dates, tickers, close = load_close_matrix(TICKER_CODES)
+        result = replay(dates, tickers, close, positions, CASH, TARGETS, INCLUDE_OTHER_FUNDS, trades=trades)
+    except (KeyError, ValueError) as e:
+        print(f"\n历史估值回放失败：{e}（持仓和成交涉及的 ticker 都需要在 config.TICKER_CODES 中给出代码）")
+        return
+    event_rows = [
+        [str(e["date"]), e["group"], ("触发" if e["triggered"] else "恢复"), pct(e["weight"]), pct(e["target_weight"])]
+        for e in result.trigger_events()
+    ]
+    print_table(
+        ["日期", "Group", "状态", "当日占比", "目标占比"],
+        event_rows,
+        title=f"历史带宽触发记录（{result.dates[0]} ~ {result.dates[-1]}，{len(result.dates)} 个交易日）"
+    )
 
 
 if __name__ == "__main__":
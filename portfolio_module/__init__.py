@@ -7,16 +7,38 @@
 
 from .portfolio import (
     Position,
+    PositionBook,
     build_positions,
+    build_book,
+    as_book,
     portfolio_summary,
     rebalance_plan,
     positions_report,
 )
+from .valuation import LiveValuation
+from .orders import rebalance_orders
+from .scenarios import ScenarioResult, evaluate_scenarios, targets_matrix
+from .ledger import TradeLedger, build_ledger, read_trades
+from .replay import ReplayResult, load_close_matrix, replay
 
 __all__ = [
     "Position",
+    "PositionBook",
     "build_positions",
+    "build_book",
+    "as_book",
     "portfolio_summary",
     "rebalance_plan",
     "positions_report",
+    "LiveValuation",
+    "rebalance_orders",
+    "ScenarioResult",
+    "evaluate_scenarios",
+    "targets_matrix",
+    "TradeLedger",
+    "build_ledger",
+    "read_trades",
+    "ReplayResult",
+    "load_close_matrix",
+    "replay",
 ]
@@ -0,0 +1,401 @@
+# ledger.py
+# -*- coding: utf-8 -*-
+
+"""
+已实现盈亏台账：逐笔买卖记录按 FIFO（或平均成本）配对，得到已实现盈亏、持有天数和剩余持仓成本。
+
+- 每只 ticker 一个未平仓批次队列（deque），卖出从队首依次消耗，每笔成交 O(配对批次数)
+- 输入按块流式读取（CSV / Parquet），单遍处理；台账状态可保存，后续只需追加新成交，不会重配历史
+- 成交需按时间顺序输入（同一 ticker 内的先后顺序决定 FIFO 配对）
+
+成交记录字段：date, ticker, side(BUY/SELL，也接受 买入/卖出), shares, price, fee(可选，默认 0)。
+买入费用计入成本，卖出费用从卖出金额中扣除。
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+_BUY_SIDES = {"BUY", "B", "买", "买入"}
+_SELL_SIDES = {"SELL", "S", "卖", "卖出"}
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def read_trades(path: str, chunksize: int = 500_000, skip: int = 0) -> Iterator[pd.DataFrame]:
+    """按块读取成交文件（.csv / .parquet）
+
+    Args:
+        path: 文件路径
+        chunksize: 每块行数
+        skip: 跳过文件开头已处理过的行数（增量追加时使用）
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(path)
+        groups, drop = _unread_row_groups(
+            [pf.metadata.row_group(i).num_rows for i in range(pf.num_row_groups)], skip)
+        if not groups:
+            return
+        for batch in pf.iter_batches(batch_size=chunksize, row_groups=groups):
+            df = batch.to_pandas()
+            if drop:
+                df, drop = df.iloc[drop:], max(0, drop - len(df))
+            if len(df):
+                yield df
+    else:
+        skiprows = (lambda i: 0 < i <= skip) if skip else None
+        yield from pd.read_csv(path, chunksize=chunksize, skiprows=skiprows)
+
+
+def _unread_row_groups(group_rows: List[int], skip: int) -> Tuple[List[int], int]:
+    """整个已处理的行组直接跳过，不读取
+
+    Returns:
+        (需要读取的行组序号, 第一个读取的行组内仍需丢弃的行数)
+    """
+    groups, start, drop = [], 0, 0
+    for i, rows in enumerate(group_rows):
+        if start + rows > skip:
+            if not groups:
+                drop = max(0, skip - start)
+            groups.append(i)
+        start += rows
+    return groups, drop
+
+
+def _side_flags(side: pd.Series) -> np.ndarray:
+    """True=买入，False=卖出"""
+    s = side.astype(str).str.strip().str.upper()
+    is_buy = s.isin(_BUY_SIDES).to_numpy()
+    bad = ~is_buy & ~s.isin(_SELL_SIDES).to_numpy()
+    if bad.any():
+        raise ValueError(f"无法识别的买卖方向: {side[bad].iloc[0]!r}")
+    return is_buy
+
+
+class TradeLedger:
+    """FIFO / 平均成本 已实现盈亏台账
+
+    Attributes:
+        method: 'fifo' 或 'average'
+        realized: ticker -> 已实现盈亏
+        fills: 已处理的成交笔数
+        unmatched: ticker -> 卖出时没有可配对持仓的股数（strict=False 时记录）
+
+    strict=True 时超卖直接抛出 ValueError：add() 在追加时检查并拒绝该笔成交；
+    add_frame() / ingest() 时当前块已部分处理，台账应丢弃后修正数据重建。
+    add() 逐笔追加的成交先进入列缓冲区，在读取结果或处理下一块前整块配对。
+    """
+
+    _FLUSH_SIZE = 100_000
+
+    def __init__(self, method: str = "fifo", strict: bool = True) -> None:
+        if method not in ("fifo", "average"):
+            raise ValueError(f"未知配对方式: {method}")
+        self.method = method
+        self.strict = strict
+        self._realized: Dict[str, float] = {}
+        self._unmatched_shares: Dict[str, float] = {}
+        self._fills = 0
+        # fifo: ticker -> deque([[股数, 每股成本, 买入日]])
+        # average: ticker -> [股数, 总成本, 股数×买入日 之和]
+        self._lots: Dict[str, object] = {}
+        # 已配对记录（列式存储，节省内存）
+        self._m_ticker: List[str] = []
+        self._m_buy_day: List[float] = []
+        self._m_sell_day: List[int] = []
+        self._m_shares: List[float] = []
+        self._m_cost: List[float] = []
+        self._m_proceeds: List[float] = []
+        # 文件路径 -> 已处理的行数
+        self._offsets: Dict[str, int] = {}
+        # add() 追加、尚未配对的成交（列缓冲区）
+        self._pending: Dict[str, List] = {k: [] for k in ("date", "ticker", "side", "shares", "price", "fee")}
+        # strict 时缓冲区内各 ticker 的净买入股数，用于在 add() 时即检查超卖
+        self._pending_net: Dict[str, float] = {}
+
+    # -------- 输入 --------
+
+    def add(self, date, ticker: str, side: str, shares: float, price: float, fee: float = 0.0) -> None:
+        """追加单笔成交到缓冲区，累积到 _FLUSH_SIZE 笔或读取结果时整块配对
+
+        买卖方向和（strict=True 时）超卖在追加时即检查，出错的成交不会进入缓冲区。
+        """
+        s = str(side).strip().upper()
+        buy = s in _BUY_SIDES
+        if not buy and s not in _SELL_SIDES:
+            raise ValueError(f"无法识别的买卖方向: {side!r}")
+        if self.strict:
+            net = self._pending_net.get(ticker, 0.0)
+            if not buy and shares > self._held(ticker) + net:
+                raise ValueError(f"{ticker} 在 {date} 卖出 {shares:g} 股超过当前持仓")
+            self._pending_net[ticker] = net + shares if buy else net - shares
+
+        pending = self._pending
+        pending["date"].append(date)
+        pending["ticker"].append(ticker)
+        pending["side"].append(side)
+        pending["shares"].append(shares)
+        pending["price"].append(price)
+        pending["fee"].append(fee)
+        if len(pending["date"]) >= self._FLUSH_SIZE:
+            self.flush()
+
+    def flush(self) -> int:
+        """把 add() 缓冲的成交整块配对，返回处理笔数"""
+        pending = self._pending
+        if not pending["date"]:
+            return 0
+        n = self._process(pd.DataFrame(pending))
+        self._pending = {k: [] for k in pending}
+        self._pending_net = {}
+        return n
+
+    def add_records(self, records: Iterable[Dict]) -> int:
+        """处理字典列表（如 config.TRADES），返回处理笔数"""
+        records = list(records)
+        if not records:
+            return 0
+        return self.add_frame(pd.DataFrame(records))
+
+    def add_frame(self, df: pd.DataFrame) -> int:
+        """处理一块成交，返回处理笔数（先处理 add() 缓冲的成交，保证时间顺序）"""
+        self.flush()
+        return self._process(df)
+
+    def _process(self, df: pd.DataFrame) -> int:
+        n = len(df)
+        if n == 0:
+            return 0
+        days = (pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]") - _EPOCH).astype(np.int64)
+        is_buy = _side_flags(df["side"])
+        shares = df["shares"].to_numpy(dtype=np.float64)
+        price = df["price"].to_numpy(dtype=np.float64)
+        fee = df["fee"].fillna(0.0).to_numpy(dtype=np.float64) if "fee" in df else np.zeros(n)
+        tickers = df["ticker"].astype(str).tolist()
+
+        process = self._fifo if self.method == "fifo" else self._average
+        process(tickers, is_buy.tolist(), shares.tolist(), price.tolist(), fee.tolist(), days.tolist())
+        self._fills += n
+        return n
+
+    def ingest(self, path: str, chunksize: int = 500_000) -> int:
+        """流式处理成交文件；同一文件再次调用时只处理新追加的行
+
+        Returns:
+            本次处理的笔数
+        """
+        key = os.path.abspath(path)
+        done = self._offsets.get(key, 0)
+        n = 0
+        for chunk in read_trades(path, chunksize, skip=done):
+            n += self.add_frame(chunk)
+            self._offsets[key] = done + n
+        return n
+
+    # -------- 配对 --------
+
+    def _held(self, ticker: str) -> float:
+        """已配对部分的当前持股数（不含缓冲区）"""
+        lots = self._lots.get(ticker)
+        if lots is None:
+            return 0.0
+        if self.method == "fifo":
+            return sum(lot[0] for lot in lots)
+        return lots[0]
+
+    def _unmatched(self, ticker: str, day: int, qty: float) -> None:
+        if self.strict:
+            date = _EPOCH + np.timedelta64(day, "D")
+            raise ValueError(f"{ticker} 在 {date} 卖出 {qty:g} 股超过当前持仓")
+        self._unmatched_shares[ticker] = self._unmatched_shares.get(ticker, 0.0) + qty
+
+    def _fifo(self, tickers, is_buy, shares, price, fee, days) -> None:
+        lots_by_ticker = self._lots
+        realized = self._realized
+        m_ticker, m_buy, m_sell = self._m_ticker, self._m_buy_day, self._m_sell_day
+        m_shares, m_cost, m_proceeds = self._m_shares, self._m_cost, self._m_proceeds
+
+        for ticker, buy, qty, px, f, day in zip(tickers, is_buy, shares, price, fee, days):
+            lots = lots_by_ticker.get(ticker)
+            if lots is None:
+                lots = lots_by_ticker[ticker] = deque()
+            if buy:
+                lots.append([qty, px + f / qty if qty else px, day])
+                continue
+
+            net_px = px - f / qty if qty else px    # 每股净卖出价
+            remaining = qty
+            pnl = 0.0
+            while remaining > 0 and lots:
+                lot = lots[0]
+                take = lot[0] if lot[0] <= remaining else remaining
+                cost = take * lot[1]
+                proceeds = take * net_px
+                pnl += proceeds - cost
+                m_ticker.append(ticker)
+                m_buy.append(lot[2])
+                m_sell.append(day)
+                m_shares.append(take)
+                m_cost.append(cost)
+                m_proceeds.append(proceeds)
+                remaining -= take
+                if take == lot[0]:
+                    lots.popleft()
+                else:
+                    lot[0] -= take
+            realized[ticker] = realized.get(ticker, 0.0) + pnl
+            if remaining > 0:
+                self._unmatched(ticker, day, remaining)
+
+    def _average(self, tickers, is_buy, shares, price, fee, days) -> None:
+        state_by_ticker = self._lots
+        realized = self._realized
+
+        for ticker, buy, qty, px, f, day in zip(tickers, is_buy, shares, price, fee, days):
+            state = state_by_ticker.get(ticker)
+            if state is None:
+                state = state_by_ticker[ticker] = [0.0, 0.0, 0.0]
+            if buy:
+                state[0] += qty
+                state[1] += qty * px + f
+                state[2] += qty * day
+                continue
+
+            take = min(qty, state[0])
+            if take > 0:
+                avg_cost = state[1] / state[0]
+                avg_day = state[2] / state[0]
+                cost = take * avg_cost
+                proceeds = take * px - f * (take / qty)
+                realized[ticker] = realized.get(ticker, 0.0) + proceeds - cost
+                self._m_ticker.append(ticker)
+                self._m_buy_day.append(avg_day)
+                self._m_sell_day.append(day)
+                self._m_shares.append(take)
+                self._m_cost.append(cost)
+                self._m_proceeds.append(proceeds)
+                state[0] -= take
+                state[1] -= cost
+                state[2] -= take * avg_day
+            if qty > take:
+                self._unmatched(ticker, day, qty - take)
+
+    # -------- 输出 --------
+
+    @property
+    def realized(self) -> Dict[str, float]:
+        self.flush()
+        return self._realized
+
+    @property
+    def unmatched(self) -> Dict[str, float]:
+        self.flush()
+        return self._unmatched_shares
+
+    @property
+    def fills(self) -> int:
+        self.flush()
+        return self._fills
+
+    @property
+    def realized_pnl(self) -> float:
+        return float(sum(self.realized.values()))
+
+    def matches(self) -> pd.DataFrame:
+        """已配对的批次：ticker, buy_date, sell_date, shares, cost, proceeds, pnl, holding_days
+
+        平均成本法下每笔卖出一行，buy_date 为按股数加权的平均买入日。
+        """
+        self.flush()
+        buy_day = np.asarray(self._m_buy_day, dtype=np.float64)
+        sell_day = np.asarray(self._m_sell_day, dtype=np.int64)
+        cost = np.asarray(self._m_cost, dtype=np.float64)
+        proceeds = np.asarray(self._m_proceeds, dtype=np.float64)
+        return pd.DataFrame({
+            "ticker": self._m_ticker,
+            "buy_date": _EPOCH + np.round(buy_day).astype(np.int64).astype("timedelta64[D]"),
+            "sell_date": _EPOCH + sell_day.astype("timedelta64[D]"),
+            "shares": np.asarray(self._m_shares, dtype=np.float64),
+            "cost": cost,
+            "proceeds": proceeds,
+            "pnl": proceeds - cost,
+            "holding_days": sell_day - buy_day,
+        })
+
+    def open_positions(self) -> Dict[str, Tuple[float, float]]:
+        """剩余持仓：ticker -> (股数, 每股成本)，成本含买入费用"""
+        self.flush()
+        out = {}
+        for ticker, lots in self._lots.items():
+            if self.method == "fifo":
+                qty = sum(lot[0] for lot in lots)
+                basis = sum(lot[0] * lot[1] for lot in lots)
+            else:
+                qty, basis = lots[0], lots[1]
+            if qty > 0:
+                out[ticker] = (qty, basis / qty)
+        return out
+
+    def report(self) -> List[Dict]:
+        """按 ticker 汇总：已实现盈亏、卖出股数、按股数加权的平均持有天数、剩余持仓，按已实现盈亏排序"""
+        m = self.matches()
+        stats: Dict[str, Dict] = {}
+        if len(m):
+            m["weighted_days"] = m["holding_days"] * m["shares"]
+            g = m.groupby("ticker", sort=False)[["shares", "cost", "proceeds", "weighted_days"]].sum()
+            stats = g.to_dict("index")
+        open_pos = self.open_positions()
+        rows = []
+        for ticker in set(self.realized) | set(open_pos):
+            s = stats.get(ticker, {})
+            sold = float(s.get("shares", 0.0))
+            qty, avg_cost = open_pos.get(ticker, (0.0, 0.0))
+            rows.append({
+                "ticker": ticker,
+                "realized_pnl": self.realized.get(ticker, 0.0),
+                "sold_shares": sold,
+                "sold_cost": float(s.get("cost", 0.0)),
+                "sold_proceeds": float(s.get("proceeds", 0.0)),
+                "avg_holding_days": float(s["weighted_days"]) / sold if sold else 0.0,
+                "open_shares": qty,
+                "open_avg_cost": avg_cost,
+            })
+        rows.sort(key=lambda r: r["realized_pnl"], reverse=True)
+        return rows
+
+    # -------- 持久化 --------
+
+    def save(self, path: str) -> None:
+        """保存全部状态（写入临时文件后改名）"""
+        self.flush()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def load(path: str) -> "TradeLedger":
+        """加载 save() 保存的状态"""
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+def build_ledger(records: Optional[Iterable[Dict]] = None, path: str = "", method: str = "fifo") -> TradeLedger:
+    """由 config.TRADES 和/或成交文件建立台账"""
+    ledger = TradeLedger(method)
+    if records:
+        ledger.add_records(records)
+    if path:
+        ledger.ingest(path)
+    return ledger
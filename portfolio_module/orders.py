@@ -0,0 +1,209 @@
+# orders.py
+# -*- coding: utf-8 -*-
+
+"""
+按股票的再平衡下单方案：在 rebalance_plan 的板块金额之上，给出具体买卖哪只、多少股。
+
+- 只处理触发带宽的板块（与 rebalance_plan 的 triggered 一致），目标是回到目标金额
+- 卖出：超配板块内优先用一笔订单完成（市值足够的股票中按整手取整误差最小者），
+  不够时整只卖出最大的持仓再继续；部分卖出按整手，清仓可卖出零股
+- 买入：预算 = 证券账户现金 × max_trade_cash_fraction + 本次卖出所得；预算不足时按
+  "注水"分配，使各欠配板块的剩余缺口尽量相等（平方跟踪误差最小）；每个板块只买一只股票，
+  选整手取整后剩余误差最小的那只
+- 板块内没有任何持仓的欠配板块无法确定买哪只，列入 unassigned
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List
+
+import numpy as np
+
+from .portfolio import PositionsLike, as_book, normalize_targets, portfolio_summary
+
+
+def _water_fill(needs: np.ndarray, budget: float) -> np.ndarray:
+    """在总额 budget 内分配，使各项剩余缺口 max(need - 分配, 0) 的最大值最小"""
+    if budget <= 0 or needs.size == 0:
+        return np.zeros_like(needs)
+    if budget >= needs.sum():
+        return needs.copy()
+    s = np.sort(needs)[::-1]
+    levels = (np.cumsum(s) - budget) / np.arange(1, len(s) + 1)
+    k = np.flatnonzero(s > levels)[-1]
+    return np.maximum(needs - levels[k], 0.0)
+
+
+def _pick_sells(value: np.ndarray, price: np.ndarray, shares: np.ndarray, amount: float, lot: int) -> List[tuple]:
+    """在一个板块内选择卖出：返回 [(下标, 股数)]"""
+    # 按市值从大到小排列：尚未卖出的总是排序后的一个后缀，市值足够的是该后缀的前缀
+    order = np.argsort(-value, kind="stable")
+    value, price, shares = value[order], price[order], shares[order]
+    lot_value = price * lot
+    suffix_min = np.minimum.accumulate(lot_value[::-1])[::-1]
+    neg_value = -value
+
+    picks = []
+    remaining = amount
+    p = 0
+    while remaining > 0 and p < len(value):
+        # 市值足以单笔完成的股票：按整手四舍五入，取误差最小者（同误差取市值大者）
+        q = int(np.searchsorted(neg_value, -remaining, side="right"))
+        if q > p:
+            lots = np.minimum(np.round(remaining / lot_value[p:q]), np.floor(shares[p:q] / lot))
+            i = int(np.argmin(np.abs(remaining - lots * lot_value[p:q])))
+            # 取整为 0 手说明剩余不到半手，不再下单
+            if lots[i] > 0:
+                picks.append((int(order[p + i]), float(lots[i] * lot)))
+            break
+        # 都不够：整只卖出市值最大的，再处理剩余
+        picks.append((int(order[p]), float(shares[p])))
+        remaining -= value[p]
+        p += 1
+        # 剩余不足半手时停止，避免多一笔只降低很少误差的订单
+        if p < len(value) and remaining < 0.5 * suffix_min[p]:
+            break
+    return picks
+
+
+def rebalance_orders(
+    positions: PositionsLike,
+    cash: Dict,
+    targets: List[Dict],
+    include_other: bool,
+    rules: Dict,
+    lot: int = 100,
+    only_triggered: bool = True,
+) -> Dict:
+    """
+    生成按股票的买卖订单。
+
+    Args:
+        positions: Position 列表或 PositionBook（同一板块内同一 ticker 的多行按股数合并，价格取第一行；
+                   同一 ticker 分属多个板块时各板块分别计算和下单）
+        cash / targets / include_other / rules: 与 rebalance_plan 相同
+        lot: 每手股数
+        only_triggered: 只调整触发带宽的板块；False 时所有偏离的板块都向目标调整
+
+    Returns:
+        字典：
+            orders: 订单列表（先卖后买），每项含 ticker/group/side/shares/price/amount
+            groups: 每个板块调整前后的金额和权重偏离
+            unassigned: 欠配但板块内没有持仓、无法确定股票的板块及金额
+            budget / sell_proceeds / buy_amount / tracking_error_before / tracking_error_after
+    """
+    book = as_book(positions)
+    summary = portfolio_summary(book, cash, include_other)
+    total = summary["investable_total"]
+    stock_cash = summary["stock_cash"]
+
+    t = normalize_targets(targets)
+    groups = sorted(set(t) | set(book.groups))
+    gindex = {g: i for i, g in enumerate(groups)}
+    book_to_group = np.array([gindex[g] for g in book.groups], dtype=np.int64)
+
+    # 按 (ticker, 板块) 合并：板块市值与 rebalance_plan / LiveValuation 一样逐行累加
+    _, ticker_codes = np.unique(book.tickers, return_inverse=True)
+    pair = ticker_codes.astype(np.int64) * max(len(book.groups), 1) + book.group_codes
+    _, first, inverse = np.unique(pair, return_index=True, return_inverse=True)
+    tickers = book.tickers[first]
+    shares = np.bincount(inverse, weights=book.shares, minlength=len(first))
+    price = book.price[first]
+    value = np.bincount(inverse, weights=book.market_value, minlength=len(first))
+    tgroup = book_to_group[book.group_codes[first]] if len(first) else np.zeros(0, dtype=np.int64)
+
+    weights = np.array([t.get(g, {}).get("w", 0.0) for g in groups])
+    bands = np.array([t.get(g, {}).get("band", 0.0) for g in groups])
+    current = np.bincount(tgroup, weights=value, minlength=len(groups))
+    target = total * weights
+    diff = target - current
+    triggered = (target > 0) & (np.abs(diff) > target * bands)
+    act = triggered if only_triggered else (target > 0) | (current > 0)
+
+    members = [np.flatnonzero(tgroup == g) for g in range(len(groups))]
+    orders: List[Dict] = []
+    change = np.zeros(len(groups))
+
+    # -------- 卖出 --------
+    proceeds = 0.0
+    for g in np.flatnonzero(act & (diff < 0)).tolist():
+        m = members[g]
+        for i, n in _pick_sells(value[m], price[m], shares[m], -diff[g], lot):
+            j = m[i]
+            amount = n * float(price[j])
+            proceeds += amount
+            change[g] -= amount
+            orders.append({"ticker": str(tickers[j]), "group": groups[g], "side": "SELL",
+                           "shares": n, "price": float(price[j]), "amount": amount})
+
+    # -------- 买入 --------
+    budget = stock_cash * float(rules.get("max_trade_cash_fraction", 1.0)) + proceeds
+    buy_groups = np.flatnonzero(act & (diff > 0))
+    has_members = np.array([members[g].size > 0 for g in buy_groups], dtype=bool)
+    unassigned = [{"group": groups[g], "amount": float(diff[g])} for g in buy_groups[~has_members].tolist()]
+    buy_groups = buy_groups[has_members]
+    alloc = _water_fill(diff[buy_groups], budget)
+
+    chosen: Dict[int, int] = {}
+    lots_bought: Dict[int, float] = {}
+    spent = 0.0
+    for g, a in zip(buy_groups.tolist(), alloc.tolist()):
+        m = members[g]
+        lot_value = price[m] * lot
+        lots = np.floor(a / lot_value)
+        err = a - lots * lot_value
+        k = int(np.lexsort((-value[m], err))[0])
+        chosen[g] = int(m[k])
+        lots_bought[g] = float(lots[k])
+        spent += float(lots[k] * lot_value[k])
+
+    # 向下取整后剩余的预算：按剩余缺口从大到小，再各补一手（能降低误差且预算够时）
+    leftover = budget - spent
+    gap = {g: float(diff[g]) - lots_bought[g] * float(price[chosen[g]]) * lot for g in chosen}
+    for g in sorted(gap, key=gap.get, reverse=True):
+        lot_value = float(price[chosen[g]]) * lot
+        if lot_value <= leftover and lot_value < 2 * gap[g]:
+            lots_bought[g] += 1
+            leftover -= lot_value
+            gap[g] -= lot_value
+
+    buy_amount = 0.0
+    for g, j in chosen.items():
+        n = lots_bought[g] * lot
+        if n <= 0:
+            continue
+        amount = n * float(price[j])
+        buy_amount += amount
+        change[g] += amount
+        orders.append({"ticker": str(tickers[j]), "group": groups[g], "side": "BUY",
+                       "shares": n, "price": float(price[j]), "amount": amount})
+
+    # -------- 汇总 --------
+    after = current + change
+    # 买卖只是现金与股票之间的转换，可投资总额不变
+    cur_w = current / total if total else np.zeros_like(current)
+    after_w = after / total if total else np.zeros_like(after)
+    group_rows = [{
+        "group": groups[g],
+        "triggered": bool(triggered[g]),
+        "current_value": float(current[g]),
+        "target_value": float(target[g]),
+        "after_value": float(after[g]),
+        "diff_before": float(diff[g]),
+        "diff_after": float(target[g] - after[g]),
+        "weight_before": float(cur_w[g]),
+        "weight_after": float(after_w[g]),
+        "target_weight": float(weights[g]),
+    } for g in range(len(groups))]
+    group_rows.sort(key=lambda r: abs(r["diff_before"]), reverse=True)
+
+    return {
+        "orders": orders,
+        "groups": group_rows,
+        "unassigned": unassigned,
+        "budget": budget,
+        "sell_proceeds": proceeds,
+        "buy_amount": buy_amount,
+        "tracking_error_before": float(np.sqrt(np.sum((cur_w - weights) ** 2))),
+        "tracking_error_after": float(np.sqrt(np.sum((after_w - weights) ** 2))),
+    }
@@ -4,7 +4,12 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .ledger import TradeLedger
 
 
 @dataclass
@@ -46,16 +51,156 @@ def build_positions(raw: List[Dict]) -> List[Position]:
     ]
 
 
-def portfolio_summary(positions: List[Position], cash: Dict, include_other: bool) -> Dict[str, float]:
-    stock_mv = sum(p.market_value for p in positions)
-    stock_cost = sum(p.cost_value for p in positions)
+class PositionBook:
+    """列式持仓簿：ticker / group / shares / cost / price 各为一个 NumPy 数组
+
+    市值、成本、盈亏、板块合计和排序报告都是整列运算，不再逐个 Position 计算属性。
+    group 以整数编码保存（groups[group_codes[i]] 为第 i 行的板块）。
+    迭代时逐行产出 Position，便于沿用按列表处理持仓的代码。
+    """
+
+    def __init__(
+        self,
+        tickers: Sequence[str],
+        groups: Sequence[str],
+        shares: Sequence[float],
+        cost: Sequence[float],
+        price: Sequence[float],
+    ) -> None:
+        self.tickers = np.asarray(tickers, dtype=str)
+        group_names, self.group_codes = np.unique(np.asarray(groups, dtype=str), return_inverse=True)
+        self.groups: List[str] = group_names.tolist()
+        self.shares = np.asarray(shares, dtype=np.float64)
+        self.cost = np.asarray(cost, dtype=np.float64)
+        self.price = np.asarray(price, dtype=np.float64)
+
+    @classmethod
+    def from_records(cls, raw: List[Dict]) -> "PositionBook":
+        """由 config.POSITIONS 格式的字典列表构造"""
+        return cls(
+            [str(p["ticker"]) for p in raw],
+            [str(p["group"]) for p in raw],
+            [float(p["shares"]) for p in raw],
+            [float(p["cost"]) for p in raw],
+            [float(p["price"]) for p in raw],
+        )
+
+    @classmethod
+    def from_positions(cls, positions: List[Position]) -> "PositionBook":
+        return cls(
+            [p.ticker for p in positions],
+            [p.group for p in positions],
+            [p.shares for p in positions],
+            [p.cost for p in positions],
+            [p.price for p in positions],
+        )
+
+    def __len__(self) -> int:
+        return len(self.shares)
+
+    def __iter__(self) -> Iterator[Position]:
+        groups = self.groups
+        for ticker, g, shares, cost, price in zip(
+            self.tickers.tolist(), self.group_codes.tolist(),
+            self.shares.tolist(), self.cost.tolist(), self.price.tolist(),
+        ):
+            yield Position(ticker=ticker, group=groups[g], shares=shares, cost=cost, price=price)
+
+    def to_positions(self) -> List[Position]:
+        return list(self)
+
+    # -------- 整列计算 --------
+
+    @property
+    def market_value(self) -> np.ndarray:
+        return self.shares * self.price
+
+    @property
+    def cost_value(self) -> np.ndarray:
+        return self.shares * self.cost
+
+    @property
+    def unrealized_pnl(self) -> np.ndarray:
+        return self.market_value - self.cost_value
+
+    @property
+    def unrealized_pnl_pct(self) -> np.ndarray:
+        base = self.cost_value
+        pnl = self.market_value - base
+        return np.divide(pnl, base, out=np.zeros_like(pnl), where=base != 0)
+
+    def totals(self) -> Tuple[float, float]:
+        """(股票总市值, 股票总成本)"""
+        return float(self.shares @ self.price), float(self.shares @ self.cost)
+
+    def group_values(self) -> Dict[str, float]:
+        """各板块市值合计（只包含有持仓行的板块）"""
+        sums = np.bincount(self.group_codes, weights=self.market_value, minlength=len(self.groups))
+        return dict(zip(self.groups, sums.tolist()))
+
+    def report_columns(self) -> Dict[str, np.ndarray]:
+        """持仓报告的列数据：同一 ticker 只保留第一行，按 (未实现盈亏, ticker) 从大到小排序
+
+        可直接传给 pandas.DataFrame；positions_report() 由它转换为逐行字典。
+        """
+        _, first = np.unique(self.tickers, return_index=True)
+        first.sort()
+        tickers = self.tickers[first]
+        shares, cost, price = self.shares[first], self.cost[first], self.price[first]
+        market_value = shares * price
+        cost_value = shares * cost
+        pnl = market_value - cost_value
+        pnl_pct = np.divide(pnl, cost_value, out=np.zeros_like(pnl), where=cost_value != 0)
+
+        order = np.lexsort((tickers, pnl))[::-1]
+        return {
+            "ticker": tickers[order],
+            "group": np.asarray(self.groups, dtype=str)[self.group_codes[first][order]],
+            "shares": shares[order],
+            "cost": cost[order],
+            "price": price[order],
+            "cost_value": cost_value[order],
+            "market_value": market_value[order],
+            "unrealized_pnl": pnl[order],
+            "unrealized_pnl_pct": pnl_pct[order],
+        }
+
+
+PositionsLike = Union[List[Position], PositionBook]
+
+
+def build_book(raw: List[Dict]) -> PositionBook:
+    return PositionBook.from_records(raw)
+
+
+def as_book(positions: PositionsLike) -> PositionBook:
+    """把 Position 列表转换为 PositionBook（已是 PositionBook 时原样返回）"""
+    if isinstance(positions, PositionBook):
+        return positions
+    return PositionBook.from_positions(positions)
+
+
+def portfolio_summary(
+    positions: PositionsLike,
+    cash: Dict,
+    include_other: bool,
+    ledger: Optional["TradeLedger"] = None,
+) -> Dict[str, float]:
+    """
+    组合总览。传入 ledger（成交台账）时，额外给出已实现盈亏和总盈亏（未实现 + 已实现）。
+    """
+    if isinstance(positions, PositionBook):
+        stock_mv, stock_cost = positions.totals()
+    else:
+        stock_mv = sum(p.market_value for p in positions)
+        stock_cost = sum(p.cost_value for p in positions)
     unrealized = stock_mv - stock_cost
 
     stock_cash = float(cash.get("stock_cash", 0.0))
     other_investable = float(cash.get("other_funds_investable", 0.0)) if include_other else 0.0
     investable_total = stock_mv + stock_cash + other_investable
 
-    return {
+    summary = {
         "stock_market_value": stock_mv,
         "stock_cost_value": stock_cost,
         "unrealized_pnl": unrealized,
@@ -64,9 +209,16 @@ def portfolio_summary(positions: List[Position], cash: Dict, include_other: bool
         "other_investable": other_investable,
         "investable_total": investable_total,
     }
+    if ledger is not None:
+        realized = ledger.realized_pnl
+        summary["realized_pnl"] = realized
+        summary["total_pnl"] = unrealized + realized
+    return summary
 
 
-def group_current_values(positions: List[Position]) -> Dict[str, float]:
+def group_current_values(positions: PositionsLike) -> Dict[str, float]:
+    if isinstance(positions, PositionBook):
+        return positions.group_values()
     g: Dict[str, float] = {}
     for p in positions:
         g[p.group] = g.get(p.group, 0.0) + p.market_value
@@ -84,7 +236,7 @@ def normalize_targets(targets: List[Dict]) -> Dict[str, Dict[str, float]]:
 
 
 def rebalance_plan(
-    positions: List[Position],
+    positions: PositionsLike,
     cash: Dict,
     targets: List[Dict],
     include_other: bool,
@@ -145,7 +297,7 @@ def rebalance_plan(
             action = "BUY"
             action_amount = max_buy
         elif diff < 0:
-            # 卖出建议先只给"需要减少的金额"，具体卖哪只后续可扩展
+            # 这里只给"需要减少的金额"，具体卖哪只、多少股见 orders.rebalance_orders
             action = "SELL"
             action_amount = abs(diff)
             max_buy = 0.0
@@ -180,17 +332,23 @@ def rebalance_plan(
     return deviation_rows_sorted, action_rows_sorted
 
 
-def positions_report(positions: List[Position]) -> List[Dict]:
-    """返回持仓报告数据（字典格式）"""
+def positions_report(positions: PositionsLike) -> List[Dict]:
+    """返回持仓报告数据（字典格式）
+
+    同一 ticker 只保留第一行，按未实现盈亏贡献排序（最影响你心态的先看）。
+    """
+    if isinstance(positions, PositionBook):
+        columns = positions.report_columns()
+        names = list(columns)
+        return [dict(zip(names, row)) for row in zip(*(columns[k].tolist() for k in names))]
+
     seen = set()
     result = []
-    
     for p in positions:
         # 使用 ticker 作为唯一标识，防止重复
         if p.ticker in seen:
             continue
         seen.add(p.ticker)
-        
         result.append({
             "ticker": p.ticker,
             "group": p.group,
@@ -202,7 +360,5 @@ def positions_report(positions: List[Position]) -> List[Dict]:
             "unrealized_pnl": p.unrealized_pnl,
             "unrealized_pnl_pct": p.unrealized_pnl_pct,
         })
-    
-    # 按未实现盈亏贡献排序（最影响你心态的先看）
     result.sort(key=lambda r: (r["unrealized_pnl"], r["ticker"]), reverse=True)
     return result
@@ -0,0 +1,230 @@
+# replay.py
+# -*- coding: utf-8 -*-
+
+"""
+历史估值回放：用逐日收盘价重放组合的净值、板块权重和带宽触发历史。
+
+以当前持仓（config.POSITIONS）和现金为终点，按成交记录倒推每个交易日收盘时的持股数和证券账户现金：
+    持股[d] = 当前持股 - d 之后成交的净买入股数
+    现金[d] = 当前现金 - d 之后成交的现金流（买入为负、卖出为正）
+再与 (日期 × 股票) 收盘价矩阵相乘，一次得到全部日期的市值、板块市值与触发状态，不逐日循环。
+
+收盘价可由 load_close_matrix() 从 hikyuu 或 KDataCache（K线磁盘缓存）批量读取，也可以直接传入。
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .ledger import _side_flags
+from .portfolio import PositionsLike, as_book, normalize_targets
+
+TradesLike = Union[pd.DataFrame, Iterable[Dict], None]
+
+# 成交记录里出现、当前持仓和 groups 参数中都没有的 ticker 归入此板块
+UNGROUPED = "未分组"
+
+
+def load_close_matrix(
+    codes: Dict[str, str],
+    query=None,
+    kdata_cache=None,
+) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    """批量读取日收盘价并对齐为 (日期 × 股票) 矩阵
+
+    Args:
+        codes: ticker -> hikyuu 股票代码（如 {"立讯精密": "sz002475"}）
+        query: hikyuu 查询条件，默认全部日线
+        kdata_cache: backtest.kcache.KDataCache，给出时从磁盘缓存读取
+
+    Returns:
+        (dates, tickers, close)：dates 为 datetime64[D]，没有K线的 ticker 不在其中；
+        停牌日沿用前一交易日收盘价，上市前为 NaN
+    """
+    import hikyuu as hku
+    from backtest.portfolio import align_panel, load_panel
+
+    if query is None:
+        query = hku.Query(0)
+    # 一次读取全部股票，多个 ticker 可共用同一代码
+    loaded = load_panel(list(dict.fromkeys(codes.values())), query, kdata_cache)
+    arrays_by_ticker = {ticker: loaded[code] for ticker, code in codes.items() if code in loaded}
+    panel = align_panel(arrays_by_ticker)
+    dates = np.asarray(panel["dates"]).astype("datetime64[D]")
+    return dates, panel["codes"], forward_fill(panel["close"])
+
+
+def forward_fill(values: np.ndarray) -> np.ndarray:
+    """按列向下填充 NaN（首个有效值之前保持 NaN）"""
+    t = values.shape[0]
+    index = np.where(np.isnan(values), 0, np.arange(t)[:, None])
+    np.maximum.accumulate(index, axis=0, out=index)
+    return values[index, np.arange(values.shape[1])]
+
+
+def _trades_frame(trades: TradesLike) -> pd.DataFrame:
+    if trades is None:
+        return pd.DataFrame(columns=["date", "ticker", "side", "shares", "price", "fee"])
+    if isinstance(trades, pd.DataFrame):
+        return trades
+    return pd.DataFrame(list(trades))
+
+
+@dataclass
+class ReplayResult:
+    """replay() 的结果，矩阵按 dates 排列行"""
+    dates: np.ndarray             # (T,) datetime64[D]
+    tickers: List[str]            # (N,)
+    groups: List[str]             # (G,)
+    shares: np.ndarray            # (T, N) 收盘时持股数
+    close: np.ndarray             # (T, N)
+    stock_market_value: np.ndarray  # (T,)
+    stock_cash: np.ndarray        # (T,)
+    investable_total: np.ndarray  # (T,) 股票市值 + 证券账户现金 (+ 计入投资池的其他资金)
+    group_values: np.ndarray      # (T, G)
+    group_weights: np.ndarray     # (T, G)
+    target_weights: np.ndarray    # (G,)
+    triggered: np.ndarray         # (T, G)
+    unpriced: np.ndarray          # (T,) 有持仓但当天还没有价格的股票数（按 0 估值）
+
+    def table(self) -> pd.DataFrame:
+        """按日期索引的净值与板块权重表：nav, stock_market_value, stock_cash, 各板块权重, n_triggered"""
+        df = pd.DataFrame({
+            "nav": self.investable_total,
+            "stock_market_value": self.stock_market_value,
+            "stock_cash": self.stock_cash,
+        }, index=pd.DatetimeIndex(self.dates, name="date"))
+        for k, g in enumerate(self.groups):
+            df[f"w_{g}"] = self.group_weights[:, k]
+        df["n_triggered"] = self.triggered.sum(axis=1)
+        return df
+
+    def trigger_events(self) -> List[Dict]:
+        """带宽触发状态的翻转记录（首日处于触发状态也记一条），按日期排序
+
+        每项含 date / group / triggered / weight / target_weight
+        """
+        t = self.triggered
+        changed = np.vstack([t[:1], t[1:] != t[:-1]])
+        rows, cols = np.nonzero(changed)
+        return [{
+            "date": self.dates[r],
+            "group": self.groups[c],
+            "triggered": bool(t[r, c]),
+            "weight": float(self.group_weights[r, c]),
+            "target_weight": float(self.target_weights[c]),
+        } for r, c in zip(rows.tolist(), cols.tolist())]
+
+
+def replay(
+    dates: np.ndarray,
+    tickers: List[str],
+    close: np.ndarray,
+    positions: PositionsLike,
+    cash: Dict,
+    targets: List[Dict],
+    include_other: bool,
+    trades: TradesLike = None,
+    groups: Optional[Dict[str, str]] = None,
+) -> ReplayResult:
+    """
+    回放历史估值。
+
+    Args:
+        dates / tickers / close: 收盘价矩阵，见 load_close_matrix()
+        positions: 当前持仓（回放终点），Position 列表或 PositionBook
+        cash / targets / include_other: 与 rebalance_plan 相同；cash 为当前现金
+        trades: 成交记录（DataFrame 或字典列表，字段同 TradeLedger），当天成交计入当天收盘持仓；
+            为空时假定整个区间持仓不变
+        groups: 补充 ticker -> 板块（用于已清仓、不在当前持仓中的 ticker）；也可在成交记录中给出 group 列
+
+    Returns:
+        ReplayResult
+    """
+    book = as_book(positions)
+    dates = np.asarray(dates).astype("datetime64[D]")
+    close = np.asarray(close, dtype=np.float64)
+    t, n = close.shape
+    col = {tk: j for j, tk in enumerate(tickers)}
+
+    # -------- 板块 --------
+    ticker_group = dict(groups or {})
+    df = _trades_frame(trades)
+    if "group" in df:
+        ticker_group.update(zip(df["ticker"].astype(str), df["group"].astype(str)))
+    ticker_group.update(zip(book.tickers.tolist(), (book.groups[c] for c in book.group_codes.tolist())))
+    tg = normalize_targets(targets)
+    all_groups = sorted(set(tg) | {ticker_group.get(tk, UNGROUPED) for tk in tickers})
+    gindex = {g: k for k, g in enumerate(all_groups)}
+    member = np.array([gindex[ticker_group.get(tk, UNGROUPED)] for tk in tickers], dtype=np.int64)
+
+    # -------- 持股与现金 --------
+    current = np.zeros(n)
+    for tk, s in zip(book.tickers.tolist(), book.shares.tolist()):
+        if tk not in col:
+            raise KeyError(f"没有 {tk} 的价格数据")
+        current[col[tk]] += s
+
+    # 第 T 行收纳晚于最后一个交易日的成交：计入当前持仓，但不属于任何回放日
+    delta = np.zeros((t + 1, n))
+    flow = np.zeros(t + 1)
+    if len(df):
+        missing = set(df["ticker"].astype(str)) - set(col)
+        if missing:
+            raise KeyError(f"没有 {sorted(missing)[0]} 的价格数据")
+        trade_days = pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]")
+        if t:
+            row = np.searchsorted(dates, trade_days, side="right") - 1
+            row = np.where(trade_days > dates[-1], t, np.maximum(row, 0))
+        else:
+            row = np.full(len(df), t)
+        j = np.array([col[tk] for tk in df["ticker"].astype(str)], dtype=np.int64)
+        sign = np.where(_side_flags(df["side"]), 1.0, -1.0)
+        qty = df["shares"].to_numpy(dtype=np.float64)
+        amount = qty * df["price"].to_numpy(dtype=np.float64)
+        fee = df["fee"].fillna(0.0).to_numpy(dtype=np.float64) if "fee" in df else np.zeros(len(df))
+        np.add.at(delta, (row, j), sign * qty)
+        np.add.at(flow, row, -sign * amount - fee)
+
+    # 持股[d] = 当前 - (全部净买入 - 截至 d 的净买入)
+    bought = np.cumsum(delta, axis=0)
+    shares = current + bought[:t] - bought[t]
+    cum_flow = np.cumsum(flow)
+    stock_cash = float(cash.get("stock_cash", 0.0)) + cum_flow[:t] - cum_flow[t]
+    other = float(cash.get("other_funds_investable", 0.0)) if include_other else 0.0
+
+    # -------- 估值 --------
+    priced = ~np.isnan(close)
+    value = shares * np.where(priced, close, 0.0)
+    unpriced = ((shares != 0) & ~priced).sum(axis=1)
+    onehot = np.zeros((n, len(all_groups)))
+    onehot[np.arange(n), member] = 1.0
+    group_values = value @ onehot
+    stock_mv = value.sum(axis=1)
+    total = stock_mv + stock_cash + other
+
+    weights = np.array([tg.get(g, {}).get("w", 0.0) for g in all_groups])
+    bands = np.array([tg.get(g, {}).get("band", 0.0) for g in all_groups])
+    target = total[:, None] * weights
+    triggered = (target > 0) & (np.abs(target - group_values) > target * bands)
+    safe_total = np.where(total != 0, total, 1.0)[:, None]
+
+    return ReplayResult(
+        dates=dates,
+        tickers=list(tickers),
+        groups=all_groups,
+        shares=shares,
+        close=close,
+        stock_market_value=stock_mv,
+        stock_cash=stock_cash,
+        investable_total=total,
+        group_values=group_values,
+        group_weights=np.where(total[:, None] != 0, group_values / safe_total, 0.0),
+        target_weights=weights,
+        triggered=triggered,
+        unpriced=unpriced,
+    )
@@ -0,0 +1,184 @@
+# scenarios.py
+# -*- coding: utf-8 -*-
+
+"""
+目标仓位 what-if：一次评估成千上万组 (目标权重, 带宽, max_trade_cash_fraction) 配置。
+
+持仓不变时，各板块当前市值和可投资总额对所有配置都相同，
+因此偏离、带宽触发、最大可买入/需卖出金额都可以按 (配置数 × 板块数) 矩阵一次算完，
+口径与 rebalance_plan 逐项一致。结果汇总为每个配置一行的 DataFrame，便于排序和画图。
+
+示例：
+    groups, w, b = targets_matrix([TARGETS])
+    weights = np.random.default_rng(0).dirichlet(np.ones(len(groups)), 5000)
+    result = evaluate_scenarios(book, CASH, INCLUDE_OTHER_FUNDS, groups, weights, bands=b[0], fractions=0.33)
+    result.table.sort_values("turnover").head()
+    result.deviation_rows(i)      # 某个配置的板块偏离明细
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .portfolio import PositionsLike, as_book, group_current_values, portfolio_summary
+
+ArrayLike = Union[float, Sequence, np.ndarray]
+
+
+@dataclass
+class ScenarioResult:
+    """evaluate_scenarios 的结果
+
+    矩阵的形状均为 (配置数, 板块数)，列顺序与 groups 一致。
+    """
+    groups: List[str]
+    current_value: np.ndarray   # (板块数,)
+    investable_total: float
+    stock_cash: float
+    weights: np.ndarray         # 归一化后的目标权重
+    bands: np.ndarray
+    fractions: np.ndarray       # (配置数,)
+    target_value: np.ndarray
+    diff: np.ndarray            # 目标 - 当前，正数=欠配
+    triggered: np.ndarray
+    max_buy: np.ndarray         # 欠配板块的最大可买入金额（同 rebalance_plan），其余为 0
+    table: pd.DataFrame
+
+    def deviation_rows(self, scenario: int) -> List[Dict]:
+        """单个配置的板块偏离表，行格式与 rebalance_plan() 第一张表相同"""
+        total = self.investable_total
+        cur_w = self.current_value / total if total else np.zeros_like(self.current_value)
+        rows = [{
+            "group": g,
+            "current_value": float(self.current_value[k]),
+            "current_weight": float(cur_w[k]),
+            "target_weight": float(self.weights[scenario, k]),
+            "target_value": float(self.target_value[scenario, k]),
+            "diff": float(self.diff[scenario, k]),
+            "diff_pct_point": float(cur_w[k] - self.weights[scenario, k]),
+            "triggered": bool(self.triggered[scenario, k]),
+        } for k, g in enumerate(self.groups)]
+        rows.sort(key=lambda r: abs(r["diff"]), reverse=True)
+        return rows
+
+
+def targets_matrix(candidates: Sequence[List[Dict]], groups: Optional[List[str]] = None) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """把多份 TARGETS 格式的配置转换为 (板块, 权重矩阵, 带宽矩阵)
+
+    Args:
+        candidates: 每项是与 config.TARGETS 同格式的列表
+        groups: 板块顺序，默认取所有配置中出现过的板块并排序
+
+    Returns:
+        (groups, weights, bands)，未出现的板块权重和带宽为 0
+    """
+    if groups is None:
+        groups = sorted({x["group"] for targets in candidates for x in targets})
+    index = {g: k for k, g in enumerate(groups)}
+    weights = np.zeros((len(candidates), len(groups)))
+    bands = np.zeros((len(candidates), len(groups)))
+    for s, targets in enumerate(candidates):
+        for x in targets:
+            k = index[x["group"]]
+            weights[s, k] = float(x["target_weight"])
+            bands[s, k] = float(x.get("band", 0.0))
+    return list(groups), weights, bands
+
+
+def evaluate_scenarios(
+    positions: PositionsLike,
+    cash: Dict,
+    include_other: bool,
+    groups: List[str],
+    weights: ArrayLike,
+    bands: ArrayLike = 0.0,
+    fractions: ArrayLike = 1.0,
+) -> ScenarioResult:
+    """
+    批量评估目标配置。
+
+    Args:
+        positions: Position 列表或 PositionBook
+        cash / include_other: 与 rebalance_plan 相同
+        groups: weights / bands 的列对应的板块
+        weights: (配置数, 板块数) 目标权重；每行按 normalize_targets 的规则归一
+        bands: 带宽，可为标量、(板块数,) 或 (配置数, 板块数)
+        fractions: max_trade_cash_fraction，可为标量或 (配置数,)
+
+    Returns:
+        ScenarioResult；其中 table 每个配置一行：
+            scenario, max_trade_cash_fraction, max_trade_cash,
+            n_triggered, n_buy, n_sell（触发且需买入/卖出的板块数）,
+            buy_amount（触发的欠配板块最大可买入之和）, sell_amount（触发的超配板块需卖出之和）,
+            turnover（(买+卖)/可投资总额）, max_abs_dev_pp（最大权重偏离）, tracking_error（权重偏离的 L2 范数）
+    """
+    book = as_book(positions)
+    summary = portfolio_summary(book, cash, include_other)
+    total = summary["investable_total"]
+    stock_cash = summary["stock_cash"]
+
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    n = weights.shape[0]
+    bands = np.broadcast_to(np.asarray(bands, dtype=np.float64), (n, len(groups)))
+    fractions = np.broadcast_to(np.asarray(fractions, dtype=np.float64), (n,)).copy()
+
+    # 持仓中有、配置中没有的板块也要列出（目标权重为 0），与 rebalance_plan 一致
+    cur_by_group = group_current_values(book)
+    all_groups = sorted(set(groups) | set(cur_by_group))
+    cols = np.array([all_groups.index(g) for g in groups], dtype=np.int64)
+    W = np.zeros((n, len(all_groups)))
+    B = np.zeros((n, len(all_groups)))
+    W[:, cols] = weights
+    B[:, cols] = bands
+
+    # 权重不为 1 时自动归一（同 normalize_targets）
+    row_sum = W.sum(axis=1, keepdims=True)
+    fix = np.abs(row_sum - 1.0) > 1e-6
+    W = np.where(fix, np.divide(W, row_sum, out=np.zeros_like(W), where=row_sum != 0), W)
+
+    current = np.array([cur_by_group.get(g, 0.0) for g in all_groups])
+    target = total * W
+    diff = target - current
+    triggered = (target > 0) & (np.abs(diff) > target * B)
+
+    max_trade_cash = stock_cash * fractions
+    max_buy = np.where(diff > 0, np.minimum(np.minimum(diff, stock_cash), max_trade_cash[:, None]), 0.0)
+
+    buying = triggered & (diff > 0)
+    selling = triggered & (diff < 0)
+    buy_amount = np.where(buying, max_buy, 0.0).sum(axis=1)
+    sell_amount = np.where(selling, -diff, 0.0).sum(axis=1)
+    dev = (current / total if total else np.zeros_like(current)) - W
+
+    table = pd.DataFrame({
+        "scenario": np.arange(n),
+        "max_trade_cash_fraction": fractions,
+        "max_trade_cash": max_trade_cash,
+        "n_triggered": triggered.sum(axis=1),
+        "n_buy": buying.sum(axis=1),
+        "n_sell": selling.sum(axis=1),
+        "buy_amount": buy_amount,
+        "sell_amount": sell_amount,
+        "turnover": (buy_amount + sell_amount) / total if total else np.zeros(n),
+        "max_abs_dev_pp": np.abs(dev).max(axis=1) * 100 if len(all_groups) else np.zeros(n),
+        "tracking_error": np.sqrt((dev ** 2).sum(axis=1)),
+    })
+
+    return ScenarioResult(
+        groups=all_groups,
+        current_value=current,
+        investable_total=total,
+        stock_cash=stock_cash,
+        weights=W,
+        bands=B,
+        fractions=fractions,
+        target_value=target,
+        diff=diff,
+        triggered=triggered,
+        max_buy=max_buy,
+        table=table,
+    )
@@ -0,0 +1,181 @@
+# valuation.py
+# -*- coding: utf-8 -*-
+
+"""
+增量估值：盘中价格逐笔更新时维护组合总市值、成本、盈亏和各板块市值，
+每次更新只调整变动股票涉及的合计，再对板块（几十个）重算带宽触发状态，
+只返回触发状态发生翻转的板块，用于驱动再平衡提醒。
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .portfolio import PositionBook, normalize_targets
+
+
+class LiveValuation:
+    """随价格增量更新的组合估值
+
+    口径与 portfolio_summary / rebalance_plan 的板块偏离表一致：
+    可投资总额 = 股票市值 + 证券账户现金 (+ 计入投资池的其他资金)，
+    板块目标金额 = 可投资总额 × 目标权重，|目标 - 当前| > 目标 × band 即触发。
+
+    合计以浮点数累加维护，长时间运行后可调用 resync() 按整簿重算消除累积误差。
+    价格保存在自己的副本中，不修改传入的持仓簿（持仓簿仍是构造时的价格）。
+    """
+
+    def __init__(self, book: PositionBook, cash: Dict, targets: List[Dict], include_other: bool) -> None:
+        self.book = book
+        self._price = book.price.copy()
+        self.stock_cash = float(cash.get("stock_cash", 0.0))
+        self.other_investable = float(cash.get("other_funds_investable", 0.0)) if include_other else 0.0
+
+        t = normalize_targets(targets)
+        self.groups: List[str] = sorted(set(t) | set(book.groups))
+        index = {g: i for i, g in enumerate(self.groups)}
+        self.weights = np.array([t.get(g, {}).get("w", 0.0) for g in self.groups])
+        self.bands = np.array([t.get(g, {}).get("band", 0.0) for g in self.groups])
+
+        # 持仓簿板块编号 -> 本对象板块编号
+        book_to_group = np.array([index[g] for g in book.groups], dtype=np.int64)
+        self._row_group = book_to_group[book.group_codes] if len(book) else np.zeros(0, dtype=np.int64)
+
+        tickers, inverse = np.unique(book.tickers, return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(tickers) + 1))
+        self._ticker_rows = {t: order[bounds[k]:bounds[k + 1]] for k, t in enumerate(tickers.tolist())}
+
+        self.updates = 0
+        self.resync()
+
+    def resync(self) -> None:
+        """按当前价格对整簿重算全部合计和触发状态"""
+        book = self.book
+        market_value = book.shares * self._price
+        # ticker -> (行号数组, [[板块编号, 股数合计, 当前市值]], 当前价格)；同一 ticker 可出现在多个账户/多行
+        self._tickers: Dict[str, Tuple[np.ndarray, List[List[float]], float]] = {}
+        for ticker, rows in self._ticker_rows.items():
+            per_group: Dict[int, List[float]] = {}
+            for g, s, v in zip(self._row_group[rows].tolist(), book.shares[rows].tolist(),
+                               market_value[rows].tolist()):
+                acc = per_group.setdefault(g, [g, 0.0, 0.0])
+                acc[1] += s
+                acc[2] += v
+            self._tickers[ticker] = (rows, list(per_group.values()), float(self._price[rows[0]]))
+
+        self.stock_mv = float(book.shares @ self._price)
+        self.stock_cost = float(book.shares @ book.cost)
+        self.group_values = np.bincount(self._row_group, weights=market_value, minlength=len(self.groups))
+        self.triggered = self._triggers()
+
+    # -------- 派生量 --------
+
+    @property
+    def investable_total(self) -> float:
+        return self.stock_mv + self.stock_cash + self.other_investable
+
+    @property
+    def unrealized_pnl(self) -> float:
+        return self.stock_mv - self.stock_cost
+
+    def _targets(self) -> np.ndarray:
+        return self.investable_total * self.weights
+
+    def _triggers(self) -> np.ndarray:
+        target = self._targets()
+        return (target > 0) & (np.abs(target - self.group_values) > target * self.bands)
+
+    # -------- 价格更新 --------
+
+    def _apply(self, ticker: str, price: float) -> None:
+        entry = self._tickers.get(ticker)
+        if entry is None:
+            raise KeyError(f"持仓中没有 {ticker}")
+        rows, per_group, old = entry
+        if price == old:
+            return
+        for acc in per_group:
+            value = acc[1] * price
+            delta = value - acc[2]
+            acc[2] = value
+            self.group_values[acc[0]] += delta
+            self.stock_mv += delta
+        self._price[rows] = price
+        self._tickers[ticker] = (rows, per_group, price)
+        self.updates += 1
+
+    def _flips(self) -> List[Dict]:
+        triggered = self._triggers()
+        changed = np.flatnonzero(triggered != self.triggered)
+        self.triggered = triggered
+        if not changed.size:
+            return []
+        target = self._targets()
+        return [
+            {
+                "group": self.groups[g],
+                "triggered": bool(triggered[g]),
+                "current_value": float(self.group_values[g]),
+                "target_value": float(target[g]),
+                "diff": float(target[g] - self.group_values[g]),
+            }
+            for g in changed.tolist()
+        ]
+
+    def update(self, ticker: str, price: float) -> List[Dict]:
+        """更新一只股票的价格
+
+        Returns:
+            触发状态翻转的板块列表（未翻转时为空列表），每项含 group/triggered/current_value/target_value/diff
+        """
+        self._apply(ticker, float(price))
+        return self._flips()
+
+    def update_many(self, prices: Dict[str, float]) -> List[Dict]:
+        """批量更新价格（如一次行情快照），全部应用后只判断一次触发翻转"""
+        for ticker, price in prices.items():
+            self._apply(ticker, float(price))
+        return self._flips()
+
+    def price(self, ticker: str) -> float:
+        return self._tickers[ticker][2]
+
+    # -------- 与静态计算一致的输出 --------
+
+    def summary(self) -> Dict[str, float]:
+        """与 portfolio_summary() 相同的字段"""
+        unrealized = self.unrealized_pnl
+        return {
+            "stock_market_value": self.stock_mv,
+            "stock_cost_value": self.stock_cost,
+            "unrealized_pnl": unrealized,
+            "unrealized_pnl_pct_on_cost": (unrealized / self.stock_cost) if self.stock_cost else 0.0,
+            "stock_cash": self.stock_cash,
+            "other_investable": self.other_investable,
+            "investable_total": self.investable_total,
+        }
+
+    def deviations(self) -> List[Dict]:
+        """与 rebalance_plan() 第一张表（板块偏离表）相同的行，按绝对偏离排序"""
+        total = self.investable_total
+        target = self._targets()
+        rows = []
+        for g, name in enumerate(self.groups):
+            cur = float(self.group_values[g])
+            w = float(self.weights[g])
+            cur_w = (cur / total) if total else 0.0
+            rows.append({
+                "group": name,
+                "current_value": cur,
+                "current_weight": cur_w,
+                "target_weight": w,
+                "target_value": float(target[g]),
+                "diff": float(target[g]) - cur,
+                "diff_pct_point": cur_w - w,
+                "triggered": bool(self.triggered[g]),
+            })
+        rows.sort(key=lambda r: abs(r["diff"]), reverse=True)
+        return rows
@@ -2,5 +2,23 @@
 
 from .ema_cross_strategy import EMACrossStrategy
 from .macd_strategy import MACDStrategy
+from .indicators import (
+    IndicatorCache,
+    use_cache,
+    get_cache,
+    set_cache_budget,
+    format_cache_stats,
+)
+from .expr import build_signal, batch_signals
 
-__all__ = ['EMACrossStrategy', 'MACDStrategy']
+__all__ = [
+    'EMACrossStrategy',
+    'MACDStrategy',
+    'IndicatorCache',
+    'use_cache',
+    'get_cache',
+    'set_cache_budget',
+    'format_cache_stats',
+    'build_signal',
+    'batch_signals',
+]
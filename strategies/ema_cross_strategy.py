@@ -2,6 +2,8 @@
 
 import hikyuu as hku
 
+from . import expr
+
 
 class EMACrossStrategy:
     """EMA交叉策略
@@ -22,6 +24,18 @@ class EMACrossStrategy:
         self.slow_period = slow_period
         self.fixed_count = fixed_count
     
+    def signal_expr(self):
+        """信号表达式
+        
+        SG_Flex 内部自行计算快线的 slow_period 日 EMA 作为慢线，无需单独的慢线指标
+        
+        Returns:
+            expr.Node: 信号节点
+        """
+        # 快线上穿慢线时买入，下穿时卖出
+        ema_fast = expr.EMA(expr.CLOSE, self.fast_period)
+        return expr.SG_Flex(ema_fast, slow_n=self.slow_period)
+    
     def create_signal(self, kdata):
         """创建交易信号
         
@@ -31,14 +45,7 @@ class EMACrossStrategy:
         Returns:
             sg: 交易信号对象
         """
-        # 创建技术指标
-        ema_fast = hku.EMA(kdata.close, self.fast_period)
-        ema_slow = hku.EMA(kdata.close, self.slow_period)
-        
-        # 创建交易信号（快线上穿慢线时买入，下穿时卖出）
-        sg = hku.SG_Flex(ema_fast, slow_n=self.slow_period)
-        
-        return sg
+        return expr.build_signal(self.signal_expr(), kdata)
     
     def create_money_manager(self):
         """创建资金管理策略
@@ -0,0 +1,255 @@
+"""信号表达式图
+
+策略用 signal_expr() 声明"信号由哪些指标怎样组合而成"，而不是在 create_signal() 里逐步创建 hikyuu 对象。
+表达式节点按结构去重：参数相同的子表达式（如多个策略里的 EMA(CLOSE, 10)）是同一个节点，
+求值时每个指标节点在一份K线上只计算一次（通过 IndicatorCache，跨策略、跨批次共享）；
+求值从信号根节点出发按需进行，没有被任何信号引用的指标不会被计算。
+
+信号节点（SG_*）带有运行状态，每个策略各自创建，只有指标节点共享。
+
+Example:
+    fast = EMA(CLOSE, 5)
+    expr = SG_Flex(fast, slow_n=10)
+    sg = build_signal(expr, kdata)
+
+    sgs, stats = batch_signals(strategies, kdata)   # stats: 节点总数 / 去重后的指标数 / 实际计算数
+"""
+
+import hikyuu as hku
+
+from . import indicators
+
+
+class Node:
+    """表达式节点
+
+    Attributes:
+        op: 运算名称，如 'EMA'、'SG_CROSS'
+        params: 标量参数元组
+        inputs: 输入节点元组
+        kind: 'ind'（指标）或 'sg'（信号）
+        key: 结构键，结构相同的节点键相同
+    """
+
+    __slots__ = ('op', 'params', 'inputs', 'kind', 'key')
+
+    def __init__(self, op, params=(), inputs=(), kind='ind'):
+        self.op = op
+        self.params = tuple(params)
+        self.inputs = tuple(inputs)
+        self.kind = kind
+        self.key = (op, self.params, tuple(node.key for node in self.inputs))
+
+    def __eq__(self, other):
+        return isinstance(other, Node) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        args = [repr(node) for node in self.inputs] + [repr(p) for p in self.params]
+        return f"{self.op}({', '.join(args)})" if args else self.op
+
+    # 指标之间的算术运算，与原策略一致使用 TA_ADD / TA_MULT
+    def __add__(self, other):
+        return Node('ADD', inputs=(self, _as_node(other)))
+
+    def __mul__(self, other):
+        return Node('MUL', inputs=(self, _as_node(other)))
+
+
+def _as_node(value):
+    return value if isinstance(value, Node) else CVAL(value)
+
+
+# ==================== 指标节点 ====================
+
+CLOSE = Node('CLOSE')
+
+
+def CVAL(value):
+    """常数指标"""
+    return Node('CVAL', (value,))
+
+
+def EMA(x, n):
+    return Node('EMA', (n,), (x,))
+
+
+def MA(x, n):
+    return Node('MA', (n,), (x,))
+
+
+def STD(x, n):
+    return Node('STD', (n,), (x,))
+
+
+def MACD(x, fast_period, slow_period, signal_period):
+    """MACD（结果集：0=BAR, 1=DIF, 2=DEA），用 SLICE 取单个结果集"""
+    return Node('MACD', (fast_period, slow_period, signal_period), (x,))
+
+
+def ADX(n):
+    """TA-Lib 的 ADX（基于整份K线的高低收）"""
+    return Node('ADX', (n,))
+
+
+def SLICE(x, result_index):
+    """取多结果集指标的一个结果集"""
+    return Node('SLICE', (result_index,), (x,))
+
+
+# ==================== 信号节点 ====================
+
+def SG_Cross(fast, slow):
+    """fast 上穿 slow 买入，下穿卖出"""
+    return Node('SG_CROSS', inputs=(fast, slow), kind='sg')
+
+
+def SG_Flex(x, slow_n):
+    """x 与其 slow_n 周期 EMA 交叉"""
+    return Node('SG_FLEX', (slow_n,), (x,), kind='sg')
+
+
+def SG_Band(x, lower, upper):
+    """x 高于 upper 时买入，低于 lower 时卖出"""
+    return Node('SG_BAND', (lower, upper), (x,), kind='sg')
+
+
+def SG_Sub(a, b, alternate=False):
+    return Node('SG_SUB', (alternate,), (a, b), kind='sg')
+
+
+def SG_And(a, b, alternate=False):
+    return Node('SG_AND', (alternate,), (a, b), kind='sg')
+
+
+# ==================== 求值 ====================
+
+# 输入为收盘价的指标沿用 indicators 模块中的缓存名，与直接调用 indicators.EMA 等共享缓存条目
+_LEGACY_NAMES = frozenset({'EMA', 'MA', 'STD', 'MACD'})
+
+
+def _cache_entry(node):
+    """节点在 IndicatorCache 中的 (名称, 参数)"""
+    if node.op in _LEGACY_NAMES and node.inputs == (CLOSE,):
+        return node.op, node.params
+    if node.op == 'ADX':
+        return 'TA_ADX', node.params
+    return 'EXPR', (node.key,)
+
+
+class Evaluator:
+    """在一份K线上对表达式求值
+
+    同一个 Evaluator 内每个指标节点只求值一次；跨 Evaluator 的复用由 IndicatorCache 完成。
+    """
+
+    def __init__(self, kdata):
+        self.kdata = kdata
+        self._values = {}
+        self.computed = 0       # 本求值器实际计算（缓存未命中）的指标节点数
+
+    def indicator(self, node):
+        """指标节点的值（hikyuu Indicator）"""
+        value = self._values.get(node.key)
+        if value is None:
+            value = self._values[node.key] = self._indicator(node)
+        return value
+
+    def _indicator(self, node):
+        kdata = self.kdata
+        if node.op == 'CLOSE':
+            return kdata.close
+        if node.op == 'CVAL':
+            return hku.CVAL(node.params[0])
+        args = [self.indicator(x) for x in node.inputs]
+        name, params = _cache_entry(node)
+
+        def factory():
+            self.computed += 1
+            return _INDICATOR_OPS[node.op](kdata, args, node.params)
+        return indicators.get_cache().get(kdata, name, params, factory)
+
+    def signal(self, node):
+        """信号节点的值（每次调用都创建新的 hikyuu 信号对象）"""
+        if node.kind != 'sg':
+            raise ValueError(f"{node!r} 不是信号节点")
+        args = [self.signal(x) if x.kind == 'sg' else self.indicator(x) for x in node.inputs]
+        return _SIGNAL_OPS[node.op](args, node.params)
+
+
+_INDICATOR_OPS = {
+    'EMA': lambda kdata, args, p: hku.EMA(args[0], p[0]),
+    'MA': lambda kdata, args, p: hku.MA(args[0], p[0]),
+    'STD': lambda kdata, args, p: hku.STD(args[0], p[0]),
+    'MACD': lambda kdata, args, p: hku.MACD(args[0], *p),
+    'ADX': lambda kdata, args, p: hku.TA_ADX(kdata, p[0]),
+    'SLICE': lambda kdata, args, p: hku.SLICE(args[0], 0, -1, p[0]),
+    'ADD': lambda kdata, args, p: hku.TA_ADD(args[0], args[1]),
+    'MUL': lambda kdata, args, p: hku.TA_MULT(args[0], args[1]),
+}
+
+_SIGNAL_OPS = {
+    'SG_CROSS': lambda args, p: hku.SG_Cross(args[0], args[1]),
+    'SG_FLEX': lambda args, p: hku.SG_Flex(args[0], slow_n=p[0]),
+    'SG_BAND': lambda args, p: hku.SG_Band(args[0], p[0], p[1]),
+    'SG_SUB': lambda args, p: hku.SG_Sub(args[0], args[1], alternate=p[0]),
+    'SG_AND': lambda args, p: hku.SG_And(args[0], args[1], alternate=p[0]),
+}
+
+
+def build_signal(expr, kdata):
+    """对单个信号表达式求值，返回 hikyuu 信号对象"""
+    return Evaluator(kdata).signal(expr)
+
+
+def walk(expr):
+    """按依赖顺序（输入在前）列出表达式中的全部不同节点"""
+    seen, order = set(), []
+
+    def visit(node):
+        if node.key in seen:
+            return
+        seen.add(node.key)
+        for x in node.inputs:
+            visit(x)
+        order.append(node)
+    for root in (expr if isinstance(expr, (list, tuple)) else [expr]):
+        visit(root)
+    return order
+
+
+def _tree_size(node):
+    return 1 + sum(_tree_size(x) for x in node.inputs)
+
+
+def plan(exprs):
+    """统计一批表达式的节点数
+
+    Returns:
+        dict: nodes 不去重时的节点总数，unique 去重后的节点数，indicators 去重后需要计算的指标数
+    """
+    unique = walk(list(exprs))
+    return {
+        'nodes': sum(_tree_size(e) for e in exprs),
+        'unique': len(unique),
+        'indicators': sum(1 for n in unique if n.kind == 'ind' and n.op not in ('CLOSE', 'CVAL')),
+    }
+
+
+def batch_signals(strategies, kdata):
+    """为一批策略在同一份K线上创建信号，公共子表达式只计算一次
+
+    Args:
+        strategies: 实现了 signal_expr() 的策略列表
+
+    Returns:
+        tuple: (与 strategies 对应的信号对象列表, plan() 统计加上实际计算的指标数 computed)
+    """
+    exprs = [s.signal_expr() for s in strategies]
+    evaluator = Evaluator(kdata)
+    signals = [evaluator.signal(e) for e in exprs]
+    stats = plan(exprs)
+    stats['computed'] = evaluator.computed
+    return signals, stats
@@ -0,0 +1,198 @@
+"""指标计算层
+
+策略通过这里创建技术指标。同一份K线上参数相同的指标只计算一次，
+例如 EMA 交叉的参数扫描中，快线周期相同的组合共享同一条 EMA(close, fast)
+（慢线是 SG_Flex 对快线再做的 EMA，不与收盘价上的 EMA 共享）。
+默认使用进程级 LRU 缓存，可用 use_cache() 在作用域内换成独立的缓存。
+"""
+
+import contextlib
+from collections import OrderedDict
+
+import hikyuu as hku
+
+
+def kdata_key(kdata):
+    """K线数据的身份标识
+
+    由股票代码、K线类型、复权方式、起止时间和条数组成，
+    同一股票同一区间重复获取的 KData 对象得到相同的键。
+    """
+    query = kdata.get_query()
+    if len(kdata) == 0:
+        first = last = ''
+    else:
+        first = str(kdata[0].datetime)
+        last = str(kdata[-1].datetime)
+    return (kdata.get_stock().market_code, query.ktype, int(query.recover_type), first, last, len(kdata))
+
+
+# 默认缓存预算：256MB（按指标值个数 × 8 字节估算）
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def indicator_nbytes(ind):
+    """估算指标占用的内存（值个数 × 结果集数 × 8 字节）"""
+    try:
+        return len(ind) * max(1, ind.get_result_num()) * 8
+    except Exception:
+        return 0
+
+
+class IndicatorCache:
+    """指标缓存：按 (K线标识, 指标名称, 参数) 保存已计算的指标
+
+    使用 LRU 淘汰，总占用超过 max_bytes 时从最久未使用的指标开始淘汰，
+    并记录命中、未命中和淘汰次数，用于观察一次对比运行省去了多少重复计算。
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """初始化指标缓存
+
+        Args:
+            max_bytes: 内存预算（字节），默认 256MB
+        """
+        self.max_bytes = max_bytes
+        self._store = OrderedDict()
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, kdata, name, params, factory):
+        """获取指标，未命中时调用 factory() 计算并缓存
+
+        Args:
+            kdata: K线数据
+            name: 指标名称
+            params: 指标参数元组
+            factory: 无参函数，返回计算好的指标
+        """
+        key = (kdata_key(kdata), name, tuple(params))
+        entry = self._store.get(key)
+        if entry is not None:
+            self._store.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        ind = factory()
+        nbytes = indicator_nbytes(ind)
+        self._store[key] = (ind, nbytes)
+        self._nbytes += nbytes
+        self._evict()
+        return ind
+
+    def _evict(self):
+        """按 LRU 顺序淘汰，直到总占用不超过预算"""
+        while self._nbytes > self.max_bytes and self._store:
+            _, (_, nbytes) = self._store.popitem(last=False)
+            self._nbytes -= nbytes
+            self.evictions += 1
+
+    @property
+    def nbytes(self):
+        """当前缓存占用（字节）"""
+        return self._nbytes
+
+    def stats(self):
+        """返回缓存统计信息"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            'entries': len(self._store),
+            'nbytes': self._nbytes,
+            'max_bytes': self.max_bytes,
+        }
+
+    def reset_stats(self):
+        """清零统计计数"""
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def clear(self):
+        """清空缓存（不清零统计）"""
+        self._store.clear()
+        self._nbytes = 0
+
+    def __len__(self):
+        return len(self._store)
+
+
+def format_cache_stats(stats):
+    """把 stats() 的结果格式化为一行文本"""
+    return (f"指标缓存: 命中 {stats['hits']} 次, 计算 {stats['misses']} 次, "
+            f"命中率 {stats['hit_rate'] * 100:.1f}%, 淘汰 {stats['evictions']} 次, "
+            f"占用 {stats['nbytes'] / 1024 / 1024:.1f}MB / {stats['max_bytes'] / 1024 / 1024:.0f}MB")
+
+
+# 当前生效的缓存；默认所有策略共享一个进程级缓存
+_default_cache = IndicatorCache()
+_active_cache = _default_cache
+
+
+def get_cache():
+    """返回当前生效的指标缓存"""
+    return _active_cache
+
+
+def set_cache_budget(max_bytes):
+    """调整默认缓存的内存预算（字节），超出部分立即淘汰"""
+    _default_cache.max_bytes = max_bytes
+    _default_cache._evict()
+
+
+@contextlib.contextmanager
+def use_cache(cache=None):
+    """在作用域内使用指定的指标缓存
+
+    Args:
+        cache: 指标缓存对象，默认新建一个（作用域结束后丢弃）
+
+    Example:
+        with use_cache() as cache:
+            for strategy in strategies:
+                run_strategy_backtest(strategy, kdata)
+            print(format_cache_stats(cache.stats()))
+    """
+    global _active_cache
+    previous = _active_cache
+    _active_cache = IndicatorCache() if cache is None else cache
+    try:
+        yield _active_cache
+    finally:
+        _active_cache = previous
+
+
+def _get(kdata, name, params, factory):
+    return _active_cache.get(kdata, name, params, factory)
+
+
+def EMA(kdata, n):
+    """收盘价的指数移动平均"""
+    return _get(kdata, 'EMA', (n,), lambda: hku.EMA(kdata.close, n))
+
+
+def MA(kdata, n):
+    """收盘价的简单移动平均"""
+    return _get(kdata, 'MA', (n,), lambda: hku.MA(kdata.close, n))
+
+
+def STD(kdata, n):
+    """收盘价的标准差"""
+    return _get(kdata, 'STD', (n,), lambda: hku.STD(kdata.close, n))
+
+
+def MACD(kdata, fast_period, slow_period, signal_period):
+    """收盘价的 MACD（结果集：0=BAR, 1=DIF, 2=DEA）"""
+    return _get(kdata, 'MACD', (fast_period, slow_period, signal_period),
+                lambda: hku.MACD(kdata.close, fast_period, slow_period, signal_period))
+
+
+def ADX(kdata, n):
+    """TA-Lib 的 ADX 趋势强度指标"""
+    return _get(kdata, 'TA_ADX', (n,), lambda: hku.TA_ADX(kdata, n))
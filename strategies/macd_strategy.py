@@ -2,6 +2,8 @@
 
 import hikyuu as hku
 
+from . import expr
+
 
 class MACDStrategy:
     """MACD策略
@@ -24,6 +26,20 @@ class MACDStrategy:
         self.signal_period = signal_period
         self.fixed_count = fixed_count
     
+    def signal_expr(self):
+        """信号表达式
+        
+        Returns:
+            expr.Node: 信号节点
+        """
+        # MACD结果顺序：0=BAR(柱状图), 1=DIF(MACD线), 2=DEA(信号线)
+        macd = expr.MACD(expr.CLOSE, self.fast_period, self.slow_period, self.signal_period)
+        macd_line = expr.SLICE(macd, 1)
+        signal_line = expr.SLICE(macd, 2)
+        
+        # macd_line 上穿 signal_line 时买入，下穿时卖出
+        return expr.SG_Cross(macd_line, signal_line)
+    
     def create_signal(self, kdata):
         """创建交易信号
         
@@ -33,20 +49,7 @@ class MACDStrategy:
         Returns:
             sg: 交易信号对象
         """
-        # 创建MACD指标
-        macd = hku.MACD(kdata.close, self.fast_period, self.slow_period, self.signal_period)
-        
-        # MACD由MACD线、信号线、柱状图组成
-        # MACD结果顺序：get_result(0)=BAR(柱状图), get_result(1)=DIF(MACD线), get_result(2)=DEA(信号线)
-        # 使用 SLICE 提取子指标（返回 Indicator 对象）
-        # SLICE(data, start, end, result_index) - result_index指定提取哪个结果集
-        macd_line = hku.SLICE(macd, 0, -1, 1)  # MACD线 (DIF) - result_index=1
-        signal_line = hku.SLICE(macd, 0, -1, 2)  # 信号线 (DEA) - result_index=2
-        
-        # 使用 SG_Cross 创建交叉信号：macd_line上穿signal_line时买入
-        sg = hku.SG_Cross(macd_line, signal_line)
-        
-        return sg
+        return expr.build_signal(self.signal_expr(), kdata)
     
     def create_money_manager(self):
         """创建资金管理策略
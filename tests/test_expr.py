@@ -0,0 +1,68 @@
+import pytest
+
+pytest.importorskip("hikyuu")
+
+from backtest.kcache import to_kdata  # noqa: E402
+from benchmarks.synthetic import gbm_ohlcv, stock_columns  # noqa: E402
+from strategies import EMACrossStrategy, batch_signals, indicators, use_cache  # noqa: E402
+from strategies import expr  # noqa: E402
+from strategies.all_strategies import BollingerBreakoutStrategy, EMACrossWithADXFilterStrategy  # noqa: E402
+
+
+def test_structurally_equal_nodes_are_the_same_node():
+    a = expr.EMA(expr.CLOSE, 10)
+    assert a == expr.EMA(expr.CLOSE, 10)
+    assert hash(a) == hash(expr.EMA(expr.CLOSE, 10))
+    assert a != expr.EMA(expr.CLOSE, 20)
+    assert a != expr.MA(expr.CLOSE, 10)
+    assert expr.SG_Flex(a, slow_n=20) != expr.SG_Flex(a, slow_n=30)
+    assert repr(expr.SG_Flex(a, slow_n=20)) == "SG_FLEX(EMA(CLOSE, 10), 20)"
+
+
+def test_walk_lists_each_node_once_inputs_first():
+    ema = expr.EMA(expr.CLOSE, 5)
+    roots = [expr.SG_Flex(ema, slow_n=10), expr.SG_Cross(ema, expr.EMA(expr.CLOSE, 5))]
+    order = expr.walk(roots)
+    assert [n.op for n in order] == ['CLOSE', 'EMA', 'SG_FLEX', 'SG_CROSS']
+    position = {n.key: i for i, n in enumerate(order)}
+    for node in order:
+        assert all(position[x.key] < position[node.key] for x in node.inputs)
+
+
+def test_plan_counts_shared_indicators_once():
+    family = [EMACrossStrategy(f, s) for f in (5, 10) for s in (10, 20, 30)]
+    stats = expr.plan([s.signal_expr() for s in family])
+    # 每个表达式 SG_FLEX -> EMA -> CLOSE
+    assert stats == {'nodes': 18, 'unique': 1 + 2 + 6, 'indicators': 2}
+
+    boll = [BollingerBreakoutStrategy(20, k) for k in (1.5, 2.0)]
+    stats = expr.plan([s.signal_expr() for s in boll])
+    # MA/STD 共享，CVAL(k)、MUL、ADD 与 k 有关
+    assert stats['indicators'] == 2 + 2 * 2
+    assert stats['unique'] < stats['nodes']
+
+
+def test_legacy_names_share_entries_with_the_indicators_module():
+    assert expr._cache_entry(expr.EMA(expr.CLOSE, 10)) == ('EMA', (10,))
+    assert expr._cache_entry(expr.ADX(14)) == ('TA_ADX', (14,))
+    nested = expr.EMA(expr.EMA(expr.CLOSE, 10), 5)
+    assert expr._cache_entry(nested) == ('EXPR', (nested.key,))
+
+
+def test_batch_signals_computes_each_unique_indicator_once():
+    kdata = to_kdata(stock_columns(gbm_ohlcv(1, 200, seed=2), 0), 'SZ600000')
+    family = [EMACrossStrategy(f, s) for f in (5, 10, 15) for s in (20, 30)]
+    family += [EMACrossWithADXFilterStrategy(f, 20, 14, t) for f in (5, 10) for t in (20, 25)]
+    with use_cache() as cache:
+        signals, stats = batch_signals(family, kdata)
+        assert len(signals) == len(family)
+        # EMA 5/10/15 + ADX(14) + SLICE(ADX, 0)
+        assert stats['indicators'] == stats['computed'] == 5
+        assert cache.misses == 5
+
+        # 同一缓存内再次创建时不再计算
+        _, again = batch_signals(family, kdata)
+        assert again['computed'] == 0
+        # 与 indicators 模块直接调用共享缓存条目
+        indicators.EMA(kdata, 10)
+        assert cache.misses == 5
@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("hikyuu")
+
+from strategies.indicators import IndicatorCache, format_cache_stats, get_cache, kdata_key, use_cache  # noqa: E402
+
+
+class _KData:
+    """只提供 kdata_key() 用到的接口的K线替身"""
+
+    def __init__(self, code, n=100):
+        self.code = code
+        self.n = n
+
+    def get_query(self):
+        return SimpleNamespace(ktype='DAY', recover_type=0)
+
+    def get_stock(self):
+        return SimpleNamespace(market_code=self.code)
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        return SimpleNamespace(datetime=f"bar{i % self.n}")
+
+
+class _Ind:
+    def __init__(self, n, results=1):
+        self.n = n
+        self.results = results
+
+    def __len__(self):
+        return self.n
+
+    def get_result_num(self):
+        return self.results
+
+
+def test_hits_and_misses_are_counted_per_kdata_and_params():
+    cache = IndicatorCache()
+    a, b = _KData('SZ000001'), _KData('SZ000002')
+    calls = []
+
+    def factory(n):
+        def make():
+            calls.append(n)
+            return _Ind(100)
+        return make
+
+    first = cache.get(a, 'EMA', (10,), factory(10))
+    assert cache.get(a, 'EMA', (10,), factory(10)) is first
+    cache.get(a, 'EMA', (20,), factory(20))
+    cache.get(b, 'EMA', (10,), factory(10))
+    assert calls == [10, 20, 10]
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 3, 3)
+    assert stats['hit_rate'] == 0.25
+    assert stats['nbytes'] == 3 * 100 * 8
+    assert '命中 1 次' in format_cache_stats(stats)
+
+    cache.reset_stats()
+    cache.clear()
+    assert cache.stats()['hits'] == 0 and len(cache) == 0 and cache.nbytes == 0
+
+
+def test_kdata_key_distinguishes_ranges():
+    assert kdata_key(_KData('SZ000001', 100)) != kdata_key(_KData('SZ000001', 50))
+    assert kdata_key(_KData('SZ000001')) == kdata_key(_KData('SZ000001'))
+
+
+def test_lru_eviction_keeps_recently_used_within_budget():
+    kdata = _KData('SZ000001')
+    # 每个指标 100 个值 × 2 个结果集 × 8 字节 = 1600 字节，预算放得下 2 个
+    cache = IndicatorCache(max_bytes=3500)
+    for n in (1, 2):
+        cache.get(kdata, 'MACD', (n,), lambda: _Ind(100, 2))
+    cache.get(kdata, 'MACD', (1,), lambda: pytest.fail("应命中"))
+    cache.get(kdata, 'MACD', (3,), lambda: _Ind(100, 2))
+
+    assert cache.evictions == 1
+    assert cache.nbytes == 3200 <= cache.max_bytes
+    recomputed = []
+    cache.get(kdata, 'MACD', (2,), lambda: recomputed.append(2) or _Ind(100, 2))
+    assert recomputed == [2]
+    assert cache.get(kdata, 'MACD', (3,), lambda: pytest.fail("应命中")) is not None
+
+
+def test_use_cache_scopes_the_active_cache():
+    outer = get_cache()
+    with use_cache() as cache:
+        assert get_cache() is cache is not outer
+        mine = IndicatorCache()
+        with use_cache(mine):
+            assert get_cache() is mine
+        assert get_cache() is cache
+    assert get_cache() is outer
@@ -0,0 +1,132 @@
+import json
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+hku = pytest.importorskip("hikyuu")
+
+from backtest.kcache import COLUMNS, STOCK_FIELDS, KDataCache, fixed_query  # noqa: E402
+from backtest.runner import run_strategy_backtest  # noqa: E402
+from benchmarks.synthetic import gbm_ohlcv, stock_columns  # noqa: E402
+from strategies import EMACrossStrategy, MACDStrategy  # noqa: E402
+from strategies.all_strategies import BollingerBreakoutStrategy, EMACrossWithADXFilterStrategy  # noqa: E402
+
+CODE = 'sz000001'
+
+
+class _Stamp:
+    def __init__(self, number):
+        self.number = number
+
+
+class _KData:
+    """只提供 KDataCache.save() 用到的接口的K线替身"""
+
+    def __init__(self, n_bars, ktype='DAY'):
+        cols = stock_columns(gbm_ohlcv(1, n_bars, seed=1), 0)
+        self.data = np.zeros(n_bars, dtype=[(c, 'M8[us]' if c == 'datetime' else 'f8') for c in COLUMNS])
+        for c in COLUMNS:
+            self.data[c] = cols[c]
+        self.stock = SimpleNamespace(
+            market_code='SZ000001', name='平安银行', type=1, valid=True,
+            start_datetime=_Stamp(199104030000), last_datetime=_Stamp(0),
+            tick=0.01, tick_value=0.01, precision=2, min_trade_number=100, max_trade_number=1000000)
+        self.query = SimpleNamespace(query_type=0, start=0, end=n_bars, start_datetime='', end_datetime='',
+                                     ktype=ktype, recover_type=0)
+
+    def get_stock(self):
+        return self.stock
+
+    def get_query(self):
+        return self.query
+
+    def to_np(self):
+        return self.data
+
+
+def test_stale_stamp_invalidates_entry(tmp_path):
+    kdata = _KData(50)
+    cache = KDataCache(str(tmp_path))
+    cache.save(kdata, stamp='2024-01-31')
+
+    arrays = cache.load_arrays('sz000001', kdata.query, stamp='2024-01-31')
+    assert isinstance(arrays['close'], np.memmap)
+    np.testing.assert_array_equal(arrays['close'], kdata.data['close'])
+    assert arrays['meta']['stock']['min_trade_number'] == 100
+    assert arrays['meta']['stock']['start_datetime'] == 199104030000
+
+    # 数据源追加了新K线
+    assert cache.load_arrays('SZ000001', kdata.query, stamp='2024-02-01') is None
+    assert cache.stale == 1
+    # 不校验时信任已有缓存
+    assert cache.load_arrays('SZ000001', kdata.query) is not None
+
+    # 重写同一条目后新时间戳生效
+    cache.save(kdata, stamp='2024-02-01')
+    assert cache.load_arrays('SZ000001', kdata.query, stamp='2024-02-01') is not None
+    entry = cache.entry_dir('SZ000001', kdata.query)
+    assert os.listdir(os.path.dirname(entry)) == [os.path.basename(entry)]
+    with open(os.path.join(entry, 'meta.json'), encoding='utf-8') as f:
+        assert json.load(f)['bars'] == 50
+
+
+def test_missing_entry_and_other_ktype_miss(tmp_path):
+    cache = KDataCache(str(tmp_path))
+    cache.save(_KData(10), stamp='x')
+    assert cache.load_arrays('SZ000001', _KData(10, ktype='WEEK').query) is None
+    assert cache.load_arrays('SZ000002', _KData(10).query) is None
+
+
+def test_unvalidated_cache_refuses_relative_queries(tmp_path):
+    assert not fixed_query(hku.Query(-100))
+    assert not fixed_query(hku.Query(0))
+    assert fixed_query(hku.Query(0, 100))
+    assert not fixed_query(hku.Query(hku.Datetime(202001010000)))
+    assert fixed_query(hku.Query(hku.Datetime(202001010000), hku.Datetime(202101010000)))
+
+    with pytest.raises(ValueError, match='相对查询'):
+        KDataCache(str(tmp_path), validate=False).get_arrays(CODE, hku.Query(-100))
+
+
+@pytest.fixture(scope='module')
+def stock():
+    from backtest.loader import load_scoped
+
+    try:
+        load_scoped([CODE])
+    except Exception as e:
+        pytest.skip(f"无法加载 hikyuu 数据: {e}")
+    stock = hku.get_stock(CODE)
+    if stock.is_null() or stock.get_count(hku.Query.DAY) < 300:
+        pytest.skip("没有可用的 hikyuu K线数据")
+    return stock
+
+
+@pytest.mark.parametrize('validate', [True, False])
+def test_cached_backtest_matches_direct(stock, tmp_path, validate):
+    query = hku.Query(-300) if validate else hku.Query(0, 300)
+    direct = stock.get_kdata(query)
+    KDataCache(str(tmp_path)).get_arrays(CODE, query)
+
+    cache = KDataCache(str(tmp_path), validate)
+    cached = cache.get_kdata(CODE, query)
+    assert cache.stats()['hits'] == 1
+    assert len(cached) == len(direct)
+    rebuilt = cached.get_stock()
+    assert rebuilt.market_code == stock.market_code
+    for field in STOCK_FIELDS:
+        assert getattr(rebuilt, field) == getattr(stock, field), field
+
+    strategies = [
+        EMACrossStrategy(5, 10),
+        MACDStrategy(12, 26, 9),
+        BollingerBreakoutStrategy(20, 2),
+        EMACrossWithADXFilterStrategy(5, 10, 14, 25),
+    ]
+    for strategy in strategies:
+        expected = run_strategy_backtest(strategy, direct, 300000)
+        got = run_strategy_backtest(strategy, cached, 300000)
+        for name in ('total_return', 'trade_count', 'current_value', 'max_drawdown', 'sharpe'):
+            assert got[name] == pytest.approx(expected[name]), (strategy.get_description(), name)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+import pandas as pd
+import pytest
+
+from portfolio_module import TradeLedger, build_ledger, read_trades
+from portfolio_module.ledger import _unread_row_groups
+
+
+def _fills(n, ticker="A"):
+    """n 笔交替买卖（每次买 10 股、卖 10 股），价格逐笔上涨 1"""
+    days = pd.date_range("2024-01-01", periods=n, freq="D")
+    return pd.DataFrame({
+        "date": days,
+        "ticker": ticker,
+        "side": ["BUY" if i % 2 == 0 else "SELL" for i in range(n)],
+        "shares": 10.0,
+        "price": 10.0 + pd.RangeIndex(n).to_numpy(),
+        "fee": 0.0,
+    })
+
+
+def test_fifo_consumes_oldest_lots_first():
+    ledger = TradeLedger("fifo")
+    ledger.add("2024-01-01", "A", "BUY", 100, 10.0)
+    ledger.add("2024-01-05", "A", "买入", 100, 20.0)
+    ledger.add("2024-01-11", "A", "SELL", 150, 30.0)
+
+    m = ledger.matches()
+    assert m["shares"].tolist() == [100.0, 50.0]
+    assert m["cost"].tolist() == [1000.0, 1000.0]
+    assert m["holding_days"].tolist() == [10.0, 6.0]
+    assert ledger.realized["A"] == pytest.approx(150 * 30.0 - 2000.0)
+    assert ledger.open_positions() == {"A": (50.0, 20.0)}
+    assert ledger.fills == 3
+
+
+def test_fees_enter_cost_and_reduce_proceeds():
+    ledger = TradeLedger("fifo")
+    ledger.add("2024-01-01", "A", "BUY", 100, 10.0, fee=5.0)
+    ledger.add("2024-01-02", "A", "SELL", 100, 11.0, fee=3.0)
+    assert ledger.realized_pnl == pytest.approx(1100.0 - 3.0 - 1005.0)
+
+
+def test_average_cost_matches_fifo_total_when_fully_closed():
+    records = [
+        {"date": "2024-01-01", "ticker": "A", "side": "BUY", "shares": 100, "price": 10.0},
+        {"date": "2024-01-02", "ticker": "A", "side": "BUY", "shares": 100, "price": 14.0},
+        {"date": "2024-01-03", "ticker": "A", "side": "SELL", "shares": 50, "price": 13.0},
+        {"date": "2024-01-04", "ticker": "A", "side": "SELL", "shares": 150, "price": 15.0},
+    ]
+    fifo = build_ledger(records, method="fifo")
+    avg = build_ledger(records, method="average")
+    assert fifo.realized_pnl == pytest.approx(avg.realized_pnl)
+    assert avg.matches()["cost"].iloc[0] == pytest.approx(50 * 12.0)
+
+
+def test_oversell_raises_when_strict_and_is_recorded_otherwise():
+    with pytest.raises(ValueError):
+        build_ledger([{"date": "2024-01-01", "ticker": "A", "side": "SELL", "shares": 1, "price": 1.0}])
+
+    ledger = TradeLedger(strict=False)
+    ledger.add("2024-01-01", "A", "BUY", 10, 1.0)
+    ledger.add("2024-01-02", "A", "SELL", 15, 1.0)
+    assert ledger.unmatched == {"A": 5.0}
+
+
+@pytest.mark.parametrize("method", ["fifo", "average"])
+def test_strict_oversell_is_rejected_by_add_and_keeps_buffer(method):
+    ledger = TradeLedger(method)
+    ledger.add("2024-01-01", "A", "BUY", 10, 1.0)
+    ledger.add("2024-01-02", "A", "SELL", 4, 2.0)
+    ledger.flush()
+    ledger.add("2024-01-03", "A", "BUY", 5, 1.0)
+    with pytest.raises(ValueError, match="超过当前持仓"):
+        ledger.add("2024-01-04", "A", "SELL", 12, 2.0)
+    with pytest.raises(ValueError, match="买卖方向"):
+        ledger.add("2024-01-04", "A", "HOLD", 1, 2.0)
+
+    # 出错的成交被拒绝，缓冲区内其余成交照常配对
+    ledger.add("2024-01-05", "A", "SELL", 11, 2.0)
+    assert ledger.fills == 4
+    assert ledger.realized_pnl == pytest.approx(15.0)
+    assert ledger.open_positions() == {}
+
+
+def test_add_buffer_is_flushed_before_frame_in_time_order():
+    ledger = TradeLedger()
+    ledger.add("2024-01-01", "A", "BUY", 10, 1.0)
+    # 这一块中的卖出依赖缓冲区里的买入
+    ledger.add_frame(pd.DataFrame([{"date": "2024-01-02", "ticker": "A", "side": "SELL",
+                                    "shares": 10, "price": 2.0}]))
+    assert ledger.realized["A"] == pytest.approx(10.0)
+
+
+def test_save_and_load_keep_pending_fills(tmp_path):
+    ledger = TradeLedger()
+    ledger.add("2024-01-01", "A", "BUY", 10, 1.0)
+    path = str(tmp_path / "ledger.pkl")
+    ledger.save(path)
+    assert TradeLedger.load(path).open_positions() == {"A": (10.0, 1.0)}
+
+
+def test_processed_row_groups_are_not_read_again():
+    assert _unread_row_groups([100] * 30, 2550) == (list(range(25, 30)), 50)
+    assert _unread_row_groups([100] * 30, 2500) == (list(range(25, 30)), 0)
+    assert _unread_row_groups([100] * 30, 0) == (list(range(30)), 0)
+    assert _unread_row_groups([100] * 30, 3000) == ([], 0)
+    assert _unread_row_groups([50, 200, 10], 120) == ([1, 2], 70)
+
+
+@pytest.mark.parametrize("skip", [0, 1, 99, 100, 101, 2550, 2999])
+def test_parquet_skip_reads_only_unprocessed_rows(tmp_path, skip):
+    pytest.importorskip("pyarrow")
+    df = _fills(3000)
+    path = str(tmp_path / "fills.parquet")
+    df.to_parquet(path, row_group_size=100, index=False)
+
+    chunks = list(read_trades(path, chunksize=64, skip=skip))
+    read = pd.concat(chunks, ignore_index=True) if chunks else df.iloc[:0]
+    assert len(read) == len(df) - skip
+    assert read["price"].tolist() == df["price"].iloc[skip:].tolist()
+
+
+def test_parquet_skip_past_end_yields_nothing(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = str(tmp_path / "fills.parquet")
+    _fills(200).to_parquet(path, row_group_size=100, index=False)
+    assert list(read_trades(path, skip=200)) == []
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_ingest_appended_file_matches_single_pass(tmp_path, suffix):
+    if suffix == ".parquet":
+        pytest.importorskip("pyarrow")
+    df = _fills(1000)
+    path = str(tmp_path / f"fills{suffix}")
+
+    def write(frame):
+        if suffix == ".csv":
+            frame.to_csv(path, index=False)
+        else:
+            frame.to_parquet(path, row_group_size=100, index=False)
+
+    write(df.iloc[:550])
+    incremental = TradeLedger()
+    assert incremental.ingest(path, chunksize=64) == 550
+    write(df)
+    assert incremental.ingest(path, chunksize=64) == 450
+
+    full = TradeLedger()
+    full.add_frame(df)
+    assert incremental.fills == full.fills == 1000
+    assert incremental.realized_pnl == pytest.approx(full.realized_pnl)
+    assert incremental.open_positions() == full.open_positions()
@@ -0,0 +1,94 @@
+import configparser
+import os
+import tempfile
+
+import pytest
+
+pytest.importorskip("hikyuu")
+
+from backtest.loader import StartupTimer, lazy_config_file, scoped_load_options  # noqa: E402
+
+CONFIG = """[hikyuu]
+datadir = /data/hikyuu
+
+[block]
+type = qianlong
+dir = /data/hikyuu/block
+
+[preload]
+day = True
+week = True
+min5 = False
+day_max = 100000
+"""
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path / 'tmp'))
+    os.makedirs(tempfile.tempdir)
+    path = tmp_path / 'hikyuu.ini'
+    path.write_text(CONFIG, encoding='utf-8')
+    return str(path)
+
+
+def _read(path):
+    ini = configparser.RawConfigParser()
+    ini.read(path, encoding='utf-8')
+    return ini
+
+
+def test_lazy_copy_turns_off_preload_and_keeps_other_sections(config):
+    path = lazy_config_file(config)
+    assert os.path.dirname(path) == tempfile.tempdir
+    ini = _read(path)
+    assert [ini.get('preload', k) for k in ('day', 'week', 'min5')] == ['False'] * 3
+    # 非K线类型开关的选项原样保留
+    assert ini.get('preload', 'day_max') == '100000'
+    assert ini.get('hikyuu', 'datadir') == '/data/hikyuu'
+    assert dict(ini.items('block')) == {'type': 'qianlong', 'dir': '/data/hikyuu/block'}
+    # 原文件不被修改
+    assert _read(config).get('preload', 'day') == 'True'
+
+
+def test_lazy_copy_is_reused_until_the_config_changes(config):
+    path = lazy_config_file(config)
+    mtime = os.stat(path).st_mtime_ns
+    assert lazy_config_file(config) == path
+    assert os.stat(path).st_mtime_ns == mtime
+
+    with open(config, 'a', encoding='utf-8') as f:
+        f.write('month = True\n')
+    changed = lazy_config_file(config)
+    assert changed != path
+    assert _read(changed).get('preload', 'month') == 'False'
+
+
+def test_missing_config_gives_none(tmp_path):
+    assert lazy_config_file(str(tmp_path / 'missing.ini')) is None
+    options = scoped_load_options(['sz000001'], config_file=str(tmp_path / 'missing.ini'))
+    assert options['config_file'] == str(tmp_path / 'missing.ini')
+
+
+def test_scoped_options_lowercase_codes_and_ktypes(config):
+    options = scoped_load_options(['SZ000001', 'sh600000'], ktype_list=('DAY', 'Min5'),
+                                  config_file=config, start_spot=True)
+    assert options['stock_list'] == ['sz000001', 'sh600000']
+    assert options['ktype_list'] == ['day', 'min5']
+    assert options['config_file'] == lazy_config_file(config)
+    assert options['start_spot'] is True and options['load_history_finance'] is False
+
+    assert 'stock_list' not in scoped_load_options(config_file=config)
+    assert scoped_load_options(config_file=config, preload=True)['config_file'] == config
+
+
+def test_startup_timer_records_phases():
+    timer = StartupTimer()
+    with timer.phase('config'):
+        pass
+    with pytest.raises(RuntimeError):
+        with timer.phase('load_hikyuu'):
+            raise RuntimeError
+    assert list(timer.as_dict()) == ['config', 'load_hikyuu']
+    assert timer.total() == pytest.approx(sum(timer.as_dict().values()))
+    assert timer.format().startswith('启动耗时')
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("hikyuu")
+
+from backtest.metrics import (  # noqa: E402
+    bar_returns,
+    max_drawdown,
+    periods_per_year,
+    risk_metrics,
+    sharpe_ratio,
+    sortino_ratio,
+)
+
+
+def test_bar_returns_and_zero_guard():
+    assert bar_returns([100.0, 110.0, 99.0]).tolist() == pytest.approx([0.1, -0.1])
+    assert bar_returns([0.0, 5.0]).tolist() == [0.0]
+    assert bar_returns([1.0]).shape == (0,)
+
+
+def test_max_drawdown_per_column():
+    equity = np.array([[100.0, 100.0], [120.0, 90.0], [60.0, 95.0], [130.0, 80.0]])
+    assert max_drawdown(equity).tolist() == pytest.approx([0.5, 0.2])
+    assert max_drawdown(np.zeros((0, 3))).tolist() == [0.0, 0.0, 0.0]
+
+
+def test_ratios_match_definitions():
+    r = np.array([0.01, -0.02, 0.03, 0.0, -0.01])
+    assert sharpe_ratio(r, 252) == pytest.approx(r.mean() / r.std(ddof=1) * np.sqrt(252))
+    downside = np.sqrt(np.mean(np.minimum(r, 0.0) ** 2))
+    assert sortino_ratio(r, 252) == pytest.approx(r.mean() / downside * np.sqrt(252))
+    assert sharpe_ratio(np.zeros(5)) == 0.0
+    assert sharpe_ratio(np.array([0.1])).shape == ()
+
+
+def test_risk_metrics_single_series_matches_each_column():
+    rng = np.random.default_rng(0)
+    equity = 1000 * np.cumprod(1 + rng.normal(0, 0.01, (200, 3)), axis=0)
+    position = rng.integers(0, 2, (200, 3))
+    traded = np.array([500.0, 0.0, 2000.0])
+
+    many = risk_metrics(equity, position, traded, ppy=52)
+    for j in range(3):
+        one = risk_metrics(equity[:, j], position[:, j], traded[j], ppy=52)
+        assert isinstance(one['sharpe'], float)
+        for name, value in one.items():
+            assert value == pytest.approx(many[name][j]), name
+    assert many['exposure'] == pytest.approx(position.mean(axis=0))
+    assert many['turnover'] == pytest.approx(traded / equity.mean(axis=0))
+
+
+def test_periods_per_year_defaults_to_daily():
+    assert periods_per_year('week') == 52
+    assert periods_per_year('MIN5') == 252 * 48
+    assert periods_per_year('unknown') == 252
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+from portfolio_module import build_book, build_positions, rebalance_orders, rebalance_plan
+from portfolio_module.orders import _water_fill
+
+RAW = [
+    {"ticker": "A", "group": "科技", "shares": 3000, "cost": 10.0, "price": 20.0},
+    {"ticker": "B", "group": "科技", "shares": 1000, "cost": 10.0, "price": 15.0},
+    {"ticker": "C", "group": "消费", "shares": 500, "cost": 30.0, "price": 30.0},
+    {"ticker": "D", "group": "红利", "shares": 200, "cost": 5.0, "price": 5.0},
+]
+CASH = {"stock_cash": 20000.0}
+TARGETS = [
+    {"group": "科技", "target_weight": 0.4, "band": 0.1},
+    {"group": "消费", "target_weight": 0.3, "band": 0.1},
+    {"group": "红利", "target_weight": 0.2, "band": 0.1},
+    {"group": "债券", "target_weight": 0.1, "band": 0.1},
+]
+RULES = {"max_trade_cash_fraction": 0.5}
+
+
+def test_water_fill_equalizes_remaining_gaps_within_budget():
+    needs = np.array([100.0, 60.0, 10.0])
+    alloc = _water_fill(needs, 90.0)
+    assert alloc.sum() == pytest.approx(90.0)
+    assert (needs - alloc).tolist() == pytest.approx([35.0, 35.0, 10.0])
+    assert _water_fill(needs, 500.0).tolist() == needs.tolist()
+    assert _water_fill(needs, 0.0).tolist() == [0.0, 0.0, 0.0]
+
+
+def test_orders_trade_whole_lots_and_stay_within_budget():
+    res = rebalance_orders(build_book(RAW), CASH, TARGETS, False, RULES)
+    sells = [o for o in res["orders"] if o["side"] == "SELL"]
+    buys = [o for o in res["orders"] if o["side"] == "BUY"]
+
+    assert sells and all(o["group"] == "科技" for o in sells)
+    assert all(o["shares"] % 100 == 0 for o in res["orders"])
+    assert res["buy_amount"] <= res["budget"] + 1e-9
+    assert res["budget"] == pytest.approx(20000.0 * 0.5 + res["sell_proceeds"])
+    assert {o["group"] for o in buys} <= {"消费", "红利"}
+    assert res["unassigned"][0]["group"] == "债券"
+    assert res["tracking_error_after"] < res["tracking_error_before"]
+
+
+def test_list_and_book_inputs_give_the_same_orders():
+    assert rebalance_orders(build_positions(RAW), CASH, TARGETS, False, RULES) == \
+        rebalance_orders(build_book(RAW), CASH, TARGETS, False, RULES)
+
+
+def test_ticker_held_in_several_groups_keeps_group_values():
+    raw = RAW + [{"ticker": "C", "group": "红利", "shares": 400, "cost": 30.0, "price": 30.0}]
+    book = build_book(raw)
+    res = rebalance_orders(book, CASH, TARGETS, False, RULES)
+    deviation, _ = rebalance_plan(book, CASH, TARGETS, False, RULES)
+
+    expected = {r["group"]: r["current_value"] for r in deviation}
+    got = {r["group"]: r["current_value"] for r in res["groups"]}
+    assert got == pytest.approx(expected)
+
+    # 每笔订单的板块金额变化都记在它所属的板块
+    change = {g: 0.0 for g in got}
+    for o in res["orders"]:
+        change[o["group"]] += o["amount"] if o["side"] == "BUY" else -o["amount"]
+    after = {r["group"]: r["after_value"] for r in res["groups"]}
+    assert after == pytest.approx({g: got[g] + change[g] for g in got})
+
+    # 卖出不会超过该板块内实际持有的股数
+    held = {(p["ticker"], p["group"]): p["shares"] for p in raw}
+    for o in res["orders"]:
+        if o["side"] == "SELL":
+            assert o["shares"] <= held[(o["ticker"], o["group"])]
+
+
+def test_untriggered_groups_are_left_alone():
+    targets = [
+        {"group": "科技", "target_weight": 0.8, "band": 1.0},
+        {"group": "消费", "target_weight": 0.1, "band": 1.0},
+        {"group": "红利", "target_weight": 0.1, "band": 1.0},
+    ]
+    res = rebalance_orders(build_book(RAW), CASH, targets, False, RULES)
+    assert res["orders"] == []
+    assert not any(r["triggered"] for r in res["groups"])
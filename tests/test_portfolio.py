@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from portfolio_module import build_book, build_positions, portfolio_summary, positions_report, rebalance_plan
+from portfolio_module.portfolio import group_current_values
+
+RAW = [
+    {"ticker": "A", "group": "科技", "shares": 100, "cost": 10.0, "price": 12.0},
+    {"ticker": "B", "group": "消费", "shares": 200, "cost": 20.0, "price": 18.0},
+    {"ticker": "C", "group": "科技", "shares": 50, "cost": 30.0, "price": 30.0},
+    {"ticker": "A", "group": "科技", "shares": 1, "cost": 1.0, "price": 1.0},
+]
+CASH = {"stock_cash": 5000.0, "other_funds_investable": 1000.0}
+TARGETS = [
+    {"group": "科技", "target_weight": 0.5, "band": 0.1},
+    {"group": "消费", "target_weight": 0.3, "band": 0.1},
+    {"group": "红利", "target_weight": 0.2, "band": 0.1},
+]
+
+
+def test_summary_is_the_same_for_list_and_book():
+    for include_other in (True, False):
+        expected = portfolio_summary(build_positions(RAW), CASH, include_other)
+        got = portfolio_summary(build_book(RAW), CASH, include_other)
+        assert got == pytest.approx(expected)
+    assert expected["stock_market_value"] == pytest.approx(100 * 12 + 200 * 18 + 50 * 30 + 1)
+
+
+def test_group_values_are_the_same_for_list_and_book():
+    expected = group_current_values(build_positions(RAW))
+    assert group_current_values(build_book(RAW)) == pytest.approx(expected)
+    assert expected == pytest.approx({"科技": 1200 + 1500 + 1, "消费": 3600})
+
+
+def test_report_keeps_first_row_per_ticker_sorted_by_pnl():
+    expected = positions_report(build_positions(RAW))
+    got = positions_report(build_book(RAW))
+    assert [r["ticker"] for r in expected] == ["A", "C", "B"]
+    assert [r["ticker"] for r in got] == ["A", "C", "B"]
+    assert got == expected
+
+
+def test_rebalance_plan_is_the_same_for_list_and_book():
+    rules = {"max_trade_cash_fraction": 0.5}
+    expected = rebalance_plan(build_positions(RAW), CASH, TARGETS, True, rules)
+    got = rebalance_plan(build_book(RAW), CASH, TARGETS, True, rules)
+    assert got == expected
+    deviation, actions = expected
+    assert {r["group"] for r in deviation} == {"科技", "消费", "红利"}
+    buy = next(r for r in actions if r["group"] == "红利")
+    assert buy["action"] == "BUY"
+    assert buy["action_amount"] == pytest.approx(0.2 * (6301 + 5000 + 1000))
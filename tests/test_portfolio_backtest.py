@@ -0,0 +1,89 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("hikyuu")
+
+import backtest.portfolio  # noqa: E402
+from backtest.portfolio import align_panel, load_panel, panel_signals, simulate_portfolio  # noqa: E402
+from backtest.trades import BUY, SELL  # noqa: E402
+from benchmarks.synthetic import gbm_ohlcv, stock_columns  # noqa: E402
+from strategies import EMACrossStrategy  # noqa: E402
+
+N_STOCKS = 6
+
+
+@pytest.fixture(scope="module")
+def panel():
+    data = gbm_ohlcv(N_STOCKS, 400, seed=11)
+    arrays = {f"s{i}": stock_columns(data, i) for i in range(N_STOCKS)}
+    # 第一只股票停牌 50 天，日期轴上留下空洞
+    arrays["s0"] = {k: np.r_[v[:100], v[150:]] for k, v in arrays["s0"].items()}
+    return align_panel(arrays)
+
+
+def test_align_panel_marks_missing_days(panel):
+    assert panel["open"].shape == (400, N_STOCKS)
+    assert np.isnan(panel["close"][100:150, 0]).all()
+    assert not np.isnan(panel["close"][:, 1:]).any()
+    assert (panel["rows"][-50:, 0] == -1).all()
+    assert panel["rows"][100, 0] == 150
+    with pytest.raises(ValueError):
+        align_panel({})
+
+
+def test_simulation_invariants(panel):
+    entry, exit_ = panel_signals(EMACrossStrategy(5, 10), panel)
+    assert not (entry & exit_).any()
+    res = simulate_portfolio(panel, entry, exit_, init_cash=1000000, max_positions=3)
+    holdings, trades = res["holdings"], res["trades"]
+
+    close = pd.DataFrame(panel["close"]).ffill().fillna(0.0).to_numpy()
+    np.testing.assert_allclose(res["equity"], res["cash"] + (holdings * close).sum(axis=1))
+
+    assert len(trades) > 0
+    assert (res["cash"] >= -1e-6).all()
+    assert (res["positions"] <= 3).all()
+    assert (holdings % 100 == 0).all()
+
+    # 成交记录逐笔回放得到同样的持仓和现金
+    qty = np.zeros(N_STOCKS)
+    cash = 1000000.0
+    for rec in trades:
+        j = rec["stock"]
+        if rec["business"] == BUY:
+            assert qty[j] == 0
+            qty[j] = rec["number"]
+            cash -= rec["number"] * rec["price"]
+        else:
+            assert rec["business"] == SELL and qty[j] == rec["number"]
+            qty[j] = 0
+            cash += rec["number"] * rec["price"]
+    np.testing.assert_allclose(qty, holdings[-1])
+    assert cash == pytest.approx(res["cash"][-1])
+
+
+def test_no_entries_keeps_cash(panel):
+    none = np.zeros(panel["open"].shape, dtype=bool)
+    res = simulate_portfolio(panel, none, none, init_cash=5000)
+    assert (res["equity"] == 5000).all()
+    assert len(res["trades"]) == 0
+
+
+def test_load_panel_keys_by_the_callers_code(monkeypatch):
+    arrays = {"close": np.ones(3)}
+    empty = {"close": np.zeros(0)}
+
+    class Cache:
+        def get_arrays(self, code, query):
+            return arrays if code != "sz000002" else empty
+
+    def get_stock(code):
+        return SimpleNamespace(market_code=code.upper(), get_kdata=lambda query: code)
+
+    monkeypatch.setattr(backtest.portfolio.hku, "get_stock", get_stock)
+    monkeypatch.setattr(backtest.portfolio, "kdata_arrays", lambda kdata: arrays if kdata != "sz000002" else empty)
+    codes = ["sz000001", "SH600000", "sz000002"]
+    assert list(load_panel(codes, None)) == list(load_panel(codes, None, Cache())) == ["sz000001", "SH600000"]
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from portfolio_module import build_book, replay
+from portfolio_module.replay import UNGROUPED, forward_fill
+
+DATES = np.arange("2024-01-01", "2024-01-11", dtype="datetime64[D]")
+TICKERS = ["A", "B", "C"]
+CLOSE = np.column_stack([
+    10.0 + np.arange(10),
+    np.r_[np.nan, np.nan, 20.0 - np.arange(8)],
+    np.full(10, 5.0),
+])
+POSITIONS = [
+    {"ticker": "A", "group": "科技", "shares": 300, "cost": 10.0, "price": 19.0},
+    {"ticker": "B", "group": "消费", "shares": 100, "cost": 20.0, "price": 13.0},
+]
+CASH = {"stock_cash": 1000.0, "other_funds_investable": 500.0}
+TARGETS = [{"group": "科技", "target_weight": 0.6, "band": 0.1}, {"group": "消费", "target_weight": 0.4, "band": 0.1}]
+TRADES = [
+    {"date": "2024-01-03", "ticker": "A", "side": "BUY", "shares": 100, "price": 12.0, "fee": 1.0},
+    {"date": "2024-01-05", "ticker": "B", "side": "BUY", "shares": 100, "price": 18.0, "fee": 1.0},
+    {"date": "2024-01-07", "ticker": "C", "side": "SELL", "shares": 200, "price": 5.0, "fee": 1.0},
+    {"date": "2024-02-01", "ticker": "A", "side": "BUY", "shares": 100, "price": 20.0, "fee": 0.0},
+]
+
+
+def _naive(trades):
+    """逐日倒推的参考实现：当日持仓 = 当前持仓 - 当日之后成交的净买入"""
+    rows = []
+    for d in DATES:
+        shares = {p["ticker"]: float(p["shares"]) for p in POSITIONS}
+        cash = CASH["stock_cash"]
+        for t in trades:
+            if np.datetime64(t["date"]) > d:
+                sign = 1 if t["side"] == "BUY" else -1
+                shares[t["ticker"]] = shares.get(t["ticker"], 0.0) - sign * t["shares"]
+                cash += sign * t["shares"] * t["price"] + t["fee"]
+        rows.append((shares, cash))
+    return rows
+
+
+def test_replay_matches_per_day_reconstruction():
+    res = replay(DATES, TICKERS, forward_fill(CLOSE), build_book(POSITIONS), CASH, TARGETS, True,
+                 trades=TRADES, groups={"C": "红利"})
+    close = np.nan_to_num(forward_fill(CLOSE))
+    for i, (shares, cash) in enumerate(_naive(TRADES)):
+        expected = [shares.get(tk, 0.0) for tk in TICKERS]
+        assert res.shares[i].tolist() == pytest.approx(expected)
+        assert res.stock_cash[i] == pytest.approx(cash)
+        assert res.investable_total[i] == pytest.approx(np.dot(expected, close[i]) + cash + 500.0)
+
+    assert res.groups == ["消费", "科技", "红利"]
+    # 晚于最后一个交易日的成交只计入当前持仓
+    assert res.shares[-1].tolist() == [200.0, 100.0, 0.0]
+    assert res.stock_cash[-1] == pytest.approx(1000.0 + 2000.0)
+    assert res.unpriced.tolist()[:2] == [0, 0]
+
+
+def test_group_weights_and_triggers_follow_rebalance_rule():
+    res = replay(DATES, TICKERS, forward_fill(CLOSE), build_book(POSITIONS), CASH, TARGETS, False)
+    total = res.investable_total[:, None]
+    np.testing.assert_allclose(res.group_weights, res.group_values / total)
+    target = total * res.target_weights
+    np.testing.assert_array_equal(res.triggered, (target > 0) & (np.abs(target - res.group_values) > target * 0.1))
+    # 没有价格的日子按 0 估值并计数
+    assert res.unpriced.tolist()[:3] == [1, 1, 0]
+
+    table = res.table()
+    assert list(table.index) == list(pd.DatetimeIndex(DATES))
+    events = res.trigger_events()
+    assert all(e["group"] in res.groups for e in events)
+
+
+def test_tickers_without_group_are_ungrouped():
+    res = replay(DATES, TICKERS, CLOSE, build_book(POSITIONS), CASH, TARGETS, False, trades=TRADES)
+    assert UNGROUPED in res.groups
+
+
+def test_missing_price_data_raises():
+    with pytest.raises(KeyError):
+        replay(DATES, ["A"], CLOSE[:, :1], build_book(POSITIONS), CASH, TARGETS, False)
+
+
+def test_empty_date_axis_with_trades():
+    res = replay(DATES[:0], TICKERS, CLOSE[:0], build_book(POSITIONS), CASH, TARGETS, False, trades=TRADES)
+    assert res.shares.shape == (0, 3)
+    assert res.trigger_events() == []
+
+
+def test_forward_fill_keeps_leading_nan():
+    x = np.array([[np.nan, 1.0], [2.0, np.nan], [np.nan, 3.0]])
+    out = forward_fill(x)
+    assert np.isnan(out[0, 0])
+    assert out[1:, 0].tolist() == [2.0, 2.0]
+    assert out[:, 1].tolist() == [1.0, 1.0, 3.0]
+
+
+def test_load_close_matrix_loads_all_codes_at_once(monkeypatch):
+    pytest.importorskip("hikyuu")
+    import backtest.portfolio
+    from portfolio_module import load_close_matrix
+
+    calls = []
+
+    def fake_load_panel(codes, query, kdata_cache=None):
+        calls.append(list(codes))
+        day = np.array(["2024-01-02", "2024-01-03"], dtype="M8[us]")
+        return {code: {"datetime": day, "open": np.ones(2), "close": np.array([1.0, 2.0]) * (k + 1)}
+                for k, code in enumerate(codes)}
+
+    monkeypatch.setattr(backtest.portfolio, "load_panel", fake_load_panel)
+    dates, tickers, close = load_close_matrix({"甲": "sz000001", "乙": "sh600000", "丙": "sz000001"}, query=object())
+    assert calls == [["sz000001", "sh600000"]]
+    assert tickers == ["甲", "乙", "丙"]
+    assert close[:, 0].tolist() == close[:, 2].tolist() == [1.0, 2.0]
+    assert len(dates) == 2
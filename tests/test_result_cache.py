@@ -0,0 +1,84 @@
+import itertools
+import pickle
+
+import pytest
+
+pytest.importorskip("hikyuu")
+
+import backtest.result_cache  # noqa: E402
+from backtest.result_cache import ResultCache  # noqa: E402
+from backtest.runner import cached_results  # noqa: E402
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # 同一毫秒内的多次写入也要有先后顺序
+    ticks = itertools.count(1000.0)
+    monkeypatch.setattr(backtest.result_cache.time, "time", lambda: next(ticks))
+
+
+def _value(tag):
+    return {"tag": tag, "total_return": 1.5, "curve": list(range(20))}
+
+
+def test_roundtrip_and_counters(tmp_path, clock):
+    cache = ResultCache(str(tmp_path / "sub" / "cache.sqlite"))
+    assert cache.get("a") is None
+    cache.put("a", _value("a"))
+    assert cache.get("a") == _value("a")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes() == 0
+
+
+def test_evicts_least_recently_accessed_first(tmp_path, clock):
+    cache = ResultCache(str(tmp_path / "cache.sqlite"))
+    cache.put("a", _value("a"))
+    size = cache.nbytes()
+    cache.max_bytes = int(size * 2.5)
+
+    cache.put("b", _value("b"))
+    cache.get("a")
+    cache.put("c", _value("c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") == _value("a")
+    assert cache.get("c") == _value("c")
+    assert cache.evictions == 1
+    assert cache.nbytes() <= cache.max_bytes
+
+    # 覆盖已有键不增加条目
+    cache.put("c", _value("c"))
+    assert len(cache) == 2 and cache.evictions == 1
+
+
+def test_pickled_cache_reopens_the_same_file(tmp_path, clock):
+    cache = ResultCache(str(tmp_path / "cache.sqlite"))
+    cache.put("a", _value("a"))
+    other = pickle.loads(pickle.dumps(cache))
+    assert other._conn is None
+    assert other.get("a") == _value("a")
+    cache.close()
+    other.close()
+
+
+def test_cached_robustness_must_match_requested_resamples():
+    stored = {
+        "plain": {"total_return": 1.0},
+        "r10": {"total_return": 1.0, "robustness": {"resamples": 10}},
+        "r10000": {"total_return": 1.0, "robustness": {"resamples": 10000}},
+    }
+
+    class Cache:
+        def lookup(self, strategy, kdata, init_cash):
+            return stored.get(strategy)
+
+    names = ["plain", "r10", "r10000", "missing"]
+    assert [r is not None for r in cached_results(Cache(), names, None, 0)] == [True, True, True, False]
+    assert [r is not None for r in cached_results(Cache(), names, None, 0, resamples=10000)] == \
+        [False, False, True, False]
+    assert [r is not None for r in cached_results(Cache(), names, None, 0, resamples=10)] == \
+        [False, True, False, False]
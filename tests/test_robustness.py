@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("hikyuu")
+
+import backtest.robustness as R  # noqa: E402
+from backtest.trades import BUY, POSITION_DTYPE, SELL, TRADE_DTYPE, TradeBook  # noqa: E402
+
+
+def _book(rows):
+    trades = np.zeros(len(rows), dtype=TRADE_DTYPE)
+    for i, (business, number, price, cost) in enumerate(rows):
+        trades[i]['stock'] = 0
+        trades[i]['business'] = business
+        trades[i]['number'] = number
+        trades[i]['price'] = price
+        trades[i]['cost'] = cost
+    return TradeBook(['sz000001'], trades, np.zeros(0, dtype=POSITION_DTYPE))
+
+
+def test_submodule_is_not_shadowed_by_reexport():
+    import backtest
+
+    assert callable(R.resample_trades)
+    assert backtest.robustness_summary is R.robustness_summary
+
+
+def test_trade_pnl_sums_to_total_return_including_open_position():
+    book = _book([
+        (BUY, 100, 10.0, 5.0),
+        (BUY, 100, 12.0, 5.0),
+        (SELL, 150, 13.0, 4.0),
+        (SELL, 10, 9.0, 1.0),
+    ])
+    pnl = R.trade_pnl(book, prices=15.0)
+    cash_flow = -(100 * 10 + 5) - (100 * 12 + 5) + (150 * 13 - 4) + (10 * 9 - 1)
+    assert len(pnl) == 3
+    assert pnl.sum() == pytest.approx(cash_flow + 40 * 15.0)
+
+
+def test_permutation_keeps_total_return_and_changes_only_order():
+    pnl = np.array([500.0, -300.0, 1200.0, -800.0, 100.0, -50.0])
+    samples = R.resample_trades(pnl, 10000, n=500, method='permutation', seed=1)
+    assert samples['return_rate'] == pytest.approx(np.full(500, pnl.sum() / 10000 * 100))
+    assert samples['max_drawdown'].min() < samples['max_drawdown'].max()
+
+
+def test_bootstrap_is_reproducible_and_batched():
+    pnl = np.array([100.0, -40.0, 30.0, -10.0])
+    a = R.resample_trades(pnl, 1000, n=R._BATCH + 7, seed=3)
+    b = R.resample_trades(pnl, 1000, n=R._BATCH + 7, seed=3)
+    assert len(a['return_rate']) == R._BATCH + 7
+    np.testing.assert_array_equal(a['return_rate'], b['return_rate'])
+
+
+def test_ruin_is_flagged_when_equity_falls_below_level():
+    samples = R.resample_trades([-600.0], 1000, n=10, ruin_level=0.5)
+    assert samples['ruined'].all()
+    samples = R.resample_trades([-400.0], 1000, n=10, ruin_level=0.5)
+    assert not samples['ruined'].any()
+
+
+def test_no_trades_gives_flat_paths():
+    samples = R.resample_trades([], 1000, n=5)
+    assert samples['return_rate'].tolist() == [0.0] * 5
+    assert samples['max_drawdown'].tolist() == [0.0] * 5
+
+
+def test_block_resampling_of_constant_growth_is_exact():
+    equity = 1000 * 1.01 ** np.arange(50)
+    samples = R.resample_returns(equity, 1000, n=20, block=7)
+    assert samples['return_rate'] == pytest.approx(np.full(20, (1.01 ** 49 - 1) * 100))
+    assert samples['max_drawdown'] == pytest.approx(np.zeros(20))
+
+
+def test_confidence_summary_bounds():
+    samples = R.resample_trades([100.0, -50.0, 20.0], 1000, n=2000, seed=0)
+    s = R.confidence_summary(samples, ci=0.9)
+    assert s['resamples'] == 2000
+    assert s['return_lo'] <= s['return_mean'] <= s['return_hi']
+    assert 0.0 <= s['ruin_prob'] <= 1.0
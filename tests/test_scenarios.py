@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+from portfolio_module import build_book, evaluate_scenarios, rebalance_plan, targets_matrix
+
+RAW = [
+    {"ticker": "A", "group": "科技", "shares": 3000, "cost": 10.0, "price": 20.0},
+    {"ticker": "B", "group": "科技", "shares": 1000, "cost": 10.0, "price": 15.0},
+    {"ticker": "C", "group": "消费", "shares": 500, "cost": 30.0, "price": 30.0},
+    {"ticker": "D", "group": "红利", "shares": 200, "cost": 5.0, "price": 5.0},
+    {"ticker": "E", "group": "其他", "shares": 100, "cost": 8.0, "price": 9.0},
+]
+CASH = {"stock_cash": 20000.0, "other_funds_investable": 30000.0}
+CANDIDATES = [
+    [{"group": "科技", "target_weight": 0.4, "band": 0.1}, {"group": "消费", "target_weight": 0.3, "band": 0.2},
+     {"group": "红利", "target_weight": 0.2, "band": 0.1}, {"group": "债券", "target_weight": 0.1, "band": 0.5}],
+    # 权重之和不为 1，需归一
+    [{"group": "科技", "target_weight": 2.0, "band": 0.05}, {"group": "债券", "target_weight": 2.0, "band": 0.05}],
+    [{"group": "消费", "target_weight": 1.0, "band": 10.0}],
+]
+FRACTIONS = [0.33, 1.0, 0.0]
+
+
+@pytest.mark.parametrize("include_other", [False, True])
+def test_each_scenario_matches_rebalance_plan(include_other):
+    book = build_book(RAW)
+    groups, weights, bands = targets_matrix(CANDIDATES)
+    res = evaluate_scenarios(book, CASH, include_other, groups, weights, bands, FRACTIONS)
+    assert "其他" in res.groups
+
+    for s, targets in enumerate(CANDIDATES):
+        deviation, actions = rebalance_plan(book, CASH, targets, include_other,
+                                            {"max_trade_cash_fraction": FRACTIONS[s]})
+        got = {r["group"]: r for r in res.deviation_rows(s)}
+        for row in deviation:
+            assert got.pop(row["group"]) == pytest.approx(row)
+        # 其它配置里出现过的板块以 0 权重、0 市值列出
+        assert all(r["target_value"] == r["current_value"] == 0.0 for r in got.values())
+
+        buy = sum(a["max_buy"] for a in actions if a["triggered"] and a["action"] == "BUY")
+        sell = sum(a["action_amount"] for a in actions if a["triggered"] and a["action"] == "SELL")
+        table = res.table.iloc[s]
+        assert table["buy_amount"] == pytest.approx(buy)
+        assert table["sell_amount"] == pytest.approx(sell)
+        assert table["n_triggered"] == sum(r["triggered"] for r in deviation)
+        max_buy = dict(zip(res.groups, res.max_buy[s].tolist()))
+        for a in actions:
+            assert max_buy[a["group"]] == pytest.approx(a["max_buy"]), a["group"]
+
+
+def test_targets_matrix_fills_missing_groups_with_zero():
+    groups, weights, bands = targets_matrix(CANDIDATES, groups=["消费", "科技", "债券", "红利"])
+    assert groups == ["消费", "科技", "债券", "红利"]
+    assert weights[2].tolist() == [1.0, 0.0, 0.0, 0.0]
+    assert bands[1].tolist() == [0.0, 0.05, 0.05, 0.0]
+
+
+def test_broadcast_weights_bands_and_fractions():
+    book = build_book(RAW)
+    groups = ["科技", "消费"]
+    weights = np.random.default_rng(0).dirichlet(np.ones(2), 50)
+    res = evaluate_scenarios(book, CASH, False, groups, weights, bands=[0.1, 0.2], fractions=0.5)
+    assert res.weights.shape == (50, len(res.groups))
+    assert (res.fractions == 0.5).all()
+    assert len(res.table) == 50
+    assert (res.table["turnover"] >= 0).all()
@@ -0,0 +1,92 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("hikyuu")
+pytest.importorskip("pyarrow")
+
+from backtest.store import ResultStore, load_results, strategy_params  # noqa: E402
+
+
+class _Strategy:
+    def __init__(self, fast_period, slow_period):
+        self.fast_period = fast_period
+        self.slow_period = slow_period
+        self.name = 'EMA'
+        self._cache = object()
+
+    def get_description(self):
+        return f'EMA({self.fast_period},{self.slow_period})'
+
+
+class _Bar:
+    def __init__(self, datetime):
+        self.datetime = datetime
+
+
+class _KData:
+    """只提供 kdata_key() 用到的接口的K线替身"""
+
+    def __init__(self, n_bars):
+        self.bars = [_Bar(f'2024-01-{i + 1:02d} 00:00:00') for i in range(n_bars)]
+        self.stock = SimpleNamespace(market_code='SZ000001')
+        self.query = SimpleNamespace(ktype='DAY', recover_type=0)
+
+    def __len__(self):
+        return len(self.bars)
+
+    def __getitem__(self, i):
+        return self.bars[i]
+
+    def get_stock(self):
+        return self.stock
+
+    def get_query(self):
+        return self.query
+
+
+def _result(i, **extra):
+    return dict({'total_return': 1000.0 * i, 'return_rate': float(i), 'trade_count': i,
+                 'max_drawdown': -0.1 * i, 'elapsed': 0.01}, **extra)
+
+
+def test_strategy_params_keeps_public_scalars():
+    assert strategy_params(_Strategy(5, 10)) == {'fast_period': 5, 'slow_period': 10, 'name': 'EMA'}
+
+
+def test_roundtrip_across_row_groups_and_files(tmp_path):
+    root = str(tmp_path / 'results')
+    param_columns = ['fast_period', 'slow_period']
+    robustness = {'resamples': 100, 'method': 'bootstrap', 'p_value': 0.04}
+    phases = {'signals': 0.2, 'run': 0.5}
+    with ResultStore(root, param_columns, row_group_size=2) as store:
+        for i in range(5):
+            extra = {'phases': phases, 'robustness': robustness} if i == 3 else {}
+            store.append(_result(i, **extra), _Strategy(i, 2 * i), _KData(20))
+        # 满 row_group_size 即写出，剩余一行留在缓冲区
+        assert store.rows_written == 4
+    assert store.rows_written == 5
+
+    with ResultStore(root, param_columns) as other:
+        other.append(_result(9), _Strategy(9, 18), stock='SH600000', ktype='WEEK', bars=7)
+
+    df = load_results(root).to_pandas().sort_values('return_rate', ignore_index=True)
+    assert len(df) == 6
+    assert df['return_rate'].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0, 9.0]
+    assert df['param_slow_period'].tolist() == [0.0, 2.0, 4.0, 6.0, 8.0, 18.0]
+
+    row = df.iloc[3]
+    assert json.loads(row['params']) == {'fast_period': 3, 'slow_period': 6, 'name': 'EMA'}
+    assert json.loads(row['phases']) == phases
+    assert json.loads(row['robustness']) == robustness
+    assert row['strategy_class'] == '_Strategy' and row['strategy_name'] == 'EMA(3,6)'
+    assert (row['stock'], row['ktype'], row['bars']) == ('SZ000001', 'DAY', 20)
+    assert row['start'] == '2024-01-01 00:00:00' and row['end'] == '2024-01-20 00:00:00'
+    assert df['phases'].isna().sum() == 5
+
+    # 直接指定的列优先于从 kdata 推导的值
+    assert tuple(df.iloc[5][['stock', 'ktype', 'bars']]) == ('SH600000', 'WEEK', 7)
+
+    filtered = load_results(root, columns=['strategy_name'], filters=[('return_rate', '>', 2)])
+    assert sorted(filtered.column('strategy_name').to_pylist()) == ['EMA(3,6)', 'EMA(4,8)', 'EMA(9,18)']
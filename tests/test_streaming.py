@@ -0,0 +1,169 @@
+import math
+
+import numpy as np
+import pytest
+
+hku = pytest.importorskip("hikyuu")
+
+from backtest.kcache import to_kdata  # noqa: E402
+from backtest.metrics import risk_metrics  # noqa: E402
+from backtest.runner import run_strategy_backtest  # noqa: E402
+from backtest.streaming import (  # noqa: E402
+    STREAM_KERNELS,
+    ADXFilterStream,
+    ADXState,
+    AlternateState,
+    STDState,
+    StreamingBacktest,
+    StreamingWatchlist,
+)
+from backtest.vectorized import fast_backtest, kdata_arrays, rolling_std  # noqa: E402
+from benchmarks.synthetic import gbm_ohlcv, stock_columns  # noqa: E402
+from strategies import EMACrossStrategy, MACDStrategy, expr  # noqa: E402
+from strategies.all_strategies import BollingerBreakoutStrategy, EMACrossWithADXFilterStrategy  # noqa: E402
+
+STRATEGIES = [
+    EMACrossStrategy(5, 10, fixed_count=100),
+    MACDStrategy(12, 26, 9, fixed_count=100),
+    BollingerBreakoutStrategy(20, 2, fixed_count=100),
+]
+
+
+class _ADXBandStrategy(EMACrossWithADXFilterStrategy):
+    """上下轨都取 adx_threshold，ADX 上穿阈值恰逢 EMA 上穿时买入，SG_And 的买卖两侧都会触发"""
+
+    def signal_expr(self):
+        fast = expr.EMA(expr.CLOSE, self.fast_period)
+        adx_line = expr.SLICE(expr.ADX(self.adx_period), 0)
+        return expr.SG_And(expr.SG_Flex(fast, slow_n=self.slow_period),
+                           expr.SG_Band(adx_line, self.adx_threshold, self.adx_threshold))
+
+
+ADX_STRATEGIES = [
+    EMACrossWithADXFilterStrategy(5, 10, 14, 25, fixed_count=100),
+    _ADXBandStrategy(2, 3, 2, 50, fixed_count=100),
+]
+
+
+@pytest.fixture(scope="module")
+def arrays():
+    return stock_columns(gbm_ohlcv(1, 600, seed=7), 0)
+
+
+@pytest.fixture(scope="module")
+def kdata(arrays):
+    first, last = (int(str(arrays["datetime"][i])[:10].replace("-", "")) * 10000 for i in (0, -1))
+    info = {"type": int(hku.constant.STOCKTYPE_A), "valid": True, "start_datetime": first, "last_datetime": last,
+            "tick": 0.01, "tick_value": 0.01, "precision": 2, "min_trade_number": 100, "max_trade_number": 1000000}
+    return to_kdata(arrays, "SZ600000", info=info)
+
+
+@pytest.fixture
+def band_kernel(monkeypatch):
+    monkeypatch.setitem(STREAM_KERNELS, _ADXBandStrategy, ADXFilterStream)
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES, ids=lambda s: type(s).__name__)
+def test_replay_matches_vectorized_simulation(arrays, strategy):
+    stream = StreamingBacktest(strategy, init_cash=300000).replay(arrays)
+    fast = fast_backtest([strategy], init_cash=300000, arrays=arrays)
+    got = stream.results()
+
+    assert got['trade_count'] == int(fast['trade_count'][0]) > 0
+    assert got['total_return'] == pytest.approx(float(fast['total_return'][0]))
+
+    expected = risk_metrics(fast['equity'][:, 0], fast['held'][:, 0], fast['traded_value'][0])
+    for name in ('max_drawdown', 'volatility', 'sharpe', 'sortino', 'exposure', 'turnover'):
+        assert got[name] == pytest.approx(expected[name], rel=1e-6, abs=1e-12), name
+
+
+def test_appending_bars_one_by_one_equals_replay(arrays, tmp_path):
+    strategy = STRATEGIES[0]
+    full = StreamingBacktest(strategy).replay(arrays)
+
+    head = {k: v[:400] for k, v in arrays.items()}
+    wl = StreamingWatchlist(strategy)
+    wl.warm_up('sz000001', arrays=head)
+    path = str(tmp_path / 'state.pkl')
+    wl.save(path)
+    wl = StreamingWatchlist.load(path)
+    for i in range(400, len(arrays['close'])):
+        bar = (arrays['datetime'][i], arrays['open'][i], arrays['high'][i], arrays['low'][i], arrays['close'][i])
+        wl.append('sz000001', *bar)
+        # 同一根K线重复追加被忽略
+        assert wl.append('sz000001', *bar) == []
+
+    assert wl.results()[0]['total_return'] == pytest.approx(full.results()['total_return'])
+    assert wl.results()[0]['trade_count'] == full.results()['trade_count']
+
+
+def test_std_state_matches_rolling_std(arrays):
+    close = arrays['close']
+    state = STDState(20)
+    got = np.array([state.update(x) for x in close.tolist()])
+    np.testing.assert_allclose(got, rolling_std(close, 20), rtol=1e-9, equal_nan=True)
+
+
+def test_std_state_does_not_drift_over_long_runs():
+    rng = np.random.default_rng(0)
+    x = 1e6 + rng.normal(0.0, 1e-3, 200_000)
+    state = STDState(20)
+    for v in x.tolist():
+        value = state.update(v)
+    assert value == pytest.approx(np.std(x[-20:], ddof=1), rel=1e-6)
+    assert math.isnan(STDState(20).update(1.0))
+
+
+def test_adx_state_warm_up_and_degenerate_series():
+    n = 5
+    # 每根K线整体上移 1：-DM 恒为 0，DX = 100
+    state = ADXState(n)
+    rising = [state.update(t + 1.0, float(t), t + 0.5) for t in range(20)]
+    assert all(math.isnan(v) for v in rising[:2 * n - 1])
+    assert rising[2 * n - 1:] == pytest.approx([100.0] * (20 - 2 * n + 1))
+    # 价格不变：TR 为 0，不计 DX
+    state = ADXState(n)
+    flat = [state.update(10.0, 10.0, 10.0) for _ in range(20)]
+    assert flat[2 * n - 1:] == [0.0] * (20 - 2 * n + 1)
+
+
+def test_adx_state_matches_ta_adx(kdata):
+    cols = kdata_arrays(kdata)
+    for n in (2, 14):
+        state = ADXState(n)
+        got = [state.update(h, l, c) for h, l, c in zip(cols['high'].tolist(), cols['low'].tolist(),
+                                                        cols['close'].tolist())]
+        np.testing.assert_allclose(got, hku.TA_ADX(kdata, n).to_np(), rtol=1e-12, equal_nan=True)
+
+
+def test_alternate_state_follows_signal_base():
+    state = AlternateState()
+    events = [(False, True), (True, False), (True, False), (False, False), (False, True), (False, True)]
+    assert [state.update(*e) for e in events] == [
+        (False, False), (True, False), (False, False), (False, False), (False, True), (False, False)]
+    raw = AlternateState(alternate=False)
+    assert [raw.update(*e) for e in events] == events
+
+
+def test_adx_band_gates_ema_crosses(arrays, band_kernel):
+    plain = StreamingBacktest(EMACrossStrategy(2, 3)).replay(arrays).results()
+    banded = StreamingBacktest(ADX_STRATEGIES[1]).replay(arrays).results()
+    assert 0 < banded['trade_count'] < plain['trade_count']
+    # 上轨 999 超出 ADX 的取值范围，SG_Band 从不买入，组合信号不会开仓（与 sys.run 一致）
+    assert StreamingBacktest(ADX_STRATEGIES[0]).replay(arrays).results()['trade_count'] == 0
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES + ADX_STRATEGIES, ids=lambda s: type(s).__name__)
+def test_replay_matches_engine(kdata, strategy, band_kernel):
+    got = StreamingBacktest(strategy, init_cash=300000).replay(kdata_arrays(kdata)).results()
+    expected = run_strategy_backtest(strategy, kdata, 300000)
+    assert got['trade_count'] == expected['trade_count']
+    assert got['total_return'] == pytest.approx(expected['total_return'])
+
+
+def test_strategies_without_incremental_kernel_are_rejected():
+    class Unsupported:
+        fixed_count = 100
+
+    with pytest.raises(ValueError, match="没有增量实现"):
+        StreamingBacktest(Unsupported())
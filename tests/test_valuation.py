@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+from portfolio_module import LiveValuation, build_book, portfolio_summary, rebalance_plan
+
+RAW = [
+    {"ticker": "A", "group": "科技", "shares": 3000, "cost": 10.0, "price": 20.0},
+    {"ticker": "B", "group": "科技", "shares": 1000, "cost": 10.0, "price": 15.0},
+    {"ticker": "C", "group": "消费", "shares": 500, "cost": 30.0, "price": 30.0},
+    # 同一只股票分属两个板块
+    {"ticker": "C", "group": "红利", "shares": 300, "cost": 28.0, "price": 30.0},
+    {"ticker": "D", "group": "红利", "shares": 200, "cost": 5.0, "price": 5.0},
+]
+CASH = {"stock_cash": 20000.0, "other_funds_investable": 10000.0}
+# 目标接近当前配置，价格波动时触发状态会来回翻转
+TARGETS = [
+    {"group": "科技", "target_weight": 0.6, "band": 0.1},
+    {"group": "消费", "target_weight": 0.15, "band": 0.2},
+    {"group": "红利", "target_weight": 0.1, "band": 0.2},
+    {"group": "债券", "target_weight": 0.15, "band": 0.1},
+]
+
+
+def _static_rows(book, include_other):
+    deviation, _ = rebalance_plan(book, CASH, TARGETS, include_other, {})
+    return {r["group"]: r for r in deviation}
+
+
+@pytest.mark.parametrize("include_other", [False, True])
+def test_incremental_updates_match_full_recompute(include_other):
+    book = build_book(RAW)
+    live = LiveValuation(book, CASH, TARGETS, include_other)
+    # 静态计算用的持仓簿，逐笔同步价格
+    static = build_book(RAW)
+    rng = np.random.default_rng(0)
+    tickers = ["A", "B", "C", "D"]
+    triggered = {g: r["triggered"] for g, r in _static_rows(static, include_other).items()}
+    n_flips = 0
+
+    for _ in range(300):
+        ticker = tickers[rng.integers(len(tickers))]
+        price = round(live.price(ticker) * rng.uniform(0.9, 1.1), 2)
+        flips = live.update(ticker, price)
+        static.price[static.tickers == ticker] = price
+
+        assert live.summary() == pytest.approx(portfolio_summary(static, CASH, include_other))
+        expected = _static_rows(static, include_other)
+        got = {r["group"]: r for r in live.deviations()}
+        assert got.keys() == expected.keys()
+        for g, row in expected.items():
+            assert got[g] == pytest.approx(row)
+
+        # 只报告触发状态翻转的板块
+        now = {g: r["triggered"] for g, r in expected.items()}
+        assert {f["group"] for f in flips} == {g for g in now if now[g] != triggered[g]}
+        assert all(f["triggered"] == now[f["group"]] for f in flips)
+        triggered = now
+        n_flips += len(flips)
+
+    assert n_flips > 0
+    # 传入的持仓簿不随行情变化
+    assert book.price.tolist() == [p["price"] for p in RAW]
+
+
+def test_update_many_reports_flips_once_and_resync_is_stable():
+    book = build_book(RAW)
+    live = LiveValuation(book, CASH, TARGETS, False)
+    before = live.triggered.copy()
+    flips = live.update_many({"A": 40.0, "B": 30.0})
+    assert live.price("A") == 40.0 and book.price[0] == 20.0
+    assert flips
+    assert {f["group"] for f in flips} == {live.groups[g] for g in np.flatnonzero(live.triggered != before)}
+
+    values = live.group_values.copy()
+    live.resync()
+    np.testing.assert_allclose(live.group_values, values)
+    # 价格不变不计为一次更新
+    count = live.updates
+    assert live.update("A", 40.0) == []
+    assert live.updates == count
+
+
+def test_unknown_ticker_raises():
+    live = LiveValuation(build_book(RAW), CASH, TARGETS, False)
+    with pytest.raises(KeyError):
+        live.update("Z", 1.0)
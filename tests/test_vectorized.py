@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("hikyuu")
+
+from backtest.vectorized import (  # noqa: E402
+    bollinger_signals,
+    cross,
+    ema,
+    ema_cross_signals,
+    holdings_from_signals,
+    rolling_mean,
+    rolling_std,
+    simulate_fixed_count,
+)
+from benchmarks.synthetic import gbm_ohlcv  # noqa: E402
+from strategies import EMACrossStrategy  # noqa: E402
+from strategies.all_strategies import BollingerBreakoutStrategy  # noqa: E402
+
+
+def test_ema_starts_at_first_value_and_computes_all_columns():
+    x = np.array([1.0, 2.0, 3.0, 4.0])
+    out = ema(x, [1, 3])
+    assert out[:, 0].tolist() == x.tolist()
+    expected = [1.0]
+    for v in x[1:]:
+        expected.append(expected[-1] + 0.5 * (v - expected[-1]))
+    assert out[:, 1].tolist() == pytest.approx(expected)
+    assert ema(np.zeros(0), [5]).shape == (0, 1)
+
+
+def test_rolling_mean_uses_partial_window_at_start():
+    x = np.array([2.0, 4.0, 6.0, 8.0])
+    assert rolling_mean(x, 3).tolist() == pytest.approx([2.0, 3.0, 4.0, 6.0])
+    assert rolling_mean(x, 10).tolist() == pytest.approx([2.0, 3.0, 4.0, 5.0])
+
+
+def test_rolling_std_matches_sample_std():
+    x = np.random.default_rng(1).normal(size=50)
+    out = rolling_std(x, 5)
+    assert np.isnan(out[:4]).all()
+    expected = [np.std(x[i - 4:i + 1], ddof=1) for i in range(4, 50)]
+    assert out[4:] == pytest.approx(expected)
+
+
+def test_cross_ignores_nan_and_touching():
+    fast = np.array([np.nan, 1.0, 3.0, 3.0, 1.0, 2.0])
+    slow = np.array([2.0, 2.0, 2.0, 3.0, 2.0, 2.0])
+    buy, sell = cross(fast, slow)
+    assert buy.tolist() == [False, False, True, False, False, False]
+    assert sell.tolist() == [False, False, False, False, False, False]
+    buy, sell = cross(np.array([3.0, 1.0]), np.array([2.0, 2.0]))
+    assert sell.tolist() == [False, True]
+
+
+def test_holdings_follow_signals_with_one_bar_delay():
+    buy = np.array([0, 1, 0, 1, 0, 0, 0], dtype=bool)
+    sell = np.array([1, 0, 0, 0, 1, 0, 1], dtype=bool)
+    assert holdings_from_signals(buy, sell).tolist() == [0, 0, 1, 1, 1, 0, 0]
+    # 多列时每列独立
+    both = holdings_from_signals(np.column_stack([buy, sell]), np.column_stack([sell, buy]))
+    assert both[:, 0].tolist() == [0, 0, 1, 1, 1, 0, 0]
+    assert both[:, 1].tolist() == [0, 1, 0, 0, 0, 1, 1]
+
+
+def test_simulate_fixed_count_cash_flows():
+    open_price = np.array([10.0, 11.0, 12.0, 13.0])
+    close = np.array([10.5, 11.5, 12.5, 13.5])
+    buy = np.array([[True], [False], [False], [False]])
+    sell = np.array([[False], [False], [True], [False]])
+    res = simulate_fixed_count(open_price, close, buy, sell, 100, init_cash=1000)
+    # 第 2 根开盘 11 买入，第 4 根开盘 13 卖出
+    assert res['held'][:, 0].tolist() == [0, 1, 1, 0]
+    assert res['total_return'].tolist() == pytest.approx([200.0])
+    assert res['trade_count'].tolist() == [2]
+    assert res['traded_value'].tolist() == pytest.approx([2400.0])
+    assert res['equity'][:, 0].tolist() == pytest.approx([1000.0, 1050.0, 1150.0, 1200.0])
+
+
+def test_kernels_evaluate_each_parameter_column_like_a_single_run():
+    close = gbm_ohlcv(1, 300, seed=3)['close'][:, 0]
+    grid = [EMACrossStrategy(f, s) for f in (3, 5, 8) for s in (5, 10)]
+    buy, sell = ema_cross_signals(close, grid)
+    for j, strategy in enumerate(grid):
+        one_buy, one_sell = ema_cross_signals(close, [strategy])
+        assert buy[:, j].tolist() == one_buy[:, 0].tolist()
+        assert sell[:, j].tolist() == one_sell[:, 0].tolist()
+
+    bands = [BollingerBreakoutStrategy(20, 2), BollingerBreakoutStrategy(10, 1.5)]
+    buy, sell = bollinger_signals(close, bands)
+    assert not (buy & sell).any()
+    assert bollinger_signals(close, bands[1:])[0][:, 0].tolist() == buy[:, 1].tolist()
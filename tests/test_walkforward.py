@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("hikyuu")
+
+from backtest.vectorized import ema_cross_signals, simulate_fixed_count  # noqa: E402
+from backtest.walkforward import _stitch, _vector_window, walk_forward_windows  # noqa: E402
+from benchmarks.synthetic import gbm_ohlcv, stock_columns  # noqa: E402
+from strategies import EMACrossStrategy  # noqa: E402
+
+
+def test_windows_tile_the_out_of_sample_range():
+    windows = walk_forward_windows(100, 40, 25)
+    assert windows == [(0, 40, 65), (25, 65, 90), (50, 90, 100)]
+    assert walk_forward_windows(100, 40, 25, anchored=True) == [(0, 40, 65), (0, 65, 90), (0, 90, 100)]
+    assert walk_forward_windows(40, 40, 10) == []
+    # step < test 时测试窗口重叠
+    assert walk_forward_windows(60, 40, 10, step=5)[:2] == [(0, 40, 50), (5, 45, 55)]
+
+
+def test_stitch_chains_returns_of_adjacent_windows():
+    windows = [(0, 2, 4), (2, 4, 6)]
+    index, equity = _stitch(windows, [np.array([110.0, 121.0]), np.array([90.0, 99.0])], 100.0)
+    assert index.tolist() == [2, 3, 4, 5]
+    assert equity.tolist() == pytest.approx([110.0, 121.0, 108.9, 119.79])
+
+
+def test_stitch_skips_bars_already_covered():
+    windows = [(0, 2, 5), (1, 3, 6), (2, 4, 5)]
+    equities = [np.array([110.0, 121.0, 121.0]), np.array([105.0, 105.0, 126.0]), np.array([200.0])]
+    index, equity = _stitch(windows, equities, 100.0)
+    # 第二个窗口只取第 5 根（相对上一根 105 -> 126 涨 20%），第三个窗口已被完全覆盖
+    assert index.tolist() == [2, 3, 4, 5]
+    assert equity.tolist() == pytest.approx([110.0, 121.0, 121.0, 145.2])
+    assert _stitch([], [], 100.0)[0].shape == (0,)
+
+
+def test_vector_window_tests_the_best_training_column():
+    arrays = stock_columns(gbm_ohlcv(1, 300, seed=5), 0)
+    strategies = [EMACrossStrategy(f, s) for f, s in ((3, 8), (5, 20), (10, 30))]
+    buy, sell = ema_cross_signals(arrays['close'], strategies)
+    counts = np.full(3, 100.0)
+    o, c = arrays['open'], arrays['close']
+
+    best, value, test = _vector_window(((o[:200], c[:200], buy[:200], sell[:200]),
+                                        (o[200:], c[200:], buy[200:], sell[200:]),
+                                        counts, 100000, 'total_return', 252))
+    train = simulate_fixed_count(o[:200], c[:200], buy[:200], sell[:200], counts, 100000)
+    assert best == int(np.argmax(train['total_return']))
+    assert value == pytest.approx(train['total_return'][best])
+
+    alone = simulate_fixed_count(o[200:], c[200:], buy[200:, [best]], sell[200:, [best]], counts[:1], 100000)
+    np.testing.assert_allclose(test['equity'], alone['equity'][:, 0])
+    assert test['total_return'] == pytest.approx(alone['total_return'][0])